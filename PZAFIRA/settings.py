@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt.token_blacklist',
@@ -69,6 +70,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "common.middleware.QueryBudgetMiddleware",
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -131,6 +133,77 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# Cache
+# Uses Redis when REDIS_URL is set, otherwise a per-process local-memory cache.
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'pzafira',
+        }
+    }
+
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a cart's stock stays reserved while its payment is in progress.
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=900, cast=int)
+
+# Benchmark commands only seed synthetic rows into a database whose name matches this
+# pattern (or with DEBUG on, or when run with --force).
+BENCH_DATABASE_PATTERN = config('BENCH_DATABASE_PATTERN', default=r'bench|test')
+
+# Reviews embedded in a product detail; the full list is paginated under detail-products/{id}/reviews/.
+PRODUCT_RECENT_REVIEWS = config('PRODUCT_RECENT_REVIEWS', default=5, cast=int)
+
+# Product image renditions (name -> max width) stored on each image after upload.
+# products.renditions.LocalRenditions resizes files under MEDIA_ROOT with Pillow instead (tests, offline work).
+IMAGE_RENDITION_BACKEND = config('IMAGE_RENDITION_BACKEND', default='products.renditions.CloudinaryRenditions')
+IMAGE_RENDITIONS = {'thumb': 200, 'card': 480, 'zoom': 1600}
+# Offered next to the JPEG fallback of every rendition.
+IMAGE_RENDITION_FORMATS = ['avif', 'webp']
+
+# Query counting by common.middleware.QueryBudgetMiddleware: the share of requests measured,
+# the default number of queries a view may run and per-view overrides ("ViewSet.action" or
+# "ViewSet", None for no budget), and how many runs of one statement are flagged as an N+1.
+QUERY_BUDGET_SAMPLE_RATE = config('QUERY_BUDGET_SAMPLE_RATE', default=1.0 if DEBUG else 0.05, cast=float)
+QUERY_BUDGET_DEFAULT = config('QUERY_BUDGET_DEFAULT', default=20, cast=int)
+QUERY_BUDGETS = {}
+QUERY_BUDGET_REPEAT_THRESHOLD = config('QUERY_BUDGET_REPEAT_THRESHOLD', default=5, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line per sampled request; set to WARNING to keep only budget overruns and N+1s.
+        'common.middleware': {
+            'handlers': ['console'],
+            'level': config('QUERY_BUDGET_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Carts of anonymous visitors live only in this cache until merged at login/checkout.
+GUEST_CART_CACHE_ALIAS = 'default'
+GUEST_CART_TTL = config('GUEST_CART_TTL', default=7 * 24 * 3600, cast=int)
+
+# Threads (each with its own DB connection) used to run admin dashboard widgets.
+ADMIN_DASHBOARD_WORKERS = config('ADMIN_DASHBOARD_WORKERS', default=4, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -201,6 +274,15 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -240,6 +322,23 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
 
+# Outbound mail is queued in common.EmailJob and delivered by `run_mail_worker`.
+MAIL_QUEUE_BATCH_SIZE = config('MAIL_QUEUE_BATCH_SIZE', default=50, cast=int)
+MAIL_QUEUE_MAX_ATTEMPTS = config('MAIL_QUEUE_MAX_ATTEMPTS', default=5, cast=int)
+MAIL_QUEUE_RETRY_BACKOFF = config('MAIL_QUEUE_RETRY_BACKOFF', default=30, cast=int)
+MAIL_QUEUE_LOCK_TIMEOUT = config('MAIL_QUEUE_LOCK_TIMEOUT', default=300, cast=int)
+
+# Product images, brand logos and profile pictures are staged on local disk (shared with
+# `run_upload_worker`) and pushed to storage in the background as common.UploadJob rows.
+# common.uploadqueue.LocalUploader copies them under MEDIA_ROOT instead (tests, offline work).
+UPLOAD_STORAGE_BACKEND = config('UPLOAD_STORAGE_BACKEND', default='common.uploadqueue.CloudinaryUploader')
+UPLOAD_STAGING_ROOT = config('UPLOAD_STAGING_ROOT', default=os.path.join(BASE_DIR, 'upload_staging'))
+UPLOAD_QUEUE_BATCH_SIZE = config('UPLOAD_QUEUE_BATCH_SIZE', default=20, cast=int)
+UPLOAD_QUEUE_CONCURRENCY = config('UPLOAD_QUEUE_CONCURRENCY', default=4, cast=int)
+UPLOAD_QUEUE_MAX_ATTEMPTS = config('UPLOAD_QUEUE_MAX_ATTEMPTS', default=5, cast=int)
+UPLOAD_QUEUE_RETRY_BACKOFF = config('UPLOAD_QUEUE_RETRY_BACKOFF', default=30, cast=int)
+UPLOAD_QUEUE_LOCK_TIMEOUT = config('UPLOAD_QUEUE_LOCK_TIMEOUT', default=300, cast=int)
+
 
 SWAGGER_SETTINGS = {
    'SECURITY_DEFINITIONS': {
@@ -49,6 +49,7 @@ urlpatterns = [
     path('cart/api/', include('cart.urls')),
     path('wishlist/api/', include('wishlist.urls')),
     path('shipping/api/', include('shipping.urls')),
+    path('uploads/api/', include('common.urls')),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ] + debug_toolbar_urls()
@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import F, Q, Sum
+from django.utils.timezone import localdate
+
+from orders.models import CustomerStats, DailySalesRollup
+from products.models import Product
+from .serializers import TopProductSerializer, TopUserSerializer
+
+
+def order_totals(today):
+    """
+    Every order count and sales sum of the dashboard in one pass over the
+    daily rollup, using conditional aggregation (``SUM(...) FILTER (WHERE ...)``).
+    """
+    this_month = today.replace(day=1)
+    last_month = (this_month - timedelta(days=1)).replace(day=1)
+    windows = {
+        'weekly_orders': ('order_count', Q(date__gte=today - timedelta(days=6))),
+        'monthly_orders': ('order_count', Q(date__gte=today - timedelta(days=29))),
+        'sales_this_month': ('order_total', Q(date__gte=this_month)),
+        'sales_last_month': ('order_total', Q(date__gte=last_month, date__lt=this_month)),
+    }
+    totals = DailySalesRollup.objects.filter(date__gte=min(last_month, today - timedelta(days=29))).aggregate(
+        **{name: Sum(field, filter=window) for name, (field, window) in windows.items()}
+    )
+    return {name: value or 0 for name, value in totals.items()}
+
+
+def top_liked_products(today):
+    # Rating counters are kept on the product, so this is an index scan.
+    products = Product.objects.annotate(
+        total_reviews=F('rating_count')
+    ).order_by('-average_rating', '-rating_count')[:5]
+    return {'top_liked_products': TopProductSerializer(products, many=True).data}
+
+
+def top_users(today):
+    # Walks the CustomerStats top-spend index instead of aggregating all orders.
+    users = []
+    for stats in CustomerStats.objects.select_related('user').order_by('-lifetime_spend', 'user')[:5]:
+        stats.user.total_purchased = stats.lifetime_spend
+        users.append(stats.user)
+    return {'top_users': TopUserSerializer(users, many=True).data}
+
+
+WIDGETS = [order_totals, top_liked_products, top_users]
+
+
+def _run_widget(widget, today, close_connection):
+    started = time.perf_counter()
+    try:
+        return widget(today), (time.perf_counter() - started) * 1000
+    finally:
+        if close_connection:
+            # Pool threads get their own connection; don't leak it.
+            connections.close_all()
+
+
+def build_dashboard(widgets=WIDGETS):
+    """
+    Run the dashboard ``widgets`` and merge their results.
+
+    Widgets run concurrently on up to ``ADMIN_DASHBOARD_WORKERS`` threads,
+    each on its own database connection. Inside a transaction (where other
+    connections could not see its writes) they run one after another.
+    Returns ``(data, timings)`` with per-widget wall time in milliseconds.
+    """
+    today = localdate()
+    workers = min(getattr(settings, 'ADMIN_DASHBOARD_WORKERS', 4), len(widgets))
+    if connection.in_atomic_block or workers <= 1:
+        results = [_run_widget(widget, today, False) for widget in widgets]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard') as pool:
+            results = list(pool.map(lambda widget: _run_widget(widget, today, True), widgets))
+
+    data, timings = {}, {}
+    for widget, (values, elapsed) in zip(widgets, results):
+        data.update(values)
+        timings[widget.__name__] = round(elapsed, 2)
+    return data, timings
@@ -16,3 +16,14 @@ class TopUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'first_name', 'last_name', 'email', 'total_purchased']
+
+
+class TopCustomerSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='user_id')
+    first_name = serializers.CharField(source='user__first_name')
+    last_name = serializers.CharField(source='user__last_name')
+    email = serializers.EmailField(source='user__email')
+    total_spend = serializers.DecimalField(max_digits=14, decimal_places=2)
+    order_count = serializers.IntegerField()
+    first_order_at = serializers.DateTimeField()
+    last_order_at = serializers.DateTimeField()
@@ -1,3 +1,21 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from users.models import User
+
+
+class CatalogCacheStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin@example.com', 'pass', first_name='A', last_name='B')
+
+    def test_reports_every_cached_viewset(self):
+        self.client.get('/products/api/product-summaries/')
+        self.client.get('/products/api/product-summaries/')
+
+        self.client.force_authenticate(self.admin)
+        stats = self.client.get(reverse('catalog-cache-stats')).json()
+
+        self.assertEqual(set(stats), {'products', 'detail_products', 'product_summaries'})
+        self.assertEqual(stats['product_summaries'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
@@ -2,7 +2,8 @@ from django.urls import path
 from .views import AdminDashboardView
 from .views import (
     DailyOrdersCurrentMonth, MonthlyOrdersLast12,
-    DailySalesCurrentMonth, MonthlySalesLast12
+    DailySalesCurrentMonth, MonthlySalesLast12, CatalogCacheStatsView,
+    MailQueueStatsView, UploadQueueStatsView, TopCustomersView, CatalogImportView
 )
 
 urlpatterns = [
@@ -11,4 +12,9 @@ urlpatterns = [
     path('monthly-orders/', MonthlyOrdersLast12.as_view()),
     path('daily-sales/', DailySalesCurrentMonth.as_view()),
     path('monthly-sales/', MonthlySalesLast12.as_view()),
+    path('top-customers/', TopCustomersView.as_view(), name='top-customers'),
+    path('catalog-import/', CatalogImportView.as_view(), name='catalog-import'),
+    path('catalog-cache-stats/', CatalogCacheStatsView.as_view(), name='catalog-cache-stats'),
+    path('mail-queue-stats/', MailQueueStatsView.as_view(), name='mail-queue-stats'),
+    path('upload-queue-stats/', UploadQueueStatsView.as_view(), name='upload-queue-stats'),
 ]
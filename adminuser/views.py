@@ -1,14 +1,21 @@
 from rest_framework.views import APIView
+from rest_framework.generics import ListAPIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
-from django.utils.timezone import now, timedelta
-from django.db.models import Count, Sum, DecimalField
-from decimal import Decimal
-from users.models import User
-from orders.models import Order
-from products.models import Product
-from .serializers import TopProductSerializer, TopUserSerializer
-from django.db.models.functions import Coalesce, TruncDay, TruncMonth
+from datetime import datetime, time
+from django.utils.timezone import localdate, make_aware, now, timedelta
+from django.conf import settings
+from django.db.models import Count, F, Max, Min, Sum
+from orders.models import CustomerStats, DailySalesRollup, Order
+from common.paginations import CustomPagination
+from products.cache import get_cache_stats
+from products.importers import IMPORT_FORMATS, CatalogImporter, detect_format, read_rows
+from common.mailqueue import queue_stats
+from common.uploadqueue import queue_stats as upload_queue_stats
+from .dashboard import build_dashboard
+from .serializers import TopCustomerSerializer
 
 class AdminDashboardView(APIView):
 
@@ -20,105 +27,161 @@ class AdminDashboardView(APIView):
     - **Weekly Orders:** Total number of orders placed in the last 7 days.
     - **Monthly Orders:** Total number of orders placed in the last 30 days.
     - **Top Liked Products:** Top 5 products with the highest number of user reviews.
-    - **Top Users:** Top 5 users based on the total quantity of products purchased.
+    - **Top Users:** Top 5 customers by lifetime spend on paid, non-cancelled orders.
     - **Sales This Month:** Total revenue generated from orders created in the current month.
     - **Sales Last Month:** Total revenue generated from orders in the previous month.
+
+    The order and sales figures come from one conditional aggregate over the daily
+    rollup; the remaining widgets run in parallel (see ``adminuser.dashboard``).
+    With ``DEBUG`` on, ``timings_ms`` reports how long each widget took.
     """
 
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        today = now()
-        last_week = today - timedelta(days=7)
-        last_30_days = today - timedelta(days=30)
-
-        # Orders
-        weekly_orders_count = Order.objects.filter(created_at__gte=last_week).count()
-        monthly_orders_count = Order.objects.filter(created_at__gte=last_30_days).count()
-
-        # Top 5 liked products (based on number of reviews)
-        top_liked_products = Product.objects.annotate(
-            total_reviews=Count('reviews')
-        ).order_by('-average_rating')[:5]
-
-        # Top 5 users by total quantity purchased
-        top_users = User.objects.annotate(
-            total_purchased=Coalesce(Sum('orders__total_price'), Decimal(0.00), output_field=DecimalField(max_digits=10, decimal_places=2))
-        ).order_by('-total_purchased')[:5]
-
-        # Monthly sales (this and previous month)
-        this_month = today.replace(day=1)
-        last_month = (this_month - timedelta(days=1)).replace(day=1)
-
-        sales_this_month = Order.objects.filter(created_at__gte=this_month).aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
-
-        sales_last_month = Order.objects.filter(
-            created_at__gte=last_month,
-            created_at__lt=this_month
-        ).aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
-
-        return Response({
-            "weekly_orders": weekly_orders_count,
-            "monthly_orders": monthly_orders_count,
-            "top_liked_products": TopProductSerializer(top_liked_products, many=True).data,
-            "top_users": TopUserSerializer(top_users, many=True).data,
-            "sales_this_month": sales_this_month,
-            "sales_last_month": sales_last_month,
-        })
+        data, timings = build_dashboard()
+        if settings.DEBUG:
+            data['timings_ms'] = timings
+        return Response(data)
     
 
 # ✅ 1. Daily Orders - Current Month
 class DailyOrdersCurrentMonth(APIView):
     def get(self, request):
-        start = now().replace(day=1)
-        orders = (
-            Order.objects.filter(created_at__date__gte=start, payment_status='paid')
-            .annotate(day=TruncDay('created_at'))
-            .values('day')
-            .annotate(count=Count('id'))
-            .order_by('day')
-        )
-        return Response(orders)
+        start = localdate().replace(day=1)
+        rows = DailySalesRollup.objects.filter(date__gte=start, paid_count__gt=0).values_list('date', 'paid_count')
+        return Response([{'day': _start_of(day), 'count': count} for day, count in rows])
 
 # ✅ 2. Monthly Orders - Last 12 Months
 class MonthlyOrdersLast12(APIView):
     def get(self, request):
-        start = now() - timedelta(days=365)
-        orders = (
-            Order.objects.filter(created_at__date__gte=start, payment_status='paid')
-            .annotate(month=TruncMonth('created_at'))
-            .values('month')
-            .annotate(count=Count('id'))
-            .order_by('month')
-        )
-        return Response(orders)
+        start = localdate() - timedelta(days=365)
+        months = _by_month(start, 'paid_count')
+        return Response([{'month': month, 'count': count} for month, count in months])
 
 # ✅ 3. Daily Sales - Current Month
 class DailySalesCurrentMonth(APIView):
     def get(self, request):
-        start = now().replace(day=1)
-        sales = (
-            Order.objects.filter(created_at__date__gte=start, payment_status='paid')
-            .annotate(day=TruncDay('created_at'))
-            .values('day')
-            .annotate(total_sales=Sum('total_price'))
-            .order_by('day')
-        )
-        return Response(sales)
+        start = localdate().replace(day=1)
+        rows = DailySalesRollup.objects.filter(date__gte=start, paid_count__gt=0).values_list('date', 'paid_total')
+        return Response([{'day': _start_of(day), 'total_sales': total} for day, total in rows])
 
 # ✅ 4. Monthly Sales - Last 12 Months
 class MonthlySalesLast12(APIView):
     def get(self, request):
-        start = now() - timedelta(days=365)
-        sales = (
-            Order.objects.filter(created_at__date__gte=start, payment_status='paid')
-            .annotate(month=TruncMonth('created_at'))
-            .values('month')
-            .annotate(total_sales=Sum('total_price'))
-            .order_by('month')
-        )
-        return Response(sales)
\ No newline at end of file
+        start = localdate() - timedelta(days=365)
+        months = _by_month(start, 'paid_total')
+        return Response([{'month': month, 'total_sales': total} for month, total in months])
+
+
+def _start_of(day):
+    # Charts have always been keyed by local midnight timestamps.
+    return make_aware(datetime.combine(day, time.min))
+
+
+def _by_month(start, field):
+    """
+    Fold at most ~366 daily rollup rows into months that had paid orders.
+    """
+    months = {}
+    for row in DailySalesRollup.objects.filter(date__gte=start, paid_count__gt=0).values('date', field):
+        month = row['date'].replace(day=1)
+        months[month] = months.get(month, 0) + row[field]
+    return [(_start_of(month), value) for month, value in sorted(months.items())]
+
+
+class TopCustomersView(ListAPIView):
+    """
+    API endpoint listing customers by spend on paid, non-cancelled orders (paginated).
+
+    - `?window=all` (default): lifetime spend, read from the maintained
+      CustomerStats table along its top-spend index.
+    - `?window=7d|30d|90d|365d`: spend on orders placed in that window,
+      aggregated over the orders in the window only.
+    """
+
+    permission_classes = [IsAdminUser]
+    serializer_class = TopCustomerSerializer
+    pagination_class = CustomPagination
+    windows = {'7d': 7, '30d': 30, '90d': 90, '365d': 365}
+
+    def get_queryset(self):
+        window = self.request.query_params.get('window', 'all')
+        if window == 'all':
+            return CustomerStats.objects.order_by('-lifetime_spend', 'user').values(
+                'user_id', 'user__first_name', 'user__last_name', 'user__email',
+                'order_count', 'first_order_at', 'last_order_at', total_spend=F('lifetime_spend'),
+            )
+        if window not in self.windows:
+            raise ValidationError({'window': f"Choose one of: all, {', '.join(self.windows)}."})
+
+        orders = Order.objects.filter(
+            created_at__gte=now() - timedelta(days=self.windows[window]), payment_status='paid'
+        ).exclude(status='cancelled')
+        return orders.values('user_id', 'user__first_name', 'user__last_name', 'user__email').annotate(
+            total_spend=Sum('total_price'), order_count=Count('id'),
+            first_order_at=Min('created_at'), last_order_at=Max('created_at'),
+        ).order_by('-total_spend', 'user_id')
+
+
+class CatalogCacheStatsView(APIView):
+    """
+    API endpoint reporting hit/miss counters of the product catalog cache, per
+    cached viewset.
+
+    Counters are kept in the cache backend itself, so with Redis they are shared
+    by every worker process; with the local-memory backend they are per process.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats())
+
+
+class MailQueueStatsView(APIView):
+    """
+    API endpoint reporting the depth and throughput of the outbound email queue.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(queue_stats())
+
+
+class UploadQueueStatsView(APIView):
+    """
+    API endpoint reporting the depth and throughput of the background file upload queue.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(upload_queue_stats())
+
+
+class CatalogImportView(APIView):
+    """
+    API endpoint for bulk-importing the catalog from an uploaded CSV or JSONL file.
+
+    - One variant per row, upserted by `sku`; its product is upserted by `product_sku`
+      (see `import_catalog` for the columns).
+    - The file is streamed and written in chunks, so memory use does not grow with it.
+    - Returns row counts, rows per second and per-row errors.
+    """
+
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Upload a CSV or JSONL file.'})
+        fmt = request.data.get('format') or detect_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            raise ValidationError({'format': f"Choose one of: {', '.join(IMPORT_FORMATS)}."})
+
+        upload.file.seek(0)
+        report = CatalogImporter().run(read_rows(upload.file, fmt))
+        return Response(report.as_dict())
@@ -0,0 +1,192 @@
+import secrets
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+from products.models import ProductVariant
+from .mutations import CartLineError, apply_lines, get_cart_id
+
+GUEST_CART_KEY = 'guest-cart:{}'
+GUEST_CART_LOCK_KEY = 'guest-cart:{}:lock'
+# Seconds a writer may hold a cart's lock (it expires if the writer dies) and
+# seconds another writer waits for it.
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 3
+
+
+class GuestCartNotFound(Exception):
+    pass
+
+
+class GuestCartBusy(Exception):
+    """
+    Raised when another request kept the cart locked for longer than ``LOCK_WAIT``.
+    """
+
+
+def _cache():
+    return caches[getattr(settings, 'GUEST_CART_CACHE_ALIAS', 'default')]
+
+
+def _ttl():
+    return getattr(settings, 'GUEST_CART_TTL', 7 * 24 * 3600)
+
+
+@contextmanager
+def _locked(token):
+    """
+    Serialize the read-modify-write of one guest cart across processes:
+    ``cache.add`` succeeds for a single caller, the others retry until it is
+    released. Two tabs adding at once therefore both land.
+    """
+    cache = _cache()
+    key = GUEST_CART_LOCK_KEY.format(token)
+    owner = secrets.token_hex(8)
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(key, owner, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            raise GuestCartBusy(token)
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        # Only release a lock that did not expire and pass to another writer.
+        if cache.get(key) == owner:
+            cache.delete(key)
+
+
+def create_guest_cart():
+    """
+    Start an empty guest cart and return its opaque token. Guest carts live
+    only in the cache and expire ``GUEST_CART_TTL`` seconds after their last
+    change, so abandoned carts never reach the database.
+    """
+    token = secrets.token_urlsafe(24)
+    _cache().set(GUEST_CART_KEY.format(token), {}, _ttl())
+    return token
+
+
+def get_guest_lines(token):
+    """
+    Return ``{variant_id: quantity}`` for a guest cart.
+    """
+    lines = _cache().get(GUEST_CART_KEY.format(token))
+    if lines is None:
+        raise GuestCartNotFound(token)
+    return lines
+
+
+def delete_guest_cart(token):
+    _cache().delete(GUEST_CART_KEY.format(token))
+
+
+def update_guest_cart(token, changes):
+    """
+    Apply ``changes`` (variant id -> ``(mode, quantity)`` as in
+    ``cart.mutations.apply_lines``) to a guest cart, all or nothing.
+
+    Variants are checked against stock with one read query; nothing is
+    written to the database. The cart is locked while it is read, checked
+    and written back, so concurrent updates are applied one after the other.
+    Returns the new lines.
+    """
+    with _locked(token):
+        return _update_lines(token, changes)
+
+
+def _update_lines(token, changes):
+    lines = dict(get_guest_lines(token))
+    stock = {
+        pk: available for pk, available in ProductVariant.objects.filter(
+            pk__in=changes, is_active=True
+        ).values_list('pk', 'stock')
+    }
+    errors = []
+    for pk, (mode, quantity) in changes.items():
+        if mode == 'remove' or (mode == 'set' and not quantity):
+            lines.pop(pk, None)
+            continue
+        target = quantity + (lines.get(pk, 0) if mode == 'add' else 0)
+        if pk not in stock:
+            errors.append({'variant': pk, 'error': "This variant is not available."})
+        elif target > stock[pk]:
+            errors.append({'variant': pk, 'error': f"Only {stock[pk]} items available."})
+        else:
+            lines[pk] = target
+    if errors:
+        raise CartLineError(errors)
+    _cache().set(GUEST_CART_KEY.format(token), lines, _ttl())
+    return lines
+
+
+def describe_guest_cart(lines):
+    """
+    Lines of a guest cart with their variant data, in one query.
+    """
+    variants = {
+        row['id']: row for row in ProductVariant.objects.filter(pk__in=lines).values(
+            'id', 'price', 'stock', 'is_active', 'product_id',
+            'product__name', 'color__name', 'size__name',
+        )
+    }
+    items, subtotal = [], 0
+    for pk, quantity in lines.items():
+        variant = variants.get(pk)
+        if variant is None:
+            continue
+        line_total = variant['price'] * quantity
+        subtotal += line_total
+        items.append({
+            'variant_id': pk,
+            'quantity': quantity,
+            'product_id': variant['product_id'],
+            'product': variant['product__name'],
+            'color': variant['color__name'],
+            'size': variant['size__name'],
+            'price': variant['price'],
+            'stock': variant['stock'],
+            'line_total': line_total,
+            'available': variant['is_active'] and variant['stock'] >= quantity,
+        })
+    return {
+        'item_count': len(items),
+        'total_quantity': sum(item['quantity'] for item in items),
+        'subtotal': subtotal,
+        'items': items,
+    }
+
+
+def merge_guest_cart(user, token):
+    """
+    Move a guest cart into the user's persistent cart with one batched upsert
+    (quantities are added to lines already there), then drop it.
+
+    Lines that no longer fit the stock are skipped and returned as errors
+    rather than blocking the rest. The guest cart stays locked until it is
+    dropped, so no line added meanwhile is lost. Returns ``(merged, skipped)``.
+    """
+    with _locked(token):
+        return _merge_lines(user, token)
+
+
+def _merge_lines(user, token):
+    try:
+        lines = get_guest_lines(token)
+    except GuestCartNotFound:
+        return {}, []
+    cart_id = get_cart_id(user.pk)
+    changes = {pk: ('add', quantity) for pk, quantity in lines.items()}
+    skipped = []
+    merged = {}
+    if changes:
+        try:
+            merged = apply_lines(cart_id, changes)
+        except CartLineError as exc:
+            skipped = exc.errors
+            rejected = {error['variant'] for error in skipped}
+            remaining = {pk: change for pk, change in changes.items() if pk not in rejected}
+            merged = apply_lines(cart_id, remaining) if remaining else {}
+    delete_guest_cart(token)
+    return merged, skipped
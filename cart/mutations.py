@@ -0,0 +1,149 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from products.models import ProductVariant
+from .models import Cart, CartItem
+
+
+class CartLineError(Exception):
+    """
+    Raised when cart lines cannot be applied; ``errors`` lists
+    ``{'variant': id, 'error': message}`` for every rejected line.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(errors)
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return quote(Cart._meta.db_table), quote(CartItem._meta.db_table), quote(ProductVariant._meta.db_table)
+
+
+def get_cart_id(user_id):
+    """
+    Return the id of the user's cart, creating it if needed.
+
+    The common case is a plain ``SELECT``; only a missing cart costs an
+    ``INSERT ... ON CONFLICT DO NOTHING`` (and a second ``SELECT`` when a
+    concurrent request created it first), so cart writes never rewrite or
+    lock the cart row.
+    """
+    cart_id = Cart.objects.filter(user_id=user_id).values_list('pk', flat=True).first()
+    if cart_id is not None:
+        return cart_id
+    cart, _, _ = _tables()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {cart} (user_id, created_at) VALUES (%s, %s) ON CONFLICT (user_id) DO NOTHING RETURNING id",
+            [user_id, timezone.now()],
+        )
+        row = cursor.fetchone()
+    if row is not None:
+        return row[0]
+    return Cart.objects.filter(user_id=user_id).values_list('pk', flat=True).get()
+
+
+def add_item(cart_id, variant_id, quantity, image=None):
+    """
+    Add ``quantity`` units of a variant to a cart with a single
+    ``INSERT ... ON CONFLICT DO UPDATE``. The row is only written when the
+    variant is active and its stock covers the resulting quantity, which also
+    holds when the same line is added concurrently. Returns
+    ``(item_id, quantity)`` or raises ``CartLineError``.
+    """
+    _, item, variant = _tables()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {item} (cart_id, variant_id, quantity, image) "
+            f"SELECT %s, v.id, %s, %s FROM {variant} v WHERE v.id = %s AND v.is_active AND v.stock >= %s "
+            f"ON CONFLICT (cart_id, variant_id) DO UPDATE SET "
+            f"quantity = {item}.quantity + EXCLUDED.quantity, image = COALESCE(EXCLUDED.image, {item}.image) "
+            f"WHERE {item}.quantity + EXCLUDED.quantity <= (SELECT stock FROM {variant} WHERE id = EXCLUDED.variant_id) "
+            f"RETURNING id, quantity",
+            [cart_id, quantity, image, variant_id, quantity],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        raise CartLineError(_explain(cart_id, {variant_id: ('add', quantity)}))
+    return row
+
+
+def apply_lines(cart_id, lines):
+    """
+    Apply many cart lines at once: ``lines`` maps variant id to ``(mode,
+    quantity)`` where mode is ``add`` (increment), ``set`` (absolute
+    quantity, 0 removes the line) or ``remove``.
+
+    Additions go through one ``INSERT ... SELECT ... ON CONFLICT`` over a
+    ``VALUES`` list that increments in SQL, like ``add_item``, so concurrent
+    adds to the same line never lose one; absolute quantities go through a
+    second one and all removals through one ``DELETE``, so the query count
+    does not depend on the number of lines. Either every line is applied or,
+    if any is rejected, none is and ``CartLineError`` lists the rejected
+    ones. Returns ``{variant_id: quantity}`` for the lines written.
+    """
+    removals = [pk for pk, (mode, quantity) in lines.items() if mode == 'remove' or (mode == 'set' and not quantity)]
+    upserts = [(pk, mode, quantity) for pk, (mode, quantity) in lines.items() if mode != 'remove' and quantity > 0]
+    _, item, variant = _tables()
+    # Added lines keep what is already in the cart; set lines replace it.
+    merges = {
+        'add': (
+            f"{item}.quantity + EXCLUDED.quantity",
+            f"WHERE {item}.quantity + EXCLUDED.quantity <= (SELECT stock FROM {variant} WHERE id = EXCLUDED.variant_id)",
+        ),
+        'set': ("EXCLUDED.quantity", ""),
+    }
+
+    with transaction.atomic():
+        written = {}
+        for mode, (quantity_sql, condition) in merges.items():
+            batch = [(pk, quantity) for pk, line_mode, quantity in upserts if line_mode == mode]
+            if not batch:
+                continue
+            values = ', '.join(['(CAST(%s AS bigint), CAST(%s AS integer))'] * len(batch))
+            params = [value for line in batch for value in line]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"WITH lines (variant_id, quantity) AS (VALUES {values}) "
+                    f"INSERT INTO {item} (cart_id, variant_id, quantity, image) "
+                    f"SELECT %s, v.id, l.quantity, NULL FROM lines l JOIN {variant} v ON v.id = l.variant_id "
+                    f"WHERE v.is_active AND v.stock >= l.quantity "
+                    f"ON CONFLICT (cart_id, variant_id) DO UPDATE SET quantity = {quantity_sql} {condition} "
+                    f"RETURNING variant_id, quantity",
+                    params + [cart_id],
+                )
+                written.update(cursor.fetchall())
+
+        rejected = {pk: (mode, quantity) for pk, mode, quantity in upserts if pk not in written}
+        if rejected:
+            # Leaving the atomic block with an exception undoes the accepted lines.
+            raise CartLineError(_explain(cart_id, rejected))
+
+        if removals:
+            CartItem.objects.filter(cart_id=cart_id, variant_id__in=removals).delete()
+    return written
+
+
+def _explain(cart_id, rejected):
+    """
+    Describe why lines were rejected; only runs on the failure path.
+    """
+    variants = {
+        row['pk']: row for row in ProductVariant.objects.filter(pk__in=rejected).values('pk', 'stock', 'is_active')
+    }
+    in_cart = dict(
+        CartItem.objects.filter(cart_id=cart_id, variant_id__in=rejected).values_list('variant_id', 'quantity')
+    )
+    errors = []
+    for pk, (mode, quantity) in rejected.items():
+        found = variants.get(pk)
+        if not found or not found['is_active']:
+            message = "This variant is not available."
+        elif mode == 'add' and in_cart.get(pk):
+            message = f"Only {found['stock']} items available. You already have {in_cart[pk]}."
+        else:
+            message = f"Only {found['stock']} items available."
+        errors.append({'variant': pk, 'error': message})
+    return errors
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from products.serializers import ProductVariantSerializer
+from products.serializers import ProductVariantSerializer, FlatVariantSerializer
+from common.flat import FlatSerializer, Inline, Nested, datetime_value
 from products.models import ProductVariant
 from .models import CartItem, Cart
 
@@ -53,6 +54,38 @@ class CartItemSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class CartLineSerializer(serializers.Serializer):
+    """
+    Input of a single add-to-cart; the variant is checked by the upsert itself.
+    """
+    variant_detail = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    image = serializers.URLField(required=False, allow_null=True)
+
+
+class CartBatchLineSerializer(serializers.Serializer):
+    MODES = ['add', 'set', 'remove']
+
+    variant = serializers.IntegerField(min_value=1)
+    mode = serializers.ChoiceField(choices=MODES, default='set')
+    quantity = serializers.IntegerField(min_value=0, default=0)
+
+    def validate(self, attrs):
+        if attrs['mode'] == 'add' and attrs['quantity'] < 1:
+            raise serializers.ValidationError({"quantity": "You must add at least 1 item."})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    lines = CartBatchLineSerializer(many=True, allow_empty=False)
+
+    def validate_lines(self, lines):
+        variants = [line['variant'] for line in lines]
+        if len(variants) != len(set(variants)):
+            raise serializers.ValidationError("Each variant may appear only once.")
+        return lines
+
+
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
 
@@ -60,3 +93,22 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ['id', 'user', 'created_at', 'items']
         read_only_fields = ['user', 'created_at', 'items']
+
+
+class FlatCartItemSerializer(FlatSerializer):
+    model = CartItem
+    fields = ['id', 'cart', 'variant', 'quantity', 'image']
+    sources = {'cart': ['cart_id']}
+    nested = {'variant': Inline(FlatVariantSerializer, 'variant')}
+
+
+class FlatCartSerializer(FlatSerializer):
+    """
+    ``CartSerializer`` output built from ``.values()`` rows; the items of all
+    carts, with their variant data, are read in one query.
+    """
+    model = Cart
+    fields = ['id', 'user', 'created_at', 'items']
+    sources = {'user': ['user_id']}
+    formats = {'created_at': datetime_value}
+    nested = {'items': Nested(FlatCartItemSerializer, 'cart_id')}
@@ -0,0 +1,87 @@
+import hashlib
+
+from django.db.models import BooleanField, Case, Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils.http import parse_etags
+
+from .models import CartItem
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+AVAILABLE = Q(variant__is_active=True, variant__stock__gte=F('quantity'))
+
+
+def _line_total():
+    return ExpressionWrapper(F('quantity') * F('variant__price'), output_field=MONEY)
+
+
+def _available():
+    return Case(
+        When(AVAILABLE, then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+
+
+def cart_totals(user):
+    """
+    Totals of the user's cart in one aggregate query.
+    """
+    return CartItem.objects.filter(cart__user=user).aggregate(
+        cart_id=Max('cart_id'),
+        item_count=Count('id'),
+        total_quantity=Coalesce(Sum('quantity'), 0),
+        subtotal=Coalesce(Sum(_line_total()), Value(0), output_field=MONEY),
+        unavailable=Count('id', filter=~AVAILABLE),
+    )
+
+
+def cart_etag(lines):
+    """
+    Strong ETag over the ordered ``cart_lines`` rows. Every other field of
+    the snapshot is derived from them, so the tag changes whenever anything
+    the buyer sees changes (a quantity, a price, the stock, availability).
+    """
+    # str() rather than repr(): images are CloudinaryResource objects without a stable repr.
+    rows = [[(key, str(value)) for key, value in sorted(line.items())] for line in lines]
+    return '"{}"'.format(hashlib.md5(repr(rows).encode()).hexdigest())
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Whether an ``If-None-Match`` header matches ``etag``: ``*`` or any of its
+    comma-separated entity tags, compared weakly (a ``W/`` prefix is ignored).
+    """
+    tags = parse_etags(if_none_match or '')
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def cart_lines(user):
+    """
+    Every line of the user's cart with its variant data, line total and
+    availability computed by the database, in one query.
+    """
+    return list(
+        CartItem.objects.filter(cart__user=user).order_by('id').values(
+            'id', 'variant_id', 'quantity', 'image',
+            product_id=F('variant__product_id'),
+            product=F('variant__product__name'),
+            color=F('variant__color__name'),
+            size=F('variant__size__name'),
+            price=F('variant__price'),
+            stock=F('variant__stock'),
+            line_total=_line_total(),
+            available=_available(),
+        )
+    )
+
+
+def build_snapshot(user, lines=None):
+    totals = cart_totals(user)
+    return {
+        'cart_id': totals['cart_id'],
+        'item_count': totals['item_count'],
+        'total_quantity': totals['total_quantity'],
+        'subtotal': totals['subtotal'],
+        'all_available': not totals['unavailable'],
+        'items': cart_lines(user) if lines is None else lines,
+    }
@@ -1,3 +1,130 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from products.models import Color, Product, ProductVariant, Size
+from users.models import User
+from .guest import GuestCartBusy, _locked, create_guest_cart, get_guest_lines, update_guest_cart
+from .models import Cart, CartItem
+from .mutations import CartLineError, add_item, apply_lines, get_cart_id
+
+
+class CartMutationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer@example.com', 'pass', first_name='B', last_name='C')
+        product = Product.objects.create(name='Shirt', description='Cotton')
+        color = Color.objects.create(name='Red')
+        self.small, self.large = (
+            ProductVariant.objects.create(product=product, color=color, size=Size.objects.create(name=name),
+                                          stock=5, price=10)
+            for name in ('S', 'L')
+        )
+
+    def test_get_cart_id_reuses_the_cart(self):
+        cart_id = get_cart_id(self.user.pk)
+
+        self.assertEqual(get_cart_id(self.user.pk), cart_id)
+        self.assertEqual(Cart.objects.get().pk, cart_id)
+
+    def test_batch_add_increments_existing_lines(self):
+        cart_id = get_cart_id(self.user.pk)
+        add_item(cart_id, self.small.pk, 2)
+
+        written = apply_lines(cart_id, {self.small.pk: ('add', 2), self.large.pk: ('set', 4)})
+        self.assertEqual(written, {self.small.pk: 4, self.large.pk: 4})
+
+        written = apply_lines(cart_id, {self.small.pk: ('add', 1), self.large.pk: ('set', 1)})
+        self.assertEqual(written, {self.small.pk: 5, self.large.pk: 1})
+
+    def test_batch_add_over_stock_rejects_every_line(self):
+        cart_id = get_cart_id(self.user.pk)
+        add_item(cart_id, self.small.pk, 4)
+
+        with self.assertRaises(CartLineError) as raised:
+            apply_lines(cart_id, {self.small.pk: ('add', 2), self.large.pk: ('add', 1)})
+
+        self.assertEqual([error['variant'] for error in raised.exception.errors], [self.small.pk])
+        self.assertEqual(dict(CartItem.objects.values_list('variant_id', 'quantity')), {self.small.pk: 4})
+
+
+class CartSnapshotETagTests(APITestCase):
+    url = '/cart/api/cart/snapshot/'
+
+    def setUp(self):
+        self.user = User.objects.create_user('buyer@example.com', 'pass', first_name='B', last_name='C')
+        self.client.force_authenticate(self.user)
+        product = Product.objects.create(name='Shirt', description='Cotton')
+        color = Color.objects.create(name='Red')
+        self.variants = [
+            ProductVariant.objects.create(product=product, color=color, size=Size.objects.create(name=name),
+                                          stock=5, price=10)
+            for name in ('S', 'M', 'L')
+        ]
+        cart = Cart.objects.create(user=self.user)
+        self.items = [
+            CartItem.objects.create(cart=cart, variant=variant, quantity=quantity)
+            for variant, quantity in zip(self.variants, (2, 1, 2))
+        ]
+
+    def etag(self):
+        return self.client.get(self.url)['ETag']
+
+    def test_matching_tags_get_304(self):
+        etag = self.etag()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        for header in (etag, f'"other", {etag}', f'W/{etag}', '*'):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=header).status_code, 304, header)
+        for header in (f'"x{etag[1:-1]}x"', f'"{etag}"', '"other"'):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=header).status_code, 200, header)
+
+    def test_quantities_with_the_same_totals_change_the_tag(self):
+        before = self.etag()
+        for item, quantity in zip(self.items, (1, 3, 1)):
+            CartItem.objects.filter(pk=item.pk).update(quantity=quantity)
+
+        self.assertNotEqual(self.etag(), before)
+
+    def test_stock_above_the_line_quantity_changes_the_tag(self):
+        before = self.etag()
+        ProductVariant.objects.filter(pk=self.variants[0].pk).update(stock=9)
+
+        self.assertNotEqual(self.etag(), before)
+
+    def test_price_change_invalidates_a_cached_snapshot(self):
+        before = self.etag()
+        ProductVariant.objects.filter(pk=self.variants[0].pk).update(price=12)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=before)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], before)
+        self.assertEqual(response.json()['subtotal'], 54)
+
+
+class GuestCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product = Product.objects.create(name='Shirt', description='Cotton')
+        self.variant = ProductVariant.objects.create(
+            product=product, color=Color.objects.create(name='Red'), size=Size.objects.create(name='M'),
+            stock=5, price=10,
+        )
+        self.token = create_guest_cart()
+
+    def test_adds_accumulate(self):
+        update_guest_cart(self.token, {self.variant.pk: ('add', 1)})
+        update_guest_cart(self.token, {self.variant.pk: ('add', 2)})
+
+        self.assertEqual(get_guest_lines(self.token), {self.variant.pk: 3})
+
+    def test_update_waits_for_the_cart_lock(self):
+        with mock.patch('cart.guest.LOCK_WAIT', 0.05):
+            with _locked(self.token):
+                with self.assertRaises(GuestCartBusy):
+                    update_guest_cart(self.token, {self.variant.pk: ('add', 1)})
+            update_guest_cart(self.token, {self.variant.pk: ('add', 1)})
 
-# Create your tests here.
+        self.assertEqual(get_guest_lines(self.token), {self.variant.pk: 1})
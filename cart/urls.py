@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CartViewSet, CartItemViewSet
+from .views import CartViewSet, CartItemViewSet, GuestCartViewSet
 
 router = DefaultRouter()
 router.register(r'cart', CartViewSet, basename='cart')
 router.register(r'cart-items', CartItemViewSet, basename='cart-items')
+router.register(r'guest-cart', GuestCartViewSet, basename='guest-cart')
 
 urlpatterns = [
     path('', include(router.urls)),
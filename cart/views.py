@@ -1,20 +1,34 @@
 from rest_framework import viewsets, permissions, serializers, status
 from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from .models import Cart, CartItem
-from .serializers import CartSerializer, CartItemSerializer
+from common.flat import FlatReadMixin
+from .serializers import CartSerializer, CartItemSerializer, CartLineSerializer, CartBatchSerializer, FlatCartSerializer
+from .mutations import CartLineError, add_item, apply_lines, get_cart_id
+from .snapshot import build_snapshot, cart_etag, cart_lines, etag_matches
+from .guest import (
+    GuestCartBusy, GuestCartNotFound, create_guest_cart, delete_guest_cart, describe_guest_cart,
+    get_guest_lines, merge_guest_cart, update_guest_cart
+)
 
 
-class CartViewSet(viewsets.ReadOnlyModelViewSet):
+class CartViewSet(FlatReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing the authenticated user's cart.
 
     - Authenticated users can view their own cart.
     - Admins can view all user carts.
     - No updates or deletions are allowed through this view.
+    - JSON list and detail responses are built from `.values()` rows by `FlatCartSerializer`.
+    - `GET cart/snapshot/` returns the caller's cart with subtotal, item count and
+      per-line availability computed in SQL, in two queries. It sends an ETag;
+      a matching `If-None-Match` gets 304 after the single lines query.
     """
     serializer_class = CartSerializer
+    flat_serializer_class = FlatCartSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -24,16 +38,31 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
         """
         if getattr(self, 'swagger_fake_view', False):
             return Cart.objects.none()
+        queryset = Cart.objects.prefetch_related(Prefetch(
+            'items',
+            queryset=CartItem.objects.select_related('variant__product', 'variant__color', 'variant__size')
+        )).order_by('id')
         user = self.request.user
         if user.is_staff:
-            return Cart.objects.all()
-        return Cart.objects.filter(user=user)
+            return queryset
+        return queryset.filter(user=user)
 
     def get_object(self):
         """
         Retrieves the authenticated user's cart.
         """
-        return get_object_or_404(Cart, user=self.request.user)
+        return get_object_or_404(self.filter_queryset(self.get_queryset()), user=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """
+        The caller's cart with server-computed totals; honours If-None-Match.
+        """
+        lines = cart_lines(request.user)
+        etag = cart_etag(lines)
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(build_snapshot(request.user, lines), headers={'ETag': etag})
 
     @action(detail=False, methods=['delete'], url_path='clear')
     def clear_cart(self, request):
@@ -51,6 +80,9 @@ class CartItemViewSet(viewsets.ModelViewSet):
 
     - Users can only access their own cart items.
     - Admins can view all carts but not cart items of other users.
+    - Adding an item is a single `INSERT ... ON CONFLICT DO UPDATE` guarded by stock,
+      so repeated or concurrent adds of the same variant merge into one line.
+    - `POST cart-items/batch/` applies many lines with a constant number of queries.
     """
     serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -67,29 +99,48 @@ class CartItemViewSet(viewsets.ModelViewSet):
             return Cart.objects.none()
         return queryset.filter(cart__user=self.request.user)
 
-    def perform_create(self, serializer):
-        cart, _ = Cart.objects.get_or_create(user=self.request.user)
-        variant = serializer.validated_data['variant']
-        quantity = serializer.validated_data['quantity']
-        image = serializer.validated_data.get('image')
-
-        existing_item = CartItem.objects.filter(cart=cart, variant=variant).first()
-
-        if existing_item:
-            new_quantity = existing_item.quantity + quantity
-            if new_quantity > variant.stock:
-                raise serializers.ValidationError(
-                    f"Only {variant.stock} items available. You already have {existing_item.quantity}."
-                )
-            existing_item.quantity = new_quantity
-            existing_item.save()
-        else:
-            if quantity > variant.stock:
-                raise serializers.ValidationError(
-                    f"Only {variant.stock} items available."
-                )
-            serializer.save(cart=cart, image=image)
+    def create(self, request, *args, **kwargs):
+        """
+        Adds a variant to the cart, or increases its quantity, with one guarded upsert.
+        """
+        line = CartLineSerializer(data=request.data)
+        line.is_valid(raise_exception=True)
+        cart_id = get_cart_id(request.user.pk)
+        try:
+            item_id, _ = add_item(
+                cart_id,
+                line.validated_data['variant_detail'],
+                line.validated_data['quantity'],
+                line.validated_data.get('image'),
+            )
+        except CartLineError as exc:
+            raise serializers.ValidationError(exc.errors[0]['error'])
+        item = self.get_queryset().get(pk=item_id)
+        return Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Adds, sets or removes many lines in one request, all or nothing.
 
+        Body: `{"lines": [{"variant": 12, "mode": "add|set|remove", "quantity": 2}, ...]}`;
+        `set` with quantity 0 removes the line.
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = {
+            line['variant']: (line['mode'], line['quantity'])
+            for line in serializer.validated_data['lines']
+        }
+        cart_id = get_cart_id(request.user.pk)
+        try:
+            written = apply_lines(cart_id, lines)
+        except CartLineError as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'items': [{'variant': pk, 'quantity': quantity} for pk, quantity in written.items()],
+            'removed': [pk for pk in lines if pk not in written],
+        })
 
     def perform_update(self, serializer):
         instance = serializer.instance
@@ -110,3 +161,69 @@ class CartItemViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied('You do not have permission to delete this cart item.')
         instance.delete()
 
+
+class GuestCartViewSet(viewsets.ViewSet):
+    """
+    API endpoint for carts of visitors who are not logged in.
+
+    - `POST guest-cart/` starts a cart and returns its token.
+    - `GET guest-cart/{token}/` shows its lines with prices and availability.
+    - `POST guest-cart/{token}/lines/` adds, sets or removes lines (same body as `cart-items/batch/`).
+    - `DELETE guest-cart/{token}/` drops it.
+    - `POST guest-cart/{token}/merge/` (authenticated) moves it into the user's cart.
+
+    Guest carts are kept in the cache with a TTL, never in the database, until they are merged.
+    """
+    permission_classes = [permissions.AllowAny]
+    lookup_field = 'token'
+    lookup_value_regex = '[A-Za-z0-9_-]+'
+
+    def _lines(self, token):
+        try:
+            return get_guest_lines(token)
+        except GuestCartNotFound:
+            raise NotFound("Guest cart not found or expired.")
+
+    def create(self, request):
+        token = create_guest_cart()
+        return Response({'token': token, **describe_guest_cart({})}, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, token=None):
+        return Response({'token': token, **describe_guest_cart(self._lines(token))})
+
+    def destroy(self, request, token=None):
+        delete_guest_cart(token)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def lines(self, request, token=None):
+        self._lines(token)
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = {
+            line['variant']: (line['mode'], line['quantity'])
+            for line in serializer.validated_data['lines']
+        }
+        try:
+            lines = update_guest_cart(token, changes)
+        except GuestCartNotFound:
+            raise NotFound("Guest cart not found or expired.")
+        except GuestCartBusy:
+            return Response({'error': "The cart is being updated; try again."}, status=status.HTTP_409_CONFLICT)
+        except CartLineError as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'token': token, **describe_guest_cart(lines)})
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def merge(self, request, token=None):
+        try:
+            merged, skipped = merge_guest_cart(request.user, token)
+        except GuestCartBusy:
+            return Response({'error': "The cart is being updated; try again."}, status=status.HTTP_409_CONFLICT)
+        except CartLineError as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'merged': [{'variant': pk, 'quantity': quantity} for pk, quantity in merged.items()],
+            'skipped': skipped,
+        })
+
@@ -1,3 +1,18 @@
 from django.contrib import admin
+from .models import EmailJob, UploadJob
 
-# Register your models here.
+
+@admin.register(EmailJob)
+class EmailJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'object_id', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('object_id', 'last_error')
+    readonly_fields = ('created_at', 'sent_at', 'locked_by', 'locked_at')
+
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'model', 'object_id', 'field', 'status', 'attempts', 'available_at', 'finished_at')
+    list_filter = ('status', 'model')
+    search_fields = ('object_id', 'original_name', 'last_error')
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_at')
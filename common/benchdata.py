@@ -0,0 +1,341 @@
+import random
+from array import array
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Max
+from django.utils import timezone
+
+from cart.models import Cart, CartItem
+from orders.models import Order, OrderItem
+from products.cache import bump_product_version
+from products.models import RATING_STARS, Brand, Category, Color, Product, ProductImage, ProductVariant, Size
+from reviews.models import Review
+from reviews.ratings import HISTOGRAM_FIELDS, _average
+from users.models import User
+from wishlist.models import Wishlist, WishlistItem
+from .seeding import batched
+
+
+# The full "large catalog"; --scale multiplies every size.
+DEFAULT_SIZES = {
+    'users': 100_000,
+    'products': 100_000,
+    'variants': 1_000_000,
+    'reviews': 5_000_000,
+    'orders': 2_000_000,
+}
+
+BENCH_EMAIL = 'bench-{}@example.com'
+BENCH_ADMIN_EMAIL = 'bench-admin@example.com'
+# Buyers of the checkout benchmark, kept apart from the generated customers.
+BENCH_BUYER_EMAIL = 'bench-buyer-{}@example.com'
+
+ADJECTIVES = ['classic', 'slim', 'relaxed', 'cotton', 'linen', 'denim', 'wool', 'printed', 'striped', 'casual',
+              'formal', 'vintage', 'organic', 'lightweight', 'oversized', 'cropped', 'embroidered', 'knitted']
+NOUNS = ['shirt', 'tshirt', 'polo', 'jeans', 'chinos', 'jacket', 'hoodie', 'sweater', 'dress', 'skirt',
+         'kurta', 'panjabi', 'saree', 'blazer', 'shorts', 'trousers', 'cardigan', 'scarf']
+FILLER = ['comfortable', 'breathable', 'everyday', 'tailored', 'soft', 'durable', 'premium', 'fabric', 'fit',
+          'wash', 'summer', 'winter', 'season', 'style', 'collection', 'pattern', 'colour', 'detail']
+QUERIES = ['cotton shirt', 'slim jeans', 'wool sweater', 'embroidered panjabi', 'breathable summer dress',
+           'vintage denim jacket', 'shrit', 'hoddie', 'trousres', 'premium linen blazer']
+
+CATEGORIES = ['Shirts', 'T-Shirts', 'Jeans', 'Trousers', 'Jackets', 'Sweaters', 'Dresses', 'Skirts', 'Ethnic',
+              'Activewear', 'Sleepwear', 'Accessories']
+COLORS = ['Black', 'White', 'Navy', 'Grey', 'Red', 'Green', 'Beige', 'Brown', 'Blue', 'Pink']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+# Reviews lean positive, like real ones.
+RATING_WEIGHTS = {0: 1, 1: 4, 2: 6, 3: 15, 4: 34, 5: 40}
+ORDER_STATUSES = [('delivered', 'paid', 70), ('shipped', 'paid', 8), ('processing', 'paid', 7),
+                  ('pending', 'unpaid', 10), ('cancelled', 'unpaid', 5)]
+HISTORY_DAYS = 730
+
+PRODUCT_COLUMNS = [
+    'id', 'sku', 'name', 'target_audience', 'description', 'category_id', 'brand_id', 'is_active', 'created_at',
+    'average_rating', 'rating_count', 'rating_sum', *HISTOGRAM_FIELDS,
+]
+VARIANT_COLUMNS = ['id', 'product_id', 'color_id', 'size_id', 'stock', 'price', 'is_active', 'sku']
+IMAGE_COLUMNS = ['product_id', 'image', 'alt_text', 'is_primary', 'uploaded_at', 'image_url', 'renditions']
+REVIEW_COLUMNS = ['product_id', 'user_id', 'rating', 'comment', 'created_at', 'updated_at']
+ORDER_COLUMNS = [
+    'id', 'user_id', 'status', 'payment_status', 'total_price', 'tran_id', 'shipping_address', 'created_at',
+    'updated_at',
+]
+ORDER_ITEM_COLUMNS = ['order_id', 'variant_id', 'quantity', 'price']
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def reset_sequences(*models):
+    # Rows were inserted with explicit ids; PostgreSQL sequences must catch up.
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def _converter(field, db):
+    kind = field.get_internal_type()
+    if kind == 'DateTimeField':
+        return db.ops.adapt_datetimefield_value
+    if kind == 'DecimalField':
+        return lambda value: db.ops.adapt_decimalfield_value(value, field.max_digits, field.decimal_places)
+    if kind == 'JSONField':
+        return lambda value: field.get_db_prep_save(value, db)
+    return None
+
+
+def insert_rows(model, columns, rows, batch_size):
+    """
+    Insert tuples of ``columns`` values with multi-row ``INSERT`` statements.
+
+    Skips model instances and ``bulk_create``'s per-value preparation, which
+    dominate the cost of generating millions of rows; only the columns that
+    need it (dates, decimals, JSON) go through their field's conversion.
+    """
+    if not rows:
+        return
+    fields = [model._meta.get_field(column) for column in columns]
+    db = connections[DEFAULT_DB_ALIAS]
+    convert = [_converter(field, db) for field in fields]
+    quote = db.ops.quote_name
+    head = (
+        f"INSERT INTO {quote(model._meta.db_table)} "
+        f"({', '.join(quote(field.column) for field in fields)}) VALUES "
+    )
+    row_sql = f"({', '.join(['%s'] * len(fields))})"
+    size = max(1, min(batch_size, db.ops.bulk_batch_size(fields, rows)))
+    with db.cursor() as cursor:
+        for batch in batched(rows, size):
+            params = [
+                value if fn is None else fn(value)
+                for row in batch
+                for fn, value in zip(convert, row)
+            ]
+            cursor.execute(head + ', '.join([row_sql] * len(batch)), params)
+
+
+class DatasetGenerator:
+    """
+    Bulk-inserts a synthetic catalog with its customers and their activity.
+
+    Tables are topped up to the requested sizes, so a run on an existing
+    dataset only adds what is missing. Children are generated with their
+    parents: variants, images and reviews with new products, carts and
+    wishlists with new users, items with new orders. Rows go in with
+    ``bulk_create``, or as plain multi-row ``INSERT``s with precomputed ids
+    for the large tables, and bypass the model signals: rating counters are
+    computed along with the reviews, and the other derived tables
+    (summaries, customer stats, sales rollup) are rebuilt at the end.
+    """
+
+    def __init__(self, sizes, seed=42, batch_size=5000, log=None):
+        self.sizes = sizes
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.seeded = False
+
+    def run(self):
+        self.seed_taxonomy()
+        self.seed_users()
+        self.seed_products()
+        self.seed_orders()
+        if self.seeded:
+            self.rebuild_derived()
+        return dataset_counts()
+
+    def timestamp(self):
+        return self.now - timedelta(seconds=self.rng.randrange(HISTORY_DAYS * 86400))
+
+    def seed_taxonomy(self):
+        self.categories = [Category.objects.get_or_create(name=name)[0].pk for name in CATEGORIES]
+        self.brands = [Brand.objects.get_or_create(name=f'Benchmark {n:02d}')[0].pk for n in range(40)]
+        colors = [Color.objects.get_or_create(name=name)[0].pk for name in COLORS]
+        sizes = [Size.objects.get_or_create(name=name)[0].pk for name in SIZES]
+        self.options = [(color, size) for color in colors for size in sizes]
+        User.objects.get_or_create(
+            email=BENCH_ADMIN_EMAIL,
+            defaults={'first_name': 'Bench', 'last_name': 'Admin', 'is_active': True, 'is_staff': True},
+        )
+
+    def seed_users(self):
+        existing = bench_users().count()
+        missing = self.sizes['users'] - existing
+        if missing > 0:
+            self.log(f"Seeding {missing} users...")
+            self.seeded = True
+            password = make_password(None)
+            rows = (
+                User(
+                    email=BENCH_EMAIL.format(n), first_name='Bench', last_name=str(n), is_active=True,
+                    password=password, date_joined=self.timestamp(),
+                )
+                for n in range(existing, existing + missing)
+            )
+            for batch in batched(rows, self.batch_size):
+                User.objects.bulk_create(batch)
+        self.users = array('q', bench_users().order_by('pk').values_list('pk', flat=True))
+        self.seed_carts_and_wishlists()
+
+    def seed_carts_and_wishlists(self):
+        variants = list(ProductVariant.objects.order_by('?').values_list('pk', flat=True)[:20_000])
+        if not variants:
+            # First run: carts are filled once the catalog exists.
+            self._pending_carts = True
+            return
+        self._pending_carts = False
+        with_cart = set(Cart.objects.values_list('user_id', flat=True))
+        with_wishlist = set(Wishlist.objects.values_list('user_id', flat=True))
+        users = [pk for pk in self.users if pk not in with_cart or pk not in with_wishlist]
+        if not users:
+            return
+        self.seeded = True
+        self.log(f"Seeding carts and wishlists of {len(users)} users...")
+        for batch in batched(users, self.batch_size):
+            carts = Cart.objects.bulk_create([Cart(user_id=pk) for pk in batch if pk not in with_cart])
+            wishlists = Wishlist.objects.bulk_create([Wishlist(user_id=pk) for pk in batch if pk not in with_wishlist])
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, variant_id=variant, quantity=self.rng.randint(1, 3))
+                for cart in carts
+                for variant in self.rng.sample(variants, min(len(variants), self.rng.randint(0, 4)))
+            ])
+            WishlistItem.objects.bulk_create([
+                WishlistItem(wishlist=wishlist, variant_id=variant)
+                for wishlist in wishlists
+                for variant in self.rng.sample(variants, min(len(variants), self.rng.randint(0, 5)))
+            ])
+
+    def fake_product(self, pk, sku, created_at, reviews):
+        rng = self.rng
+        name = f"{rng.choice(ADJECTIVES).title()} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        description = ' '.join(rng.choice(ADJECTIVES + NOUNS + FILLER) for _ in range(rng.randint(20, 60)))
+        # The rating counters are written with the product instead of being rebuilt afterwards.
+        stars = [review[2] for review in reviews]
+        return (
+            pk, sku, name, rng.choice(['men', 'women', 'kids']), description, rng.choice(self.categories),
+            rng.choice(self.brands), True, created_at, _average(sum(stars), len(stars)), len(stars), sum(stars),
+            *(stars.count(rating) for rating in RATING_STARS),
+        )
+
+    def seed_products(self):
+        existing = Product.objects.count()
+        missing = self.sizes['products'] - existing
+        if missing > 0:
+            per_product = min(len(self.options), max(1, round(self.sizes['variants'] / self.sizes['products'])))
+            reviews_per_product = min(len(self.users), round(self.sizes['reviews'] / self.sizes['products']))
+            self.log(f"Seeding {missing} products with {per_product} variants and {reviews_per_product} reviews each...")
+            self.seeded = True
+            product_id = next_id(Product)
+            variant_id = next_id(ProductVariant)
+            chunk = max(1, self.batch_size // max(per_product, reviews_per_product, 1))
+            for start in range(0, missing, chunk):
+                count = min(chunk, missing - start)
+                self.seed_product_batch(
+                    range(product_id + start, product_id + start + count), existing + start,
+                    variant_id + start * per_product, per_product, reviews_per_product,
+                )
+                if (start + count) % 10_000 < count:
+                    self.log(f"  {start + count}/{missing} products")
+            reset_sequences(Product, ProductVariant, ProductImage, Review)
+        if self._pending_carts:
+            self.seed_carts_and_wishlists()
+
+    def seed_product_batch(self, product_ids, offset, variant_id, per_product, reviews_per_product):
+        rng = self.rng
+        ratings, weights = list(RATING_WEIGHTS), list(RATING_WEIGHTS.values())
+        products, variants, images, reviews = [], [], [], []
+        for n, pk in enumerate(product_ids):
+            sku = f'BENCH-{offset + n}'
+            created_at = self.timestamp()
+            product_reviews = []
+            stars = rng.choices(ratings, weights=weights, k=reviews_per_product)
+            for user, rating in zip(rng.sample(self.users, reviews_per_product), stars):
+                reviewed_at = created_at + (self.now - created_at) * rng.random()
+                comment = ' '.join(rng.choice(FILLER) for _ in range(rng.randint(3, 25)))
+                product_reviews.append((pk, user, rating, comment, reviewed_at, reviewed_at))
+            products.append(self.fake_product(pk, sku, created_at, product_reviews))
+            reviews += product_reviews
+            for i, (color, size) in enumerate(rng.sample(self.options, per_product)):
+                variants.append((
+                    variant_id, pk, color, size, 0 if rng.random() < 0.05 else rng.randint(1, 500),
+                    Decimal(rng.randint(500, 15_000)) / 100, True, f'{sku}-{i}',
+                ))
+                variant_id += 1
+            images.append((pk, f'image/upload/v1/bench/{sku.lower()}.jpg', '', True, created_at, '', {}))
+        insert_rows(Product, PRODUCT_COLUMNS, products, self.batch_size)
+        insert_rows(ProductVariant, VARIANT_COLUMNS, variants, self.batch_size)
+        insert_rows(ProductImage, IMAGE_COLUMNS, images, self.batch_size)
+        insert_rows(Review, REVIEW_COLUMNS, reviews, self.batch_size)
+
+    def seed_orders(self):
+        missing = self.sizes['orders'] - Order.objects.count()
+        if missing <= 0 or not self.users:
+            return
+        self.seeded = True
+        self.log(f"Seeding {missing} orders...")
+        # Prices as integer cents keep a million variants compact in memory.
+        variant_ids, prices = array('q'), array('q')
+        for pk, price in ProductVariant.objects.order_by().values_list('pk', 'price').iterator(chunk_size=20_000):
+            variant_ids.append(pk)
+            prices.append(int(price * 100))
+        if not variant_ids:
+            return
+        statuses = [(status, payment) for status, payment, _ in ORDER_STATUSES]
+        weights = [weight for _, _, weight in ORDER_STATUSES]
+        rng = self.rng
+        order_id = next_id(Order)
+        for start in range(0, missing, self.batch_size):
+            orders, items = [], []
+            for _ in range(min(self.batch_size, missing - start)):
+                picks = list(dict.fromkeys(rng.randrange(len(variant_ids)) for _ in range(rng.randint(1, 4))))
+                quantities = [rng.randint(1, 3) for _ in picks]
+                status, payment = rng.choices(statuses, weights=weights)[0]
+                created_at = self.timestamp()
+                total = Decimal(sum(prices[i] * q for i, q in zip(picks, quantities))) / 100
+                orders.append((
+                    order_id, rng.choice(self.users), status, payment, total, None, 'Benchmark street',
+                    created_at, created_at,
+                ))
+                items += [(order_id, variant_ids[i], q, Decimal(prices[i]) / 100) for i, q in zip(picks, quantities)]
+                order_id += 1
+            insert_rows(Order, ORDER_COLUMNS, orders, self.batch_size)
+            insert_rows(OrderItem, ORDER_ITEM_COLUMNS, items, self.batch_size)
+            if (start + len(orders)) % 100_000 < len(orders):
+                self.log(f"  {start + len(orders)}/{missing} orders")
+        reset_sequences(Order, OrderItem)
+
+    def rebuild_derived(self):
+        self.log("Rebuilding summaries, customer stats and the sales rollup...")
+        for command in ('rebuild_product_summaries', 'rebuild_customer_stats', 'rebuild_sales_rollup'):
+            call_command(command, verbosity=0)
+        bump_product_version(None)
+
+
+def bench_users():
+    return (
+        User.objects.filter(email__startswith='bench-')
+        .exclude(email=BENCH_ADMIN_EMAIL)
+        .exclude(email__startswith=BENCH_BUYER_EMAIL.split('{')[0])
+    )
+
+
+def dataset_counts():
+    return {
+        'users': User.objects.count(),
+        'products': Product.objects.count(),
+        'variants': ProductVariant.objects.count(),
+        'reviews': Review.objects.count(),
+        'orders': Order.objects.count(),
+        'order_items': OrderItem.objects.count(),
+        'cart_items': CartItem.objects.count(),
+        'wishlist_items': WishlistItem.objects.count(),
+    }
@@ -0,0 +1,379 @@
+import functools
+import re
+from collections import defaultdict
+from decimal import Decimal
+
+from cloudinary import CloudinaryResource
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import BasePermission
+
+# Public ids the SDK would leave untouched when building a URL.
+PLAIN_PATH = re.compile(r'^[A-Za-z0-9_./-]+$')
+
+
+def datetime_value(value):
+    """
+    Format a datetime exactly like DRF's ``DateTimeField``.
+    """
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    text = value.isoformat()
+    if text.endswith('+00:00'):
+        text = text[:-6] + 'Z'
+    return text
+
+
+@functools.lru_cache(maxsize=8)
+def _quantum(places):
+    return Decimal(1).scaleb(-places)
+
+
+def decimal_value(value, places=2):
+    """
+    Format a decimal exactly like DRF's ``DecimalField`` (coerced to string).
+    """
+    if value is None:
+        return None
+    return '{:f}'.format(Decimal(value).quantize(_quantum(places)))
+
+
+@functools.lru_cache(maxsize=1)
+def _cloudinary_prefix():
+    probe = 'image/upload/v1/probe'
+    url = CloudinaryResource('probe', version='1', type='upload', resource_type='image').url
+    return url[:-len(probe)] if url.endswith(probe) else None
+
+
+def image_url(value):
+    """
+    URL of a ``CloudinaryField`` value, as returned by ``value.url``.
+
+    Building the URL through the Cloudinary SDK costs tens of microseconds per
+    image; plain versioned uploads only need the delivery prefix, which is
+    computed once. Anything else (transformations, unversioned or non-upload
+    resources, ids needing escaping, plain strings) goes through the SDK.
+    """
+    if not value:
+        return None
+    if not isinstance(value, CloudinaryResource):
+        return str(value)
+    prefix = _cloudinary_prefix()
+    if prefix and value.version and value.type == 'upload' and not value.url_options:
+        path = value.get_prep_value()
+        if PLAIN_PATH.match(path):
+            return prefix + path
+    return value.url
+
+
+def _tree(value, leaf):
+    """
+    Parse ``a,b.c,b.d`` into ``{'a': leaf, 'b': {'c': leaf, 'd': leaf}}``.
+    """
+    if not value:
+        return None
+    tree = {}
+    for path in value.split(','):
+        parts = [part.strip() for part in path.split('.')]
+        if not all(parts):
+            continue
+        node = tree
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                break
+            node = node.setdefault(part, {})
+        else:
+            if leaf is None:
+                node[parts[-1]] = None
+            else:
+                node.setdefault(parts[-1], {})
+    return tree
+
+
+class Fieldset:
+    """
+    Fields asked for with ``?fields=`` and ``?expand=``.
+
+    ``fields=id,name,variants.price`` keeps only the named fields, a dotted
+    name selecting inside a nested field. ``expand=images`` embeds only the
+    listed nested fields and gives the others as ids; ``items.variant``
+    expands one level further. A missing parameter keeps everything.
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_query(cls, params):
+        return cls(_tree(params.get('fields'), None), _tree(params.get('expand'), {}))
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.expand is None or name in self.expand
+
+    def nested(self, name):
+        return Fieldset(
+            None if self.fields is None else self.fields.get(name),
+            None if self.expand is None else self.expand.get(name, {}),
+        )
+
+    def check(self, names, expandable, path=''):
+        errors = {}
+        unknown = []
+        for name, subtree in (self.fields or {}).items():
+            if name not in names:
+                unknown.append(path + name)
+            elif subtree is not None and name not in expandable:
+                unknown += [f'{path}{name}.{child}' for child in subtree]
+        if unknown:
+            errors['fields'] = [f"Unknown field(s): {', '.join(unknown)}."]
+        unknown = [path + name for name in (self.expand or {}) if name not in expandable]
+        if unknown:
+            errors['expand'] = [f"Not expandable: {', '.join(unknown)}."]
+        if errors:
+            raise ValidationError(errors)
+
+
+class Nested:
+    """
+    A nested collection (e.g. a product's images), read for a whole page with
+    one query on ``parent_field``. Given as a list of ids when not expanded.
+
+    ``limit`` (an int, or a callable returning one) keeps only the first rows
+    of each parent, cut in SQL with a ``ROW_NUMBER()`` window.
+    """
+
+    def __init__(self, serializer_class, parent_field, limit=None):
+        self.serializer_class = serializer_class
+        self.parent_field = parent_field
+        self.limit = limit
+
+    def load(self, parent, name, keys):
+        serializer_class = self.serializer_class
+        queryset = serializer_class.model._default_manager.filter(**{f'{self.parent_field}__in': keys})
+        ordering = serializer_class.ordering or serializer_class.model._meta.ordering
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        limit = self.limit() if callable(self.limit) else self.limit
+        if limit is not None:
+            queryset = queryset.annotate(nested_row=Window(
+                RowNumber(), partition_by=[F(self.parent_field)], order_by=list(ordering or ['pk']),
+            )).filter(nested_row__lte=limit)
+        groups = defaultdict(list)
+        if not parent.fieldset.expands(name):
+            for pk, parent_id in queryset.values_list('pk', self.parent_field):
+                groups[parent_id].append(pk)
+            return groups
+        child = serializer_class(
+            context=parent.context, fieldset=parent.fieldset.nested(name), path=f'{parent.path}{name}.'
+        )
+        rows = list(child.get_rows(queryset, extra=[self.parent_field]))
+        related = child.load_related(rows) if rows else {}
+        for row in rows:
+            groups[row[self.parent_field]].append(child.to_representation(row, related))
+        return groups
+
+
+class Inline:
+    """
+    A nested object read from the parent's own row through a join (e.g. the
+    variant of an order item). Given as its id when not expanded.
+    """
+
+    def __init__(self, serializer_class, relation):
+        self.serializer_class = serializer_class
+        self.relation = relation
+
+
+class FlatSerializer:
+    """
+    Read-only serializer building plain dicts straight from ``.values()`` rows.
+
+    ``fields`` lists the output in order; each reads the columns given in
+    ``sources`` (default: the column of the same name), optionally passed
+    through ``formats[name]``, or is built by a ``get_<name>(row)`` method.
+    ``nested`` maps fields to ``Nested`` collections (one query per page) or
+    ``Inline`` objects (joined into the same row). The output is meant to be
+    identical to the ``ModelSerializer`` it stands in for, without model
+    instances and per-field dispatch.
+
+    A ``Fieldset`` (``?fields=``/``?expand=``) narrows the output, and with it
+    the columns read and the nested collections loaded.
+    """
+    model = None
+    ordering = None
+    fields = ()
+    sources = {}
+    formats = {}
+    nested = {}
+    # Fields DRF leaves out when the relation behind their dotted source is missing.
+    omit_none = ()
+    # Columns always read, e.g. the key nested collections are grouped by.
+    always = ('id',)
+
+    def __init__(self, instance=None, many=False, context=None, fieldset=None, prefix='', path='', **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.fieldset = fieldset or self.context.get('fieldset') or Fieldset()
+        self.prefix = prefix
+        self.path = path
+        self.fieldset.check(self.fields, self.nested, path)
+        self.selected = [name for name in self.fields if self.fieldset.includes(name)]
+        self.inline = {
+            name: spec.serializer_class(
+                context=self.context, fieldset=self.fieldset.nested(name),
+                prefix=f'{prefix}{spec.relation}__', path=f'{path}{name}.',
+            )
+            for name, spec in self.nested.items()
+            if isinstance(spec, Inline) and name in self.selected and self.fieldset.expands(name)
+        }
+        self.getters = [(name, self._getter(name)) for name in self.selected]
+
+    def _getter(self, name):
+        spec = self.nested.get(name)
+        if isinstance(spec, Nested):
+            key = self.prefix + 'id'
+            return lambda row, related: related[name].get(row[key], [])
+        if isinstance(spec, Inline):
+            if name in self.inline:
+                return lambda row, related: self.inline[name].to_representation(row, {})
+            key = f'{self.prefix}{spec.relation}_id'
+            return lambda row, related: row[key]
+        method = getattr(self, f'get_{name}', None)
+        if method:
+            return lambda row, related: method(row)
+        key = self.prefix + self.sources.get(name, [name])[0]
+        fmt = self.formats.get(name)
+        if fmt:
+            return lambda row, related: fmt(row[key])
+        return lambda row, related: row[key]
+
+    def columns(self):
+        columns = list(self.always)
+        for name in self.selected:
+            spec = self.nested.get(name)
+            if isinstance(spec, Inline):
+                columns += [f'{spec.relation}_id'] if name not in self.inline else []
+            elif spec is None:
+                columns += self.sources.get(name, [name])
+        columns = [self.prefix + column for column in columns]
+        for child in self.inline.values():
+            columns += child.columns()
+        return list(dict.fromkeys(columns))
+
+    def get_rows(self, queryset, extra=()):
+        return queryset.prefetch_related(None).values(*dict.fromkeys([*self.columns(), *extra]))
+
+    def load_related(self, rows):
+        keys = [row[self.prefix + 'id'] for row in rows]
+        return {
+            name: spec.load(self, name, keys)
+            for name, spec in self.nested.items()
+            if isinstance(spec, Nested) and name in self.selected
+        }
+
+    def to_representation(self, row, related):
+        data = {name: getter(row, related) for name, getter in self.getters}
+        for name in self.omit_none:
+            if name in data and data[name] is None:
+                del data[name]
+        return data
+
+    @property
+    def data(self):
+        if self.instance is None:
+            return [] if self.many else {}
+        rows = list(self.instance) if self.many else [self.instance]
+        related = self.load_related(rows) if rows else {}
+        data = [self.to_representation(row, related) for row in rows]
+        return data if self.many else data[0]
+
+
+class FlatReadMixin:
+    """
+    Serves the JSON responses of ``flat_actions`` with ``flat_serializer_class``.
+
+    The filtered queryset is turned into ``.values()`` rows holding only the
+    columns of the requested fields, so objects, ``select_related`` and
+    ``prefetch_related`` are skipped entirely; ``?fields=`` and ``?expand=``
+    narrow the response (see ``Fieldset``). The browsable API and every other
+    action keep the regular serializer.
+
+    Object permissions still see the model instance: when a permission class
+    defines ``has_object_permission``, ``retrieve`` loads the instance (without
+    its prefetches) for the check before reading the row.
+    """
+    flat_serializer_class = None
+    flat_actions = ('list', 'retrieve')
+
+    @property
+    def use_flat_serializer(self):
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return (
+            self.flat_serializer_class is not None
+            and self.action in self.flat_actions
+            and getattr(renderer, 'format', None) == 'json'
+            and not getattr(self, 'swagger_fake_view', False)
+        )
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = Fieldset.from_query(self.request.query_params)
+        return self._fieldset
+
+    def get_flat_ordering_columns(self):
+        # Cursor pagination reads its position from the rows.
+        names = [name for name in getattr(self, 'ordering_fields', None) or () if name != '__all__']
+        ordering = getattr(getattr(self, 'cursor_pagination_class', None), 'ordering', None)
+        if isinstance(ordering, str):
+            names.append(ordering.lstrip('-'))
+        return names
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.use_flat_serializer:
+            queryset = self.get_flat_rows(queryset)
+        return queryset
+
+    def get_flat_rows(self, queryset):
+        serializer = self.flat_serializer_class(context=self.get_serializer_context())
+        return serializer.get_rows(queryset, extra=self.get_flat_ordering_columns())
+
+    def has_object_permissions(self):
+        return any(
+            type(permission).has_object_permission is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def get_object(self):
+        if not self.use_flat_serializer:
+            return super().get_object()
+        queryset = super().filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        if self.has_object_permissions():
+            instance = get_object_or_404(queryset.prefetch_related(None), **filter_kwargs)
+            self.check_object_permissions(self.request, instance)
+            filter_kwargs = {'pk': instance.pk}
+        return get_object_or_404(self.get_flat_rows(queryset), **filter_kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.use_flat_serializer:
+            context['fieldset'] = self.get_fieldset()
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        if self.use_flat_serializer:
+            kwargs.setdefault('context', self.get_serializer_context())
+            return self.flat_serializer_class(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,177 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import EmailJob
+
+logger = logging.getLogger(__name__)
+
+_builders = {}
+
+
+class PermanentEmailError(Exception):
+    """
+    Raised by a builder when a job can never be sent (e.g. its object is gone).
+    """
+
+
+def register_email(kind):
+    """
+    Register ``builder(job) -> EmailMessage`` as the way to render jobs of ``kind``.
+    """
+    def decorator(builder):
+        _builders[kind] = builder
+        return builder
+    return decorator
+
+
+def enqueue_email(kind, object_id=None, payload=None):
+    """
+    Queue an email. The job row is written in the caller's transaction, so
+    it only becomes visible to workers if that transaction commits.
+    """
+    return EmailJob.objects.create(kind=kind, object_id=object_id, payload=payload or {})
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def claim_batch(worker_id, size):
+    """
+    Atomically claim up to ``size`` due jobs for ``worker_id``.
+
+    Jobs left in ``sending`` by a worker that died are reclaimed once their
+    lock is older than ``MAIL_QUEUE_LOCK_TIMEOUT`` seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting('MAIL_QUEUE_LOCK_TIMEOUT', 300))
+    with transaction.atomic():
+        ids = list(
+            EmailJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', available_at__lte=now) | Q(status='sending', locked_at__lt=stale))
+            .order_by('id')
+            .values_list('id', flat=True)[:size]
+        )
+        EmailJob.objects.filter(id__in=ids).update(status='sending', locked_by=worker_id, locked_at=now)
+    return list(EmailJob.objects.filter(id__in=ids, locked_by=worker_id))
+
+
+def _release(job, **changes):
+    """
+    Save ``changes`` and drop the job's lock, unless another worker reclaimed
+    the job meanwhile. Returns whether the job was still ours.
+    """
+    changes.update(locked_by='', locked_at=None)
+    released = EmailJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**changes)
+    for field, value in changes.items():
+        setattr(job, field, value)
+    return bool(released)
+
+
+def _fail_now(job, error):
+    _release(job, status='failed', attempts=job.attempts + 1, last_error=str(error)[:2000])
+
+
+def _retry_or_fail(job, error):
+    if job.attempts + 1 >= _setting('MAIL_QUEUE_MAX_ATTEMPTS', 5):
+        logger.error("Giving up on email job %s after %s attempts: %s", job.pk, job.attempts + 1, error)
+        _fail_now(job, error)
+        return
+    delay = _setting('MAIL_QUEUE_RETRY_BACKOFF', 30) * 2 ** job.attempts
+    _release(
+        job, status='pending', attempts=job.attempts + 1, last_error=str(error)[:2000],
+        available_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def process_batch(worker_id, size=None):
+    """
+    Claim a batch, render it and deliver it over one SMTP connection.
+
+    Errors while rendering or sending a job (SMTP, network, template,
+    database) are retried with exponential backoff, so one bad job never
+    stops the batch; jobs whose builder raises ``PermanentEmailError`` fail
+    immediately. A job whose stale lock another worker reclaimed is neither
+    sent nor updated. Returns ``(sent, failed)`` counts.
+    """
+    jobs = claim_batch(worker_id, size or _setting('MAIL_QUEUE_BATCH_SIZE', 50))
+    if not jobs:
+        return 0, 0
+
+    messages = []
+    failed = 0
+    for job in jobs:
+        builder = _builders.get(job.kind)
+        try:
+            if builder is None:
+                raise PermanentEmailError(f"No builder registered for {job.kind!r}")
+            messages.append((job, builder(job)))
+        except PermanentEmailError as e:
+            logger.error("Dropping email job %s: %s", job.pk, e)
+            _fail_now(job, e)
+            failed += 1
+        except Exception as e:
+            logger.exception("Could not build email job %s", job.pk)
+            _retry_or_fail(job, e)
+            failed += 1
+    if not messages:
+        return 0, failed
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # The server is unreachable: every claimed job is retried later.
+        for job, _ in messages:
+            _retry_or_fail(job, e)
+        return 0, failed + len(messages)
+
+    sent = 0
+    try:
+        for job, message in messages:
+            message.connection = connection
+            # Another worker may have reclaimed the job after our lock went stale.
+            if not EmailJob.objects.filter(pk=job.pk, status='sending', locked_by=worker_id).exists():
+                logger.warning("Skipping email job %s: its lock was taken over", job.pk)
+                continue
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                logger.warning("Email job %s failed: %s", job.pk, e)
+                _retry_or_fail(job, e)
+                failed += 1
+                continue
+            if not _release(job, status='sent', sent_at=timezone.now(), attempts=job.attempts + 1):
+                logger.warning("Email job %s was sent after its lock was taken over", job.pk)
+                continue
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def queue_stats():
+    now = timezone.now()
+    counts = dict(
+        EmailJob.objects.filter(status__in=['pending', 'sending', 'failed'])
+        .values('status')
+        .annotate(total=Count('id'))
+        .values_list('status', 'total')
+    )
+    sent_last_minute = EmailJob.objects.filter(status='sent', sent_at__gte=now - timedelta(minutes=1)).count()
+    sent_last_hour = EmailJob.objects.filter(status='sent', sent_at__gte=now - timedelta(hours=1)).count()
+    oldest = EmailJob.objects.filter(status='pending').order_by('id').values_list('created_at', flat=True).first()
+    return {
+        'depth': counts.get('pending', 0),
+        'in_flight': counts.get('sending', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        'sent_per_minute': sent_last_minute,
+        'sent_per_hour': sent_last_hour,
+    }
@@ -0,0 +1,319 @@
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cart.models import Cart, CartItem
+from common.benchdata import (
+    BENCH_ADMIN_EMAIL, BENCH_BUYER_EMAIL, DEFAULT_SIZES, QUERIES, SIZES, DatasetGenerator, bench_users,
+    dataset_counts,
+)
+from common.paginations import CustomPagination
+from common.models import EmailJob
+from common.seeding import check_bench_database
+from orders.models import Order
+from products.cache import bump_product_version
+from products.models import Product, ProductVariant
+from products.signals import products_changed
+from users.models import User
+
+
+class Context:
+    """
+    Ids the endpoint requests pick from, read once before measuring.
+    """
+
+    def __init__(self, rng, run_id, workers):
+        self.rng = rng
+        self.run_id = run_id
+        self.product_ids = list(Product.objects.order_by('?').values_list('pk', flat=True)[:10_000])
+        # Random pages among the first 500, deep enough to leave the cached head of the list.
+        self.pages = max(1, min(math.ceil(Product.objects.count() / CustomPagination.page_size), 500))
+        self.cart_users = list(bench_users().filter(cart__items__isnull=False).distinct().order_by('?')[:1000])
+        self.order_users = list(bench_users().filter(orders__isnull=False).distinct().order_by('?')[:1000])
+        self.admin = User.objects.get(email=BENCH_ADMIN_EMAIL)
+        # The checkout benchmark sells from these; their stock is put back afterwards.
+        self.stock = list(
+            ProductVariant.objects.filter(stock__gte=100, is_active=True).order_by('?').only('stock', 'product_id')[:200]
+        )
+        self.variants = [variant.pk for variant in self.stock]
+        # One buyer per worker thread, so concurrent checkouts never share a cart.
+        self.buyers = [
+            User.objects.get_or_create(
+                email=BENCH_BUYER_EMAIL.format(n), defaults={'first_name': 'Bench', 'last_name': 'Buyer', 'is_active': True}
+            )[0]
+            for n in range(workers)
+        ]
+
+
+def product_list(ctx, worker):
+    return None, 'get', f'/products/api/products/?page={ctx.rng.randint(1, ctx.pages)}', None
+
+
+def product_summaries(ctx, worker):
+    return None, 'get', f'/products/api/product-summaries/?page={ctx.rng.randint(1, ctx.pages)}', None
+
+
+def product_detail(ctx, worker):
+    return None, 'get', f'/products/api/detail-products/{ctx.rng.choice(ctx.product_ids)}/', None
+
+
+def search(ctx, worker):
+    return None, 'get', f'/products/api/products/?search={ctx.rng.choice(QUERIES).replace(" ", "+")}', None
+
+
+def product_filter(ctx, worker):
+    rng = ctx.rng
+    low = rng.randint(5, 80)
+    url = (
+        f'/products/api/product-summaries/?target_audience={rng.choice(["men", "women", "kids"])}'
+        f'&size={rng.choice(SIZES)}&min_price={low}&max_price={low + rng.randint(10, 60)}&in_stock=true'
+        f'&ordering={rng.choice(["min_price", "-min_price", "-average_rating", "-created_at"])}'
+    )
+    return None, 'get', url, None
+
+
+def cart(ctx, worker):
+    return ctx.rng.choice(ctx.cart_users), 'get', '/cart/api/cart/', None
+
+
+def prepare_checkout(ctx, worker):
+    # Untimed: the buyer's cart is refilled before every checkout.
+    buyer = ctx.buyers[worker]
+    cart, _ = Cart.objects.get_or_create(user=buyer)
+    cart.items.all().delete()
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, variant_id=variant, quantity=1)
+        for variant in ctx.rng.sample(ctx.variants, min(len(ctx.variants), ctx.rng.randint(1, 3)))
+    ])
+
+
+def checkout(ctx, worker):
+    data = {'tran_id': f'bench-{ctx.run_id}', 'address': 'Benchmark street'}
+    return ctx.buyers[worker], 'post', '/orders/api/orders/checkout/', data
+
+
+def order_history(ctx, worker):
+    return ctx.rng.choice(ctx.order_users), 'get', '/orders/api/orders/', None
+
+
+def admin_dashboard(ctx, worker):
+    return ctx.admin, 'get', '/adminuser/api/admin-dashboard/', None
+
+
+# name -> (request builder, untimed preparation or None)
+ENDPOINTS = {
+    'product-list': (product_list, None),
+    'product-summaries': (product_summaries, None),
+    'product-detail': (product_detail, None),
+    'search': (search, None),
+    'filter': (product_filter, None),
+    'cart': (cart, None),
+    'checkout': (checkout, prepare_checkout),
+    'order-history': (order_history, None),
+    'admin-dashboard': (admin_dashboard, None),
+}
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1], 2)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic large catalog (unless --skip-seed) and measure latency percentiles, query counts and "
+        "throughput of the main API endpoints in-process, writing the results to a JSON file. Seeding is refused "
+        "unless DEBUG is on, the database name matches BENCH_DATABASE_PATTERN or --force is given. Orders placed "
+        "by the checkout benchmark are deleted and the stock they took is restored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('endpoints', nargs='*', help=f"Any of {', '.join(ENDPOINTS)} (default: all).")
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help="Multiplier for every default dataset size (e.g. 0.01 for a quick local run).")
+        for name, size in DEFAULT_SIZES.items():
+            parser.add_argument(f'--{name}', type=int, default=None, help=f"Target {name} (default {size:,} x scale).")
+        parser.add_argument('--skip-seed', action='store_true', help="Measure the data already in the database.")
+        parser.add_argument('--force', action='store_true',
+                            help="Seed even when the database does not look like a benchmark database.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=200, help="Timed requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=10, help="Untimed requests per endpoint first.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Threads for the throughput pass (0 to skip).")
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="Let the catalog cache serve repeated requests (default: every request misses).")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default=None,
+                            help="JSON file to write (default: bench-results/endpoints-<timestamp>.json).")
+
+    def handle(self, *args, **options):
+        unknown = set(options['endpoints']) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}.")
+        names = options['endpoints'] or list(ENDPOINTS)
+
+        sizes = {
+            name: options[name] if options[name] is not None else max(1, int(size * options['scale']))
+            for name, size in DEFAULT_SIZES.items()
+        }
+        if not options['skip_seed']:
+            check_bench_database(options['force'])
+            started = time.perf_counter()
+            DatasetGenerator(sizes, options['seed'], options['batch_size'], log=self.stdout.write).run()
+            self.stdout.write(f"Dataset ready in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(options['seed'])
+        run_id = uuid.uuid4().hex[:8]
+        workers = max(1, options['concurrency'])
+        ctx = Context(rng, run_id, workers)
+        if not ctx.product_ids:
+            raise CommandError("No products to benchmark; run without --skip-seed first.")
+
+        results = {}
+        self.stdout.write(
+            f"{'endpoint':<18} {'p50 ms':>8} {'p90 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} "
+            f"{'req/s':>8} {'errors':>7}"
+        )
+        middleware_logger = logging.getLogger('common.middleware')
+        disabled, middleware_logger.disabled = middleware_logger.disabled, True
+        # Query counts come from QueryBudgetMiddleware's headers; the test client's host must be allowed.
+        overrides = override_settings(
+            QUERY_BUDGET_SAMPLE_RATE=1.0, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        )
+        try:
+            with overrides:
+                for name in names:
+                    results[name] = self.bench(name, ctx, options)
+                    self.report(name, results[name])
+        finally:
+            middleware_logger.disabled = disabled
+            self.cleanup(ctx)
+
+        output = options['output'] or os.path.join(
+            'bench-results', f"endpoints-{timezone.now():%Y%m%dT%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w') as file:
+            json.dump({
+                'created_at': timezone.now().isoformat(),
+                'commit': git_commit(),
+                'database': connection.vendor,
+                'dataset': dataset_counts(),
+                'options': {
+                    key: options[key] for key in ('requests', 'warmup', 'concurrency', 'warm_cache', 'seed')
+                },
+                'endpoints': results,
+            }, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def call(self, client, name, ctx, worker, warm_cache):
+        build, prepare = ENDPOINTS[name]
+        if prepare:
+            prepare(ctx, worker)
+        if not warm_cache:
+            bump_product_version(None)
+        user, method, url, data = build(ctx, worker)
+        client.force_authenticate(user)
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data, format='json') if data else getattr(client, method)(url)
+        elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, response
+
+    def bench(self, name, ctx, options):
+        client = APIClient()
+        for _ in range(options['warmup']):
+            self.call(client, name, ctx, 0, options['warm_cache'])
+
+        timings, queries, db_times, errors = [], [], [], 0
+        for _ in range(options['requests']):
+            elapsed, response = self.call(client, name, ctx, 0, options['warm_cache'])
+            timings.append(elapsed)
+            queries.append(int(response.get('X-DB-Queries', 0)))
+            db_times.append(float(response.get('X-DB-Time', 0)))
+            errors += response.status_code >= 400
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+        result = {
+            'requests': len(timings),
+            'errors': errors,
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'p50_ms': percentile(quantiles, 50),
+            'p90_ms': percentile(quantiles, 90),
+            'p95_ms': percentile(quantiles, 95),
+            'p99_ms': percentile(quantiles, 99),
+            'max_ms': round(max(timings), 2),
+            'queries_median': statistics.median(queries),
+            'queries_max': max(queries),
+            'db_ms_median': round(statistics.median(db_times), 2),
+            'sequential_rps': round(1000 / statistics.fmean(timings), 1),
+        }
+        if options['concurrency'] > 0:
+            result.update(self.throughput(name, ctx, options))
+        return result
+
+    def throughput(self, name, ctx, options):
+        """
+        Requests per second with ``concurrency`` threads, each with its own
+        client. In-process, so the GIL bounds the gain to the time spent
+        waiting on the database; checkout includes its untimed cart refills.
+        """
+        per_worker = max(1, options['requests'] // options['concurrency'])
+        errors = []
+
+        def work(worker):
+            client = APIClient()
+            try:
+                for _ in range(per_worker):
+                    _, response = self.call(client, name, ctx, worker, options['warm_cache'])
+                    errors.append(response.status_code >= 400)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(work, range(options['concurrency'])))
+        wall = time.perf_counter() - started
+        total = per_worker * options['concurrency']
+        return {
+            'concurrency': options['concurrency'],
+            'concurrent_requests': total,
+            'concurrent_errors': sum(errors),
+            'throughput_rps': round(total / wall, 1),
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<18} {result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} {result['queries_median']:>8} {result.get('throughput_rps') or 0:>8.1f} "
+            f"{result['errors'] + result.get('concurrent_errors', 0):>7}"
+        )
+
+    def cleanup(self, ctx):
+        # Orders placed by the checkout benchmark are removed and the stock they
+        # took is put back, so the dataset stays the same across runs.
+        orders = Order.objects.filter(tran_id=f'bench-{ctx.run_id}')
+        EmailJob.objects.filter(kind='order_confirmation', object_id__in=orders.values('pk')).delete()
+        orders.delete()
+        ProductVariant.objects.bulk_update(ctx.stock, ['stock'])
+        products_changed(variant.product_id for variant in ctx.stock)
@@ -0,0 +1,121 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from cart.models import Cart, CartItem
+from cart.serializers import CartSerializer, FlatCartSerializer
+from common.renderers import FastJSONRenderer
+from orders.models import Order
+from orders.serializers import FlatOrderSerializer, OrderSerializer
+from products.models import Product, ProductVariant
+from products.serializers import (
+    DetailProductSerializer, FlatDetailProductSerializer, FlatProductSerializer, ProductSerializer
+)
+from reviews.models import Review
+
+
+def _products():
+    return Product.objects.select_related('category', 'brand').prefetch_related('images')
+
+
+def _detail_products():
+    return _products().prefetch_related(
+        Prefetch('variants', queryset=ProductVariant.objects.select_related('color', 'size').order_by('id')),
+        Prefetch(
+            'reviews', queryset=Review.objects.select_related('user')[:settings.PRODUCT_RECENT_REVIEWS],
+            to_attr='recent_reviews',
+        ),
+    )
+
+
+def _orders():
+    return Order.objects.select_related('user').prefetch_related(
+        'items__variant__product', 'items__variant__color', 'items__variant__size'
+    )
+
+
+def _carts():
+    return Cart.objects.prefetch_related(Prefetch(
+        'items', queryset=CartItem.objects.select_related('variant__product', 'variant__color', 'variant__size')
+    )).order_by('id')
+
+
+# name -> (queryset as the viewset builds it, serializer, flat serializer)
+TARGETS = {
+    'products': (_products, ProductSerializer, FlatProductSerializer),
+    'detail-products': (_detail_products, DetailProductSerializer, FlatDetailProductSerializer),
+    'orders': (_orders, OrderSerializer, FlatOrderSerializer),
+    'carts': (_carts, CartSerializer, FlatCartSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the ModelSerializer + JSONRenderer path with the flat serializer + fast renderer path "
+        "on existing rows, reported per 1,000 objects."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"Any of {', '.join(TARGETS)} (default: all).")
+        parser.add_argument('--objects', type=int, default=1000, help="Objects serialized per run.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per path (median is reported).")
+
+    def handle(self, *args, **options):
+        unknown = set(options['targets']) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown target(s): {', '.join(sorted(unknown))}.")
+        self.stdout.write(
+            f"{'target':<16} {'objects':>7} {'path':<8} {'total ms/1k':>12} {'serialize':>10} {'render':>8} "
+            f"{'queries':>8} {'KB':>8}"
+        )
+        for name in options['targets'] or list(TARGETS):
+            queryset, serializer_class, flat_class = TARGETS[name]
+            ids = list(queryset().values_list('pk', flat=True)[:options['objects']])
+            if not ids:
+                self.stdout.write(f"{name:<16} no rows, skipped")
+                continue
+
+            classic = self.measure(
+                options['repeat'], lambda: queryset().filter(pk__in=ids), serializer_class, JSONRenderer()
+            )
+            flat = self.measure(
+                options['repeat'], lambda: flat_class().get_rows(queryset().filter(pk__in=ids)), flat_class,
+                FastJSONRenderer(),
+            )
+            if JSONRenderer().render(classic.pop('data')) != JSONRenderer().render(flat.pop('data')):
+                raise CommandError(f"{name}: the flat serializer output differs from {serializer_class.__name__}.")
+
+            scale = 1000 / len(ids)
+            for path, result in (('classic', classic), ('flat', flat)):
+                self.stdout.write(
+                    f"{name:<16} {len(ids):>7} {path:<8} {(result['serialize'] + result['render']) * scale:>12.1f} "
+                    f"{result['serialize'] * scale:>10.1f} {result['render'] * scale:>8.1f} "
+                    f"{result['queries']:>8} {result['bytes'] / 1024:>8.1f}"
+                )
+            speedup = (classic['serialize'] + classic['render']) / (flat['serialize'] + flat['render'])
+            self.stdout.write(f"{name:<16} flat path is {speedup:.1f}x faster")
+
+    def measure(self, repeat, rows, serializer_class, renderer):
+        serialize, render = [], []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                data = serializer_class(rows(), many=True).data
+                serialized = time.perf_counter()
+                content = renderer.render(data)
+                rendered = time.perf_counter()
+            serialize.append((serialized - started) * 1000)
+            render.append((rendered - serialized) * 1000)
+        return {
+            'serialize': statistics.median(serialize),
+            'render': statistics.median(render),
+            'queries': len(ctx.captured_queries),
+            'bytes': len(content),
+            'data': data,
+        }
@@ -0,0 +1,134 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.paginations import CustomPagination, OrderCursorPagination
+from common.seeding import batched, check_bench_database, explicit_timestamps
+from orders.models import Order
+from users.models import User
+
+
+BENCH_EMAIL = 'pagination-benchmark@example.com'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare page-number and cursor pagination latency on the orders table at increasing page depths. "
+        "With --seed, synthetic orders are added up to --orders for the run and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true',
+                            help="Add synthetic orders (owned by a benchmark user) for the duration of the run.")
+        parser.add_argument('--force', action='store_true',
+                            help="Seed even when the database does not look like a benchmark database.")
+        parser.add_argument('--orders', type=int, default=1_000_000,
+                            help="Number of orders to benchmark against when seeding.")
+        parser.add_argument('--depths', type=int, nargs='+', default=[1, 10, 100, 1000, 5000, 9999],
+                            help="Page numbers to measure.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per depth (median is reported).")
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            check_bench_database(options['force'])
+        try:
+            if options['seed']:
+                self.seed(options['orders'], options['batch_size'])
+            self.run(options)
+        finally:
+            if options['seed']:
+                self.cleanup()
+
+    def run(self, options):
+        queryset = Order.objects.all()
+        page_size = CustomPagination.page_size
+        total = queryset.count()
+        if not total:
+            raise CommandError("No orders to paginate; run with --seed.")
+
+        self.stdout.write(f"{total} orders, page size {page_size}")
+        self.stdout.write(f"{'page':>8} {'page-number ms':>15} {'queries':>8} {'cursor ms':>10} {'queries':>8}")
+
+        for depth in options['depths']:
+            if (depth - 1) * page_size >= total:
+                continue
+            page_ms, page_queries = self.measure(options['repeat'], lambda: self.page_number(queryset, depth))
+            cursor_url = self.cursor_url_for(queryset, depth)
+            cursor_ms, cursor_queries = self.measure(options['repeat'], lambda: self.cursor(queryset, cursor_url))
+            self.stdout.write(f"{depth:>8} {page_ms:>15.2f} {page_queries:>8} {cursor_ms:>10.2f} {cursor_queries:>8}")
+
+    def seed(self, target, batch_size):
+        user, _ = User.objects.get_or_create(
+            email=BENCH_EMAIL, defaults={'first_name': 'Pagination', 'last_name': 'Benchmark'}
+        )
+        missing = target - Order.objects.count()
+        if missing <= 0:
+            return
+
+        self.stdout.write(f"Seeding {missing} orders...")
+        start = timezone.now() - timedelta(seconds=target)
+        rows = (
+            Order(
+                user=user,
+                status='delivered',
+                payment_status='paid',
+                total_price=Decimal(random.randint(500, 50_000)) / 100,
+                created_at=start + timedelta(seconds=i),
+                updated_at=start + timedelta(seconds=i),
+            )
+            for i in range(missing)
+        )
+        with explicit_timestamps(Order, 'created_at', 'updated_at'):
+            for batch in batched(rows, batch_size):
+                Order.objects.bulk_create(batch)
+
+    def cleanup(self):
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            return
+        # Seeded orders bypassed the order signals, so they are removed without them too.
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {Order._meta.db_table} WHERE user_id = %s', [user.pk])
+            self.stdout.write(f"Removed {cursor.rowcount} seeded orders")
+        user.delete()
+
+    def measure(self, repeat, fn):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(ctx.captured_queries)
+
+    def page_number(self, queryset, depth):
+        request = Request(APIRequestFactory().get('/orders/api/orders/', {'page': depth}))
+        return list(CustomPagination().paginate_queryset(queryset, request))
+
+    def cursor_url_for(self, queryset, depth):
+        # Build the cursor a client would hold after walking to this page;
+        # the lookup itself is not part of the timed section.
+        paginator = OrderCursorPagination()
+        request = Request(APIRequestFactory().get('/orders/api/orders/'))
+        paginator.paginate_queryset(queryset, request)
+        if depth == 1:
+            return paginator.base_url
+        offset = (depth - 1) * paginator.page_size - 1
+        position = queryset.order_by(*paginator.ordering).values_list('created_at', flat=True)[offset]
+        paginator.base_url = '/orders/api/orders/'
+        return paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(position)))
+
+    def cursor(self, queryset, url):
+        request = Request(APIRequestFactory().get(url))
+        return list(OrderCursorPagination().paginate_queryset(queryset, request))
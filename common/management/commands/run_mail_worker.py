@@ -0,0 +1,74 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from common.mailqueue import process_batch
+
+logger = logging.getLogger(__name__)
+
+
+def _work(worker_id, batch_size, poll_interval, once, stop):
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            sent, failed = process_batch(worker_id, batch_size)
+        except Exception:
+            # E.g. the database is unreachable; claimed jobs are reclaimed after the lock timeout.
+            logger.exception("Mail worker %s could not process a batch", worker_id)
+            if once:
+                return
+            stop.wait(poll_interval)
+            continue
+        if once and not (sent or failed):
+            return
+        if not (sent or failed):
+            stop.wait(poll_interval)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails in batches, reusing one SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Worker processes to run in parallel.")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Jobs claimed per batch (defaults to MAIL_QUEUE_BATCH_SIZE).")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        args = (options['batch_size'], options['poll_interval'], options['once'])
+
+        if options['processes'] <= 1:
+            stop = multiprocessing.Event()
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            started = time.perf_counter()
+            _work(prefix, *args, stop)
+            self.stdout.write(f"Mail worker stopped after {time.perf_counter() - started:.1f}s")
+            return
+
+        # Children must not share the parent's database connection.
+        connections.close_all()
+        stop = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=_work, args=(f"{prefix}:{n}", *args, stop))
+            for n in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(f"{len(workers)} mail workers stopped")
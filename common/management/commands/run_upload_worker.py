@@ -0,0 +1,58 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from common.uploadqueue import process_batch
+
+logger = logging.getLogger(__name__)
+
+
+def _work(worker_id, batch_size, concurrency, poll_interval, once, stop):
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            done, failed = process_batch(worker_id, batch_size, concurrency)
+        except Exception:
+            # E.g. the database is unreachable; claimed jobs are reclaimed after the lock timeout.
+            logger.exception("Upload worker %s could not process a batch", worker_id)
+            if once:
+                return
+            stop.wait(poll_interval)
+            continue
+        if once and not (done or failed):
+            return
+        if not (done or failed):
+            stop.wait(poll_interval)
+
+
+class Command(BaseCommand):
+    help = "Push staged uploads (product images, brand logos, profile pictures) to storage in the background."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Uploads in flight at once (defaults to UPLOAD_QUEUE_CONCURRENCY).")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Jobs claimed per batch (defaults to UPLOAD_QUEUE_BATCH_SIZE).")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        stop = multiprocessing.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        started = time.perf_counter()
+        try:
+            _work(
+                worker_id, options['batch_size'], options['concurrency'], options['poll_interval'],
+                options['once'], stop,
+            )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Upload worker stopped after {time.perf_counter() - started:.1f}s")
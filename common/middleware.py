@@ -0,0 +1,138 @@
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Parameter lists of any length count as the same statement.
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+# Column lists are left out of log lines, which keep the table and the condition.
+SELECT_LIST = re.compile(r'^SELECT .+? FROM ', re.S)
+
+
+def sql_shape(sql):
+    return IN_LIST.sub('(%s, ...)', sql)
+
+
+class QueryRecorder:
+    """
+    ``execute_wrapper`` counting the queries of one request, their total time
+    and how often each statement ran.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[sql_shape(sql)] += count
+        return [(sql, count) for sql, count in shapes.most_common() if count >= threshold]
+
+
+def view_name(request):
+    """
+    ``ProductViewSet.list``-style name of the view that served ``request``.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    view = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    name = view.__name__ if view else match._func_path
+    actions = getattr(func, 'actions', None)
+    if actions:
+        method = request.method.lower()
+        name = f"{name}.{actions.get(method, method)}"
+    return name
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the database queries and time of a sample of requests.
+
+    Sampled responses (``QUERY_BUDGET_SAMPLE_RATE``) get ``X-DB-Queries`` and
+    ``X-DB-Time`` (milliseconds) headers and a JSON log line on
+    ``common.middleware`` naming the view. The line is a warning when the view
+    ran more queries than its budget (``QUERY_BUDGETS[view]``, or
+    ``QUERY_BUDGETS[view class]``, or ``QUERY_BUDGET_DEFAULT``) or repeated one
+    statement ``QUERY_BUDGET_REPEAT_THRESHOLD`` times or more, the usual sign
+    of an N+1. Unsampled requests only pay for one ``random()`` call.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = _setting('QUERY_BUDGET_SAMPLE_RATE', 1.0)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        response['X-DB-Queries'] = str(recorder.count)
+        response['X-DB-Time'] = f'{recorder.duration * 1000:.1f}'
+        self.report(request, response, recorder, elapsed)
+        return response
+
+    def budget_for(self, name):
+        budgets = _setting('QUERY_BUDGETS', {})
+        if name in budgets:
+            return budgets[name]
+        return budgets.get(name.split('.')[0], _setting('QUERY_BUDGET_DEFAULT', 20))
+
+    def report(self, request, response, recorder, elapsed):
+        name = view_name(request)
+        if name is None:
+            return
+        budget = self.budget_for(name)
+        repeated = recorder.repeated(_setting('QUERY_BUDGET_REPEAT_THRESHOLD', 5))
+        over_budget = budget is not None and recorder.count > budget
+        entry = {
+            'view': name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 1),
+            'total_ms': round(elapsed * 1000, 1),
+            'budget': budget,
+            'over_budget': over_budget,
+            'repeated': [
+                {'sql': SELECT_LIST.sub('SELECT ... FROM ', sql, count=1)[:300], 'count': count}
+                for sql, count in repeated[:5]
+            ],
+        }
+        if getattr(response, 'streaming', False):
+            # Queries run while the body streams are not counted.
+            entry['streaming'] = True
+        level = logging.WARNING if over_budget or repeated else logging.INFO
+        logger.log(level, json.dumps(entry))
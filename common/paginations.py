@@ -1,5 +1,50 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
 
 class CustomPagination(PageNumberPagination):
-    page_size = 100
\ No newline at end of file
+    page_size = 100
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Keyset pagination: pages are fetched with ``WHERE <ordering> < <position>``
+    instead of ``OFFSET``, and no ``COUNT(*)`` is issued, so every page costs
+    the same no matter how deep it is.
+    """
+    page_size = 100
+    ordering = '-created_at'
+
+
+class ProductCursorPagination(CustomCursorPagination):
+    ordering = '-created_at'
+
+
+class OrderCursorPagination(CustomCursorPagination):
+    ordering = '-created_at'
+
+
+class UserCursorPagination(CustomCursorPagination):
+    ordering = '-id'
+
+
+class ReviewCursorPagination(CustomCursorPagination):
+    # Served by the (product, -created_at) index on reviews.
+    page_size = 20
+    ordering = '-created_at'
+
+
+class SelectablePaginationMixin:
+    """
+    Lets a client switch a view from its page-number paginator to
+    ``cursor_pagination_class`` by sending ``?pagination=cursor`` (or by
+    following a ``cursor`` link returned from a previous page).
+    """
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.cursor_pagination_class is not None:
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,50 @@
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connections
+
+
+def check_bench_database(force=False, using='default'):
+    """
+    Refuse to seed benchmark rows unless the database is clearly a throwaway
+    one: its name matches ``BENCH_DATABASE_PATTERN``, ``DEBUG`` is on, or the
+    command was run with ``--force``.
+    """
+    name = str(connections[using].settings_dict['NAME'])
+    pattern = getattr(settings, 'BENCH_DATABASE_PATTERN', r'bench|test')
+    if force or settings.DEBUG or re.search(pattern, name):
+        return
+    raise CommandError(
+        f"Refusing to seed benchmark data into database {name!r}. Point DATABASES at a benchmark "
+        f"database (name matching {pattern!r}) or pass --force."
+    )
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """
+    Temporarily disable ``auto_now``/``auto_now_add`` on the given fields so
+    that bulk-generated rows can carry their own timestamps.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    try:
+        for field in fields:
+            field.auto_now = field.auto_now_add = False
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,13 @@
+from rest_framework import serializers
+
+from .models import UploadJob
+
+
+class UploadJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadJob
+        fields = [
+            'id', 'model', 'object_id', 'field', 'original_name', 'status', 'attempts', 'last_error', 'url',
+            'created_at', 'finished_at',
+        ]
+        read_only_fields = fields
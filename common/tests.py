@@ -1,3 +1,152 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.mail import EmailMessage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from products.models import Brand
+from users.views import UserProfileView
+from . import uploadqueue
+from .mailqueue import PermanentEmailError, enqueue_email, process_batch, register_email
+from .models import EmailJob, UploadJob
+
+
+@register_email('test_ok')
+def build_ok(job):
+    return EmailMessage(subject=f"Job {job.pk}", body='', to=['buyer@example.com'])
+
+
+@register_email('test_broken')
+def build_broken(job):
+    raise RuntimeError("template failed to render")
+
+
+@register_email('test_gone')
+def build_gone(job):
+    raise PermanentEmailError("order is gone")
+
+
+@register_email('test_taken_over')
+def build_taken_over(job):
+    # Another worker reclaims the job while this one is still rendering it.
+    EmailJob.objects.filter(pk=job.pk).update(locked_by='other-worker')
+    return EmailMessage(subject=f"Job {job.pk}", body='', to=['buyer@example.com'])
+
+
+class MailQueueTests(TestCase):
+    def test_builder_error_is_retried_without_stopping_the_batch(self):
+        broken = enqueue_email('test_broken')
+        ok = enqueue_email('test_ok')
+
+        self.assertEqual(process_batch('worker'), (1, 1))
+
+        broken.refresh_from_db()
+        self.assertEqual((broken.status, broken.attempts), ('pending', 1))
+        self.assertGreater(broken.available_at, timezone.now())
+        self.assertIn('template failed', broken.last_error)
+        self.assertEqual(EmailJob.objects.get(pk=ok.pk).status, 'sent')
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_permanent_error_fails_at_once(self):
+        job = enqueue_email('test_gone')
+
+        self.assertEqual(process_batch('worker'), (0, 1))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('failed', 1, ''))
+
+    @override_settings(MAIL_QUEUE_MAX_ATTEMPTS=2)
+    def test_job_fails_after_the_last_attempt(self):
+        job = enqueue_email('test_broken')
+        process_batch('worker')
+        EmailJob.objects.filter(pk=job.pk).update(available_at=timezone.now() - timedelta(seconds=1))
+        process_batch('worker')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_job_taken_over_by_another_worker_is_left_alone(self):
+        job = enqueue_email('test_taken_over')
+
+        self.assertEqual(process_batch('worker'), (0, 0))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), ('sending', 'other-worker', 0))
+        self.assertEqual(mail.outbox, [])
+
+
+class UploadQueueTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings = override_settings(
+            MEDIA_ROOT=self.media, MEDIA_URL='/media/', UPLOAD_STAGING_ROOT=f'{self.media}/staging',
+            UPLOAD_STORAGE_BACKEND='common.uploadqueue.LocalUploader',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def stage(self, name):
+        brand = Brand.objects.create(name=name)
+        return brand, uploadqueue.stage_upload(brand, 'logo', ContentFile(b'logo', name=f'{name}.png'))
+
+    def process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return uploadqueue.process_batch('worker')
+
+    def test_upload_is_saved_on_the_object(self):
+        brand, job = self.stage('Acme')
+
+        self.assertEqual(self.process(), (1, 0))
+
+        job.refresh_from_db()
+        brand.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 1))
+        self.assertEqual(job.url, '/media/brand_logo/' + job.staged_name.split('/')[-1])
+        self.assertTrue(brand.logo)
+
+    def test_save_error_is_retried_without_stopping_the_batch(self):
+        broken, broken_job = self.stage('Broken')
+        _, ok_job = self.stage('Fine')
+        save = Brand.save
+
+        def failing_save(instance, *args, **kwargs):
+            if instance.pk == broken.pk:
+                raise RuntimeError("database went away")
+            return save(instance, *args, **kwargs)
+
+        with mock.patch.object(Brand, 'save', failing_save):
+            self.assertEqual(self.process(), (1, 1))
+
+        broken_job.refresh_from_db()
+        self.assertEqual((broken_job.status, broken_job.attempts), ('pending', 1))
+        self.assertGreater(broken_job.available_at, timezone.now())
+        self.assertIn('database went away', broken_job.last_error)
+        self.assertEqual(UploadJob.objects.get(pk=ok_job.pk).status, 'done')
+
+    def test_lookup_error_is_retried(self):
+        _, job = self.stage('Acme')
+
+        with mock.patch.object(uploadqueue, '_target', side_effect=RuntimeError("connection reset")):
+            self.assertEqual(self.process(), (0, 1))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+
+    def test_missing_object_fails_at_once(self):
+        brand, job = self.stage('Acme')
+        brand.delete()
+
+        self.assertEqual(self.process(), (0, 1))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('failed', ''))
+
+    def test_profile_view_only_gets_the_update_override(self):
+        self.assertFalse(hasattr(UserProfileView, 'create'))
+        self.assertFalse(hasattr(UserProfileView, 'perform_create'))
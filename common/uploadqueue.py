@@ -0,0 +1,258 @@
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from cloudinary import uploader
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .flat import image_url
+from .models import UploadJob
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentUploadError(Exception):
+    """
+    Raised when a job can never be completed (e.g. its object or file is gone).
+    """
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def staging_storage():
+    return FileSystemStorage(location=_setting('UPLOAD_STAGING_ROOT', os.path.join(settings.BASE_DIR, 'upload_staging')))
+
+
+class CloudinaryUploader:
+    """
+    Uploads with the options of the target ``CloudinaryField``, like the
+    field itself does when a file is assigned to it.
+    """
+
+    def upload(self, path, field, instance):
+        options = {'type': field.type, 'resource_type': field.resource_type}
+        options.update({key: val(instance) if callable(val) else val for key, val in field.options.items()})
+        return uploader.upload_resource(path, **options)
+
+    def url(self, value):
+        return image_url(value) or ''
+
+
+class LocalUploader:
+    """
+    Stand-in for Cloudinary used in tests and offline development: files are
+    copied into a ``FileSystemStorage`` (by default ``MEDIA_ROOT``) and the
+    field stores their name there.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage or FileSystemStorage()
+
+    def upload(self, path, field, instance):
+        name = f'{instance._meta.model_name}_{field.name}/{os.path.basename(path)}'
+        with open(path, 'rb') as file:
+            return self.storage.save(name, file)
+
+    def url(self, value):
+        return self.storage.url(value)
+
+
+def get_uploader():
+    return import_string(_setting('UPLOAD_STORAGE_BACKEND', 'common.uploadqueue.CloudinaryUploader'))()
+
+
+def stage_upload(instance, field, file, user=None):
+    """
+    Save an uploaded file to the staging area and queue its upload to
+    ``field`` of ``instance``. Jobs still pending for the same field are
+    cancelled, so an older file never overwrites a newer one. The job row is
+    written in the caller's transaction.
+    """
+    model = instance._meta.label_lower
+    _, ext = os.path.splitext(os.path.basename(file.name or ''))
+    staged_name = staging_storage().save(f'{model}/{uuid.uuid4().hex}{ext.lower()}', file)
+    superseded = UploadJob.objects.filter(model=model, object_id=instance.pk, field=field, status='pending')
+    for job in superseded:
+        _discard(job, 'cancelled', 'Superseded by a newer upload.')
+    return UploadJob.objects.create(
+        model=model, object_id=instance.pk, field=field, staged_name=staged_name,
+        original_name=(file.name or '')[:255], created_by=user if getattr(user, 'is_authenticated', False) else None,
+    )
+
+
+def claim_batch(worker_id, size):
+    """
+    Atomically claim up to ``size`` due jobs for ``worker_id``.
+
+    Jobs left in ``uploading`` by a worker that died are reclaimed once their
+    lock is older than ``UPLOAD_QUEUE_LOCK_TIMEOUT`` seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting('UPLOAD_QUEUE_LOCK_TIMEOUT', 300))
+    with transaction.atomic():
+        ids = list(
+            UploadJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', available_at__lte=now) | Q(status='uploading', locked_at__lt=stale))
+            .order_by('id')
+            .values_list('id', flat=True)[:size]
+        )
+        UploadJob.objects.filter(id__in=ids).update(status='uploading', locked_by=worker_id, locked_at=now)
+    return list(UploadJob.objects.filter(id__in=ids, locked_by=worker_id))
+
+
+def _discard(job, status, error=''):
+    staged_name = job.staged_name
+    transaction.on_commit(lambda: staging_storage().delete(staged_name))
+    job.status = status
+    job.last_error = error
+    job.locked_by = ''
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'attempts', 'last_error', 'locked_by', 'locked_at', 'finished_at'])
+
+
+def _retry_or_fail(job, error):
+    job.attempts += 1
+    if job.attempts >= _setting('UPLOAD_QUEUE_MAX_ATTEMPTS', 5):
+        logger.error("Giving up on upload job %s after %s attempts: %s", job.pk, job.attempts, error)
+        _discard(job, 'failed', str(error)[:2000])
+        return
+    job.status = 'pending'
+    job.last_error = str(error)[:2000]
+    job.locked_by = ''
+    job.locked_at = None
+    delay = _setting('UPLOAD_QUEUE_RETRY_BACKOFF', 30) * 2 ** (job.attempts - 1)
+    job.available_at = timezone.now() + timedelta(seconds=delay)
+    job.save(update_fields=['status', 'attempts', 'last_error', 'available_at', 'locked_by', 'locked_at'])
+
+
+def _target(job):
+    try:
+        model = apps.get_model(job.model)
+    except LookupError:
+        raise PermanentUploadError(f"Unknown model {job.model!r}")
+    instance = model._default_manager.filter(pk=job.object_id).first()
+    if instance is None:
+        raise PermanentUploadError(f"{job.model} #{job.object_id} no longer exists")
+    try:
+        return instance, model._meta.get_field(job.field)
+    except FieldDoesNotExist:
+        raise PermanentUploadError(f"Unknown field {job.model}.{job.field}")
+
+
+def _apply(job, instance, field, value, url):
+    newer = UploadJob.objects.filter(
+        model=job.model, object_id=job.object_id, field=job.field, pk__gt=job.pk, status='done'
+    )
+    job.attempts += 1
+    if newer.exists():
+        # A later upload of the same field finished first (on another worker).
+        _discard(job, 'cancelled', 'Superseded by a newer upload.')
+        return
+    with transaction.atomic():
+        setattr(instance, field.attname, value)
+        # save() rather than update(): model signals (e.g. product image renditions) see the new file.
+        instance.save(update_fields=[field.attname])
+        job.url = url
+        job.save(update_fields=['url'])
+        _discard(job, 'done')
+
+
+def process_batch(worker_id, size=None, concurrency=None, backend=None):
+    """
+    Claim a batch and push its files to the storage backend concurrently.
+
+    The uploads themselves run on a thread pool of ``concurrency`` threads
+    (``UPLOAD_QUEUE_CONCURRENCY``); rows are updated from the calling thread
+    as results come in, in job order. Any error while loading a job's
+    object, uploading its file or saving the result (storage, network,
+    database, model signals) is retried with exponential backoff, so one bad
+    job never stops the batch; jobs whose object or staged file is gone fail
+    immediately. Returns ``(done, failed)`` counts.
+    """
+    jobs = claim_batch(worker_id, size or _setting('UPLOAD_QUEUE_BATCH_SIZE', 20))
+    if not jobs:
+        return 0, 0
+
+    backend = backend or get_uploader()
+    storage = staging_storage()
+    targets = []
+    failed = 0
+    for job in jobs:
+        try:
+            instance, field = _target(job)
+            if not storage.exists(job.staged_name):
+                raise PermanentUploadError(f"Staged file {job.staged_name} is missing")
+        except PermanentUploadError as e:
+            logger.error("Dropping upload job %s: %s", job.pk, e)
+            _discard(job, 'failed', str(e))
+            failed += 1
+            continue
+        except Exception as e:
+            logger.exception("Could not load upload job %s", job.pk)
+            _retry_or_fail(job, e)
+            failed += 1
+            continue
+        targets.append((job, instance, field))
+    if not targets:
+        return 0, failed
+
+    done = 0
+    workers = min(len(targets), concurrency or _setting('UPLOAD_QUEUE_CONCURRENCY', 4))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload') as pool:
+        futures = [
+            pool.submit(backend.upload, storage.path(job.staged_name), field, instance)
+            for job, instance, field in targets
+        ]
+        for (job, instance, field), future in zip(targets, futures):
+            try:
+                value = future.result()
+            except Exception as e:
+                logger.warning("Upload job %s failed: %s", job.pk, e)
+                _retry_or_fail(job, e)
+                failed += 1
+                continue
+            attempts = job.attempts
+            try:
+                _apply(job, instance, field, value, backend.url(value))
+            except Exception as e:
+                logger.exception("Could not save upload job %s", job.pk)
+                # The attempt is counted once, by _retry_or_fail.
+                job.attempts = attempts
+                _retry_or_fail(job, e)
+                failed += 1
+                continue
+            done += 1
+    return done, failed
+
+
+def queue_stats():
+    now = timezone.now()
+    counts = dict(
+        UploadJob.objects.filter(status__in=['pending', 'uploading', 'failed'])
+        .values('status')
+        .annotate(total=Count('id'))
+        .values_list('status', 'total')
+    )
+    done_last_minute = UploadJob.objects.filter(status='done', finished_at__gte=now - timedelta(minutes=1)).count()
+    done_last_hour = UploadJob.objects.filter(status='done', finished_at__gte=now - timedelta(hours=1)).count()
+    oldest = UploadJob.objects.filter(status='pending').order_by('id').values_list('created_at', flat=True).first()
+    return {
+        'depth': counts.get('pending', 0),
+        'in_flight': counts.get('uploading', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        'uploaded_per_minute': done_last_minute,
+        'uploaded_per_hour': done_last_hour,
+    }
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import UploadJobViewSet
+
+router = DefaultRouter()
+router.register(r'upload-jobs', UploadJobViewSet, basename='upload-job')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
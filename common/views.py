@@ -1,3 +1,91 @@
-from django.shortcuts import render
+from rest_framework import mixins, status, viewsets
+from rest_framework.permissions import IsAuthenticated
 
-# Create your views here.
+from .models import UploadJob
+from .serializers import UploadJobSerializer
+from .uploadqueue import stage_upload
+
+
+class StagedUploadMixin:
+    """
+    Hands the files of ``upload_fields`` to the background upload queue
+    instead of pushing them to storage inside the request.
+
+    The object is saved without them and the response is ``202 Accepted``,
+    listing the queued jobs under ``upload_jobs``; their status is served by
+    ``UploadJobViewSet``. Requests without a file behave as before. Combine
+    it with ``StagedUploadCreateMixin`` and/or ``StagedUploadUpdateMixin``
+    for the actions the view has.
+    """
+    upload_fields = ()
+
+    def save_with_uploads(self, serializer, **kwargs):
+        files = {
+            name: serializer.validated_data.pop(name)
+            for name in self.upload_fields
+            if serializer.validated_data.get(name)
+        }
+        instance = serializer.save(**kwargs)
+        self.upload_jobs = [
+            stage_upload(instance, name, file, self.request.user) for name, file in files.items()
+        ]
+        return instance
+
+    def accepted_if_queued(self, response):
+        jobs = getattr(self, 'upload_jobs', None)
+        if jobs:
+            response.status_code = status.HTTP_202_ACCEPTED
+            response.data['upload_jobs'] = UploadJobSerializer(jobs, many=True).data
+        return response
+
+
+class StagedUploadCreateMixin(StagedUploadMixin):
+    """
+    Queues the uploads of ``create``.
+    """
+
+    def perform_create(self, serializer):
+        self.save_with_uploads(serializer)
+
+    def create(self, request, *args, **kwargs):
+        return self.accepted_if_queued(super().create(request, *args, **kwargs))
+
+
+class StagedUploadUpdateMixin(StagedUploadMixin):
+    """
+    Queues the uploads of ``update`` and ``partial_update``.
+    """
+
+    def perform_update(self, serializer):
+        self.save_with_uploads(serializer)
+
+    def update(self, request, *args, **kwargs):
+        return self.accepted_if_queued(super().update(request, *args, **kwargs))
+
+
+class UploadJobViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    API endpoint reporting the status of queued file uploads.
+
+    - Users see the jobs they queued; admins see every job.
+    - `status` moves from `pending` to `uploading` and ends as `done` (with the stored file's `url`),
+      `failed` (see `last_error`) or `cancelled` (replaced by a newer upload of the same field).
+    - Filter with `?status=`, `?model=` and `?object_id=`.
+    """
+    serializer_class = UploadJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return UploadJob.objects.none()
+        queryset = UploadJob.objects.order_by('-id')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        for name in ('status', 'model'):
+            value = self.request.query_params.get(name)
+            if value:
+                queryset = queryset.filter(**{name: value})
+        object_id = self.request.query_params.get('object_id', '')
+        if object_id.isdigit():
+            queryset = queryset.filter(object_id=object_id)
+        return queryset
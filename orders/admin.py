@@ -1,8 +1,21 @@
 from django.contrib import admin
-from .models import Order
+from .models import CustomerStats, DailySalesRollup, Order
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'status', 'payment_status', 'tran_id', 'created_at']
     search_fields = ['id', 'user__email', 'tran_id']
     list_filter = ['status', 'payment_status', 'created_at']
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'order_count', 'order_total', 'paid_count', 'paid_total']
+    date_hierarchy = 'date'
+
+
+@admin.register(CustomerStats)
+class CustomerStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'lifetime_spend', 'order_count', 'first_order_at', 'last_order_at']
+    search_fields = ['user__email']
+    ordering = ['-lifetime_spend']
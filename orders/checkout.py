@@ -0,0 +1,187 @@
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from cart.models import Cart, CartItem
+from products.models import ProductVariant
+from products.reservations import available_stock, convert, held_quantity
+from products.signals import products_changed
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATEs worth retrying: serialization_failure, deadlock_detected, lock_not_available.
+RETRYABLE_PGCODES = {'40001', '40P01', '55P03'}
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class EmptyCartError(CheckoutError):
+    pass
+
+
+class OutOfStockError(CheckoutError):
+    def __init__(self, variant, available):
+        self.variant = variant
+        self.available = available
+        super().__init__(f"Not enough stock for {variant}. Available: {available}")
+
+
+class ContentionMetrics:
+    """
+    Per-variant counters of checkout contention, kept per process.
+
+    ``retries`` counts transactions restarted because of a serialization
+    failure, deadlock or lock timeout; ``stockouts`` counts checkouts that
+    lost the race for the last units of a variant.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._variants = defaultdict(lambda: {'checkouts': 0, 'units': 0, 'retries': 0, 'stockouts': 0})
+            self._totals = {'checkouts': 0, 'failed': 0, 'retries': 0, 'seconds': 0.0}
+
+    def record_success(self, quantities, elapsed):
+        with self._lock:
+            for variant_id, quantity in quantities.items():
+                self._variants[variant_id]['checkouts'] += 1
+                self._variants[variant_id]['units'] += quantity
+            self._totals['checkouts'] += 1
+            self._totals['seconds'] += elapsed
+
+    def record_retry(self, variant_ids):
+        with self._lock:
+            for variant_id in variant_ids:
+                self._variants[variant_id]['retries'] += 1
+            self._totals['retries'] += 1
+
+    def record_failure(self, variant_id=None):
+        with self._lock:
+            if variant_id is not None:
+                self._variants[variant_id]['stockouts'] += 1
+            self._totals['failed'] += 1
+
+    def snapshot(self, limit=20):
+        with self._lock:
+            variants = sorted(
+                ({'variant_id': pk, **counters} for pk, counters in self._variants.items()),
+                key=lambda row: (row['retries'] + row['stockouts'], row['checkouts']),
+                reverse=True,
+            )[:limit]
+            totals = dict(self._totals)
+        checkouts = totals.pop('checkouts')
+        seconds = totals.pop('seconds')
+        return {
+            'checkouts': checkouts,
+            'avg_checkout_ms': round(seconds / checkouts * 1000, 2) if checkouts else 0,
+            **totals,
+            'variants': variants,
+        }
+
+
+contention_metrics = ContentionMetrics()
+
+
+def _is_retryable(exc):
+    if connection.vendor == 'sqlite':
+        return 'locked' in str(exc)
+    return getattr(exc.__cause__, 'pgcode', None) in RETRYABLE_PGCODES
+
+
+def place_order(user, tran_id=None, shipping_address=''):
+    """
+    Turn the user's cart into a paid order.
+
+    Stock is taken with one conditional ``UPDATE ... SET stock = stock - n
+    WHERE stock >= n + <units held for other payments>`` per line, in variant
+    id order so concurrent checkouts always lock rows in the same order and
+    cannot deadlock each other. The buyer's own holds (keyed by ``tran_id``)
+    are converted. A line that cannot be covered rolls the whole order back.
+    Serialization failures and lock timeouts are retried with jittered
+    exponential backoff, unless the caller already holds a transaction that a
+    retry could not undo.
+    """
+    max_attempts = getattr(settings, 'CHECKOUT_MAX_ATTEMPTS', 5)
+    if connection.in_atomic_block:
+        max_attempts = 1
+
+    started = time.perf_counter()
+    for attempt in range(1, max_attempts + 1):
+        variant_ids = []
+        try:
+            with transaction.atomic():
+                order, quantities = _place_order(user, tran_id, shipping_address, variant_ids)
+        except OperationalError as exc:
+            if attempt == max_attempts or not _is_retryable(exc):
+                contention_metrics.record_failure()
+                raise
+            contention_metrics.record_retry(variant_ids)
+            delay = getattr(settings, 'CHECKOUT_RETRY_BACKOFF', 0.05) * 2 ** (attempt - 1)
+            logger.info("Retrying checkout for user %s (attempt %s): %s", user.pk, attempt, exc)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+        except OutOfStockError as exc:
+            contention_metrics.record_failure(exc.variant.pk)
+            raise
+        else:
+            contention_metrics.record_success(quantities, time.perf_counter() - started)
+            return order
+
+
+def _place_order(user, tran_id, shipping_address, variant_ids):
+    # Locking the cart row serializes concurrent checkouts of the same cart.
+    cart = Cart.objects.select_for_update().filter(user=user).first()
+    if not cart:
+        raise CheckoutError('Cart not found.')
+
+    items = list(
+        CartItem.objects.filter(cart=cart)
+        .select_related('variant', 'variant__color', 'variant__size', 'variant__product')
+        .order_by('variant_id')
+    )
+    if not items:
+        raise EmptyCartError('Cart is empty.')
+
+    held_by_others = held_quantity(exclude_reference=tran_id)
+    quantities = {}
+    total_price = 0
+    for item in items:
+        variant = item.variant
+        variant_ids.append(variant.pk)
+        updated = ProductVariant.objects.filter(
+            pk=variant.pk, stock__gte=held_by_others + item.quantity
+        ).update(stock=F('stock') - item.quantity)
+        if not updated:
+            available = available_stock([variant.pk], exclude_reference=tran_id).get(variant.pk, 0)
+            raise OutOfStockError(variant, available)
+        quantities[variant.pk] = item.quantity
+        total_price += variant.price * item.quantity
+
+    order = Order.objects.create(
+        user=user,
+        total_price=total_price,
+        payment_status='paid',
+        status='processing',
+        tran_id=tran_id,
+        shipping_address=shipping_address or '',
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, variant=item.variant, quantity=item.quantity, price=item.variant.price)
+        for item in items
+    ])
+    if tran_id:
+        convert(tran_id)
+    CartItem.objects.filter(cart=cart).delete()
+    products_changed(item.variant.product_id for item in items)
+    return order, quantities
@@ -0,0 +1,122 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+ZERO = Decimal('0.00')
+MISSING = object()
+
+
+def counts_towards_spend(payment_status, status):
+    return payment_status == 'paid' and status != 'cancelled'
+
+
+def customer_contribution(order):
+    """
+    Return ``(user_id, total, created_at)`` when ``order`` counts towards its
+    customer's lifetime spend, None when it does not, or ``MISSING`` when the
+    fields it depends on were not loaded.
+    """
+    values = order.__dict__
+    fields = ('user_id', 'total_price', 'created_at', 'payment_status', 'status')
+    if any(values.get(field) is None for field in fields):
+        return MISSING
+    if not counts_towards_spend(values['payment_status'], values['status']):
+        return None
+    return values['user_id'], Decimal(values['total_price']), values['created_at']
+
+
+def _add(user_id, total, created_at):
+    from .models import CustomerStats
+
+    changes = {
+        'lifetime_spend': F('lifetime_spend') + total,
+        'order_count': F('order_count') + 1,
+        # LEAST/GREATEST skip NULL on PostgreSQL but not on SQLite, hence the Coalesce.
+        'first_order_at': Coalesce(Least('first_order_at', Value(created_at)), Value(created_at)),
+        'last_order_at': Coalesce(Greatest('last_order_at', Value(created_at)), Value(created_at)),
+        'updated_at': timezone.now(),
+    }
+    if CustomerStats.objects.filter(user_id=user_id).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            CustomerStats.objects.create(
+                user_id=user_id, lifetime_spend=total, order_count=1,
+                first_order_at=created_at, last_order_at=created_at,
+            )
+    except IntegrityError:
+        CustomerStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def recount_customer(user_id):
+    """
+    Recompute an existing stats row from the customer's orders in a single
+    ``UPDATE`` with subqueries, dropping it once no order counts any more.
+    Never inserts, so it is safe while the user itself is being deleted.
+    """
+    from .models import CustomerStats, Order
+
+    orders = Order.objects.filter(user_id=user_id, payment_status='paid').exclude(status='cancelled').order_by()
+
+    def aggregate(expression):
+        return Subquery(orders.values('user_id').annotate(value=expression).values('value'))
+
+    CustomerStats.objects.filter(user_id=user_id).update(
+        lifetime_spend=Coalesce(aggregate(Sum('total_price')), Value(ZERO)),
+        order_count=Coalesce(aggregate(Count('id')), Value(0)),
+        first_order_at=aggregate(Min('created_at')),
+        last_order_at=aggregate(Max('created_at')),
+        updated_at=timezone.now(),
+    )
+    CustomerStats.objects.filter(user_id=user_id, order_count=0).delete()
+
+
+def record_customer_order_change(old, new):
+    """
+    Move an order's contribution from ``old`` to ``new`` (see
+    ``customer_contribution``). Additions are a single ``UPDATE``; removals
+    (refunds, cancellations) recount the customer, since they may take away
+    the first or last order.
+    """
+    if old == new:
+        return
+    if old is not None:
+        recount_customer(old[0])
+        if new is not None and new[0] == old[0]:
+            return
+    if new is not None:
+        _add(*new)
+
+
+def rebuild_customer_stats(user_ids=None, batch_size=1000):
+    """
+    Recompute stats for ``user_ids`` (everyone when None) from the orders
+    table with one grouped aggregate. Returns the number of rows written.
+    """
+    from .models import CustomerStats, Order
+
+    orders = Order.objects.filter(payment_status='paid').exclude(status='cancelled')
+    stats = CustomerStats.objects.all()
+    if user_ids is not None:
+        orders = orders.filter(user_id__in=user_ids)
+        stats = stats.filter(user_id__in=user_ids)
+
+    rows = [
+        CustomerStats(user_id=row['user_id'], **{key: row[key] for key in row if key != 'user_id'})
+        for row in orders.order_by().values('user_id').annotate(
+            lifetime_spend=Coalesce(Sum('total_price'), Value(ZERO)),
+            order_count=Count('id'),
+            first_order_at=Min('created_at'),
+            last_order_at=Max('created_at'),
+        )
+    ]
+    with transaction.atomic():
+        stats.exclude(user_id__in=[row.user_id for row in rows]).delete()
+        CustomerStats.objects.bulk_create(
+            rows, batch_size=batch_size, update_conflicts=True, unique_fields=['user'],
+            update_fields=['lifetime_spend', 'order_count', 'first_order_at', 'last_order_at', 'updated_at'],
+        )
+    return len(rows)
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.exports import EXPORT_FORMATS, EXPORT_LEVELS, export_rows, parse_export_filters, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream orders or order items to a CSV or JSONL file (or stdout) for finance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="File to write to; '-' for stdout.")
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--level', choices=EXPORT_LEVELS, default='items',
+                            help="One row per order item (default) or per order.")
+        parser.add_argument('--since', help="First local day to include (YYYY-MM-DD).")
+        parser.add_argument('--until', help="Last local day to include (YYYY-MM-DD).")
+        parser.add_argument('--status')
+        parser.add_argument('--payment-status')
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_export_filters(options)
+        except ValueError as e:
+            raise CommandError(e)
+
+        header, rows = export_rows(options['level'], **filters)
+        chunks = stream_export(options['format'], header, rows)
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+            for chunk in chunks:
+                out.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported orders to {options['output']}."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.customers import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = "Backfill (or repair) CustomerStats from paid, non-cancelled orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        customers = rebuild_customer_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {customers} customers."))
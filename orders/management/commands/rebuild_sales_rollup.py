@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from orders.rollup import rebuild_sales_rollup
+
+
+class Command(BaseCommand):
+    help = "Backfill (or repair) the DailySalesRollup table from the orders table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help="First local day to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--until', type=date.fromisoformat, help="Last local day to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        days = rebuild_sales_rollup(options['since'], options['until'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the sales rollup for {days} days."))
@@ -0,0 +1,114 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from cart.models import Cart, CartItem
+from common.models import EmailJob
+from common.seeding import check_bench_database
+from orders.checkout import CheckoutError, contention_metrics, place_order
+from orders.models import Order, OrderItem
+from products.models import Brand, Category, Color, Product, ProductVariant, Size
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent checkouts against one hot variant and verify that stock is never oversold. "
+        "Refuses to run unless DEBUG is on, the database name matches BENCH_DATABASE_PATTERN or --force is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=50, help="Number of buyers, each with the variant in the cart.")
+        parser.add_argument('--stock', type=int, default=60, help="Initial stock of the hot variant.")
+        parser.add_argument('--quantity', type=int, default=2, help="Units each buyer tries to buy.")
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--keep', action='store_true', help="Keep the generated users, product and orders.")
+        parser.add_argument('--force', action='store_true',
+                            help="Run even when the database does not look like a benchmark database.")
+
+    def handle(self, *args, **options):
+        check_bench_database(options['force'])
+        run_id = uuid.uuid4().hex[:8]
+        variant, users = self.setup(run_id, options)
+        contention_metrics.reset()
+        outcomes = {'ok': 0, 'out_of_stock': 0}
+        outcomes_lock = threading.Lock()
+
+        def buy(user):
+            try:
+                place_order(user, tran_id=f'stress-{run_id}', shipping_address='stress test')
+                outcome = 'ok'
+            except CheckoutError:
+                outcome = 'out_of_stock'
+            finally:
+                connection.close()
+            with outcomes_lock:
+                outcomes[outcome] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(buy, users))
+        elapsed = time.perf_counter() - started
+
+        variant.refresh_from_db()
+        sold = OrderItem.objects.filter(variant=variant).aggregate(total=Sum('quantity'))['total'] or 0
+        expected_sales = min(options['buyers'], options['stock'] // options['quantity'])
+        metrics = contention_metrics.snapshot()
+
+        self.stdout.write(f"checkouts: {outcomes['ok']} ok, {outcomes['out_of_stock']} out of stock in {elapsed:.2f}s "
+                          f"({len(users) / elapsed:.1f} checkouts/s)")
+        self.stdout.write(f"units sold: {sold}, stock left: {variant.stock}, retries: {metrics['retries']}")
+
+        try:
+            if variant.stock + sold != options['stock'] or variant.stock < 0:
+                raise CommandError(f"Stock mismatch: started with {options['stock']}, sold {sold}, left {variant.stock}.")
+            if outcomes['ok'] != expected_sales:
+                raise CommandError(f"Expected {expected_sales} successful checkouts, got {outcomes['ok']}.")
+            self.stdout.write(self.style.SUCCESS("No oversell."))
+        finally:
+            if not options['keep']:
+                self.cleanup(run_id, variant)
+
+    def setup(self, run_id, options):
+        # Taxonomy rows this run creates are removed again by cleanup().
+        self.created = []
+        category, brand, color, size = (self.get_or_create(model) for model in (Category, Brand, Color, Size))
+        product = Product.objects.create(
+            name=f'Stress test {run_id}', description='Hot variant for checkout stress test',
+            category=category, brand=brand,
+        )
+        variant = ProductVariant.objects.create(
+            product=product, color=color, size=size, stock=options['stock'], price=Decimal('100.00'),
+        )
+        User.objects.bulk_create([
+            User(email=f'stress-{run_id}-{i}@example.com', first_name='Stress', last_name=str(i))
+            for i in range(options['buyers'])
+        ])
+        users = list(User.objects.filter(email__startswith=f'stress-{run_id}-'))
+        Cart.objects.bulk_create([Cart(user=user) for user in users])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, variant=variant, quantity=options['quantity'])
+            for cart in Cart.objects.filter(user__in=users)
+        ])
+        return variant, users
+
+    def get_or_create(self, model):
+        instance, created = model.objects.get_or_create(name='Stress test')
+        if created:
+            self.created.append(instance)
+        return instance
+
+    def cleanup(self, run_id, variant):
+        orders = Order.objects.filter(tran_id=f'stress-{run_id}')
+        EmailJob.objects.filter(kind='order_confirmation', object_id__in=orders.values('pk')).delete()
+        orders.delete()
+        variant.product.delete()
+        User.objects.filter(email__startswith=f'stress-{run_id}-').delete()
+        for instance in reversed(self.created):
+            instance.delete()
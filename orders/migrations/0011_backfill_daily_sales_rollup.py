@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 17:40
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+ROLLUP_FIELDS = ['order_count', 'order_total', 'paid_count', 'paid_total']
+
+
+def backfill_sales_rollup(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    DailySalesRollup = apps.get_model('orders', 'DailySalesRollup')
+    paid = Q(payment_status='paid')
+    rows = [
+        DailySalesRollup(date=row['day'], **{field: row[field] for field in ROLLUP_FIELDS})
+        for row in Order.objects.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .order_by().values('day').annotate(
+            order_count=Count('id'),
+            order_total=Coalesce(Sum('total_price'), Value(Decimal('0.00'))),
+            paid_count=Count('id', filter=paid),
+            paid_total=Coalesce(Sum('total_price', filter=paid), Value(Decimal('0.00'))),
+        )
+    ]
+    DailySalesRollup.objects.bulk_create(
+        rows, batch_size=1000, update_conflicts=True, unique_fields=['date'], update_fields=ROLLUP_FIELDS,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_customer_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sales_rollup, migrations.RunPython.noop),
+    ]
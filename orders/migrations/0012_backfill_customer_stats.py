@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 17:45
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce
+
+STATS_FIELDS = ['lifetime_spend', 'order_count', 'first_order_at', 'last_order_at']
+
+
+def backfill_customer_stats(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    CustomerStats = apps.get_model('orders', 'CustomerStats')
+    rows = [
+        CustomerStats(user_id=row['user_id'], **{field: row[field] for field in STATS_FIELDS})
+        for row in Order.objects.filter(payment_status='paid').exclude(status='cancelled')
+        .order_by().values('user_id').annotate(
+            lifetime_spend=Coalesce(Sum('total_price'), Value(Decimal('0.00'))),
+            order_count=Count('id'),
+            first_order_at=Min('created_at'),
+            last_order_at=Max('created_at'),
+        )
+    ]
+    CustomerStats.objects.bulk_create(
+        rows, batch_size=1000, update_conflicts=True, unique_fields=['user'],
+        update_fields=[*STATS_FIELDS, 'updated_at'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_backfill_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
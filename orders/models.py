@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 from products.models import ProductVariant
+from .customers import customer_contribution
+from .rollup import rollup_contribution
 
 
 class Order(models.Model):
@@ -35,6 +37,15 @@ class Order(models.Model):
         models.Index(fields=["created_at"]),
     ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What this order contributed to DailySalesRollup when it was loaded.
+        instance._rollup_snapshot = rollup_contribution(instance)
+        # ... and to its customer's CustomerStats.
+        instance._customer_snapshot = customer_contribution(instance)
+        return instance
+
     def __str__(self):
         return f"Order #{self.id} by {self.user}"
 
@@ -51,3 +62,44 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.variant} x {self.quantity}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Per-day order totals for the admin dashboard, maintained incrementally by
+    ``orders.signals`` (see ``orders.rollup``). Days are local calendar days.
+    """
+    date = models.DateField(unique=True)
+    order_count = models.PositiveIntegerField(default=0)
+    order_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_count = models.PositiveIntegerField(default=0)
+    paid_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {self.order_count} orders"
+
+
+class CustomerStats(models.Model):
+    """
+    Lifetime spend of a customer over their paid, non-cancelled orders,
+    maintained incrementally by ``orders.signals`` (see ``orders.customers``).
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='customer_stats'
+    )
+    lifetime_spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    first_order_at = models.DateTimeField(null=True, blank=True)
+    last_order_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-lifetime_spend', 'user'], name='orders_top_customers_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.lifetime_spend}"
@@ -3,5 +3,5 @@ from rest_framework.permissions import BasePermission, SAFE_METHODS
 class IsAdminOrReadOnlyOrder(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
-            return obj.user == request.user or request.user.is_staff
+            return obj.user_id == request.user.pk or request.user.is_staff
         return request.user.is_staff
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+ROLLUP_FIELDS = ('order_count', 'order_total', 'paid_count', 'paid_total')
+ZERO = Decimal('0.00')
+
+
+def rollup_contribution(order):
+    """
+    Return ``(date, counters)`` describing what ``order`` adds to the rollup,
+    or None when the fields it depends on were not loaded.
+    """
+    values = order.__dict__
+    if values.get('created_at') is None or values.get('total_price') is None or 'payment_status' not in values:
+        return None
+    total = Decimal(values['total_price'])
+    paid = values['payment_status'] == 'paid'
+    return timezone.localdate(values['created_at']), {
+        'order_count': 1,
+        'order_total': total,
+        'paid_count': 1 if paid else 0,
+        'paid_total': total if paid else ZERO,
+    }
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Add ``deltas`` (date -> counters) to the rollup with one ``UPDATE ...
+    SET x = x + n`` per day, creating missing days.
+    """
+    from .models import DailySalesRollup
+
+    for day, counters in deltas.items():
+        if not any(counters.values()):
+            continue
+        changes = {field: F(field) + counters[field] for field in ROLLUP_FIELDS}
+        if DailySalesRollup.objects.filter(date=day).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                DailySalesRollup.objects.create(date=day, **counters)
+        except IntegrityError:
+            # Another transaction created the day first.
+            DailySalesRollup.objects.filter(date=day).update(**changes)
+
+
+def record_order_change(old, new):
+    """
+    Move an order's contribution from ``old`` to ``new`` (either may be None
+    for a created or deleted order).
+
+    The day rows are updated once the caller's transaction commits, never
+    inside it: every checkout of the day touches the same row, and holding
+    its lock until the order commits would serialize them all. A failure
+    there is logged and left for ``rebuild_sales_rollup``.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    for contribution, sign in ((old, -1), (new, 1)):
+        if contribution is None:
+            continue
+        day, counters = contribution
+        for field in ROLLUP_FIELDS:
+            deltas[day][field] += sign * counters[field]
+    transaction.on_commit(lambda: apply_rollup_deltas(deltas), robust=True)
+
+
+def rebuild_sales_rollup(start=None, end=None):
+    """
+    Recompute rollup rows for local days between ``start`` and ``end``
+    (inclusive, both optional) from the order table in one grouped query.
+    Returns the number of days written.
+    """
+    from .models import DailySalesRollup, Order
+
+    orders = Order.objects.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+    rollups = DailySalesRollup.objects.all()
+    if start:
+        orders = orders.filter(day__gte=start)
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        orders = orders.filter(day__lte=end)
+        rollups = rollups.filter(date__lte=end)
+
+    paid = Q(payment_status='paid')
+    rows = [
+        DailySalesRollup(date=row['day'], **{field: row[field] for field in ROLLUP_FIELDS})
+        for row in orders.order_by().values('day').annotate(
+            order_count=Count('id'),
+            order_total=Coalesce(Sum('total_price'), Value(ZERO)),
+            paid_count=Count('id', filter=paid),
+            paid_total=Coalesce(Sum('total_price', filter=paid), Value(ZERO)),
+        )
+    ]
+    with transaction.atomic():
+        rollups.exclude(date__in=[row.date for row in rows]).delete()
+        DailySalesRollup.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, unique_fields=['date'], update_fields=list(ROLLUP_FIELDS),
+        )
+    return len(rows)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
-from products.serializers import ProductVariantSerializer
+from products.serializers import ProductVariantSerializer, FlatVariantSerializer
+from common.flat import FlatSerializer, Inline, Nested, datetime_value, decimal_value
 
 class OrderItemSerializer(serializers.ModelSerializer):
     variant = ProductVariantSerializer(read_only=True)
@@ -42,3 +43,42 @@ class OrderSerializer(serializers.ModelSerializer):
             'tran_id',
             'shipping_address',
         ]
+
+
+class FlatOrderItemSerializer(FlatSerializer):
+    model = OrderItem
+    ordering = ['id']
+    fields = ['id', 'variant', 'quantity', 'price']
+    formats = {'price': decimal_value}
+    nested = {'variant': Inline(FlatVariantSerializer, 'variant')}
+
+
+class FlatOrderSerializer(FlatSerializer):
+    """
+    ``OrderSerializer`` output built from ``.values()`` rows; the items of a
+    whole page, with their variant data, are read in one query.
+    """
+    model = Order
+    fields = [
+        'id', 'status', 'status_display', 'payment_status', 'payment_status_display', 'total_price',
+        'created_at', 'updated_at', 'items', 'tran_id', 'shipping_address',
+    ]
+    sources = {'status_display': ['status'], 'payment_status_display': ['payment_status']}
+    formats = {
+        'total_price': decimal_value,
+        'created_at': datetime_value,
+        'updated_at': datetime_value,
+    }
+    nested = {'items': Nested(FlatOrderItemSerializer, 'order_id')}
+    # The owner is checked by IsAdminOrReadOnlyOrder on retrieve.
+    always = ['id', 'user_id']
+    status_labels = dict(Order.STATUS_CHOICES)
+    payment_status_labels = dict(Order.PAYMENT_STATUS_CHOICES)
+
+    def get_status_display(self, row):
+        status = row[self.prefix + 'status']
+        return self.status_labels.get(status, status)
+
+    def get_payment_status_display(self, row):
+        status = row[self.prefix + 'payment_status']
+        return self.payment_status_labels.get(status, status)
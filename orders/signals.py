@@ -1,42 +1,92 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
-from .models import Order
 from django.db import transaction
+from django.utils import timezone
+from common.mailqueue import PermanentEmailError, enqueue_email, register_email
+from .models import Order
+from .customers import (
+    MISSING, customer_contribution, rebuild_customer_stats, recount_customer, record_customer_order_change
+)
+from .rollup import rebuild_sales_rollup, record_order_change, rollup_contribution
 import logging
 
 logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=Order)
 def send_order_confirmation_email(sender, instance, created, **kwargs):
+    # The job is written in the order's own transaction, so it is only ever
+    # picked up by the mail worker once the order is committed.
     if created:
-        transaction.on_commit(lambda: _send_email(instance))
+        enqueue_email('order_confirmation', object_id=instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollup(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rollup_snapshot', None)
+    current = rollup_contribution(instance)
+    if created:
+        record_order_change(None, current)
+    elif previous and current:
+        if previous != current:
+            record_order_change(previous, current)
+    else:
+        # Saved without a full snapshot of what it contributed before:
+        # recount its day (created_at never changes after insert).
+        day = timezone.localdate(Order.objects.values_list('created_at', flat=True).get(pk=instance.pk))
+        transaction.on_commit(lambda: rebuild_sales_rollup(day, day), robust=True)
+        current = rollup_contribution(instance)
+    instance._rollup_snapshot = current
+
 
+@receiver(post_delete, sender=Order)
+def remove_from_sales_rollup(sender, instance, **kwargs):
+    snapshot = getattr(instance, '_rollup_snapshot', None) or rollup_contribution(instance)
+    if snapshot:
+        record_order_change(snapshot, None)
 
-def _send_email(order):
+
+@receiver(post_save, sender=Order)
+def update_customer_stats(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_customer_snapshot', MISSING)
+    current = customer_contribution(instance)
+    if previous is MISSING or current is MISSING:
+        rebuild_customer_stats([instance.user_id])
+    else:
+        record_customer_order_change(previous, current)
+    instance._customer_snapshot = current
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_customer_stats(sender, instance, **kwargs):
+    if getattr(instance, '_customer_snapshot', None) is not None:
+        recount_customer(instance.user_id)
+
+
+@register_email('order_confirmation')
+def build_order_confirmation_email(job):
     try:
         order = Order.objects.prefetch_related(
             'items__variant__size',
             'items__variant__color',
             'items__variant__product'
-        ).select_related('user').get(pk=order.pk)
-        
-        subject = f"Order #{order.id} Confirmation"
-        message = render_to_string('orders/order_confirmation_email.html', {
-            'user': order.user,
-            'order': order,
-            'order_items': order.items.all()
-        })
-
-        send_mail(
-            subject=subject,
-            message='',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[order.user.email],
-            html_message=message,
-            fail_silently=False
-        )
-    except Exception as e:
-        logger.error(f"Failed to send order confirmation email for Order #{order.pk}: {e}")
+        ).select_related('user').get(pk=job.object_id)
+    except Order.DoesNotExist:
+        raise PermanentEmailError(f"Order #{job.object_id} no longer exists")
+
+    subject = f"Order #{order.id} Confirmation"
+    html = render_to_string('orders/order_confirmation_email.html', {
+        'user': order.user,
+        'order': order,
+        'order_items': order.items.all()
+    })
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body='',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[order.user.email],
+    )
+    message.attach_alternative(html, 'text/html')
+    return message
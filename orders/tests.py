@@ -1,3 +1,137 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import transaction
 from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from cart.models import Cart, CartItem
+from products.models import Color, Product, ProductVariant, Size, StockReservation
+from products.reservations import reserve
+from users.models import User
+from .checkout import OutOfStockError, place_order
+from .models import CustomerStats, DailySalesRollup, Order
+from .permissions import IsAdminOrReadOnlyOrder
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer@example.com', 'pass', first_name='B', last_name='C')
+
+    def test_day_row_is_updated_after_the_order_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                order = Order.objects.create(user=self.user, total_price=Decimal('40.00'), payment_status='paid')
+                self.assertFalse(DailySalesRollup.objects.exists())
+
+        row = DailySalesRollup.objects.get()
+        self.assertEqual((row.order_count, row.order_total, row.paid_count, row.paid_total),
+                         (1, Decimal('40.00'), 1, Decimal('40.00')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.payment_status = 'refunded'
+            order.save()
+            order.delete()
+        row.refresh_from_db()
+        self.assertEqual((row.order_count, row.order_total, row.paid_count), (0, Decimal('0.00'), 0))
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name='Shirt', description='Cotton')
+        self.variant = ProductVariant.objects.create(
+            product=product, color=Color.objects.create(name='Red'), size=Size.objects.create(name='M'),
+            stock=3, price=Decimal('10.00'),
+        )
+        self.buyers = [
+            User.objects.create_user(f'buyer{n}@example.com', 'pass', first_name='B', last_name=str(n))
+            for n in range(2)
+        ]
+
+    def fill_cart(self, user, quantity):
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, variant=self.variant, quantity=quantity)
+
+    def test_last_units_are_sold_once(self):
+        self.fill_cart(self.buyers[0], 2)
+        self.fill_cart(self.buyers[1], 2)
+
+        order = place_order(self.buyers[0], shipping_address='Street 1')
+        with self.assertRaises(OutOfStockError) as raised:
+            place_order(self.buyers[1])
+
+        self.assertEqual(raised.exception.available, 1)
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 1)
+        self.assertEqual(list(Order.objects.all()), [order])
+        self.assertEqual(order.total_price, Decimal('20.00'))
+        self.assertTrue(CartItem.objects.filter(cart__user=self.buyers[1]).exists())
+
+    def test_holds_of_other_payments_are_respected(self):
+        reserve('other-payment', [(self.variant.pk, 2)])
+        self.fill_cart(self.buyers[0], 2)
+
+        with self.assertRaises(OutOfStockError):
+            place_order(self.buyers[0], tran_id='mine')
+
+        reserve('mine', [(self.variant.pk, 1)])
+        CartItem.objects.filter(cart__user=self.buyers[0]).update(quantity=1)
+        place_order(self.buyers[0], tran_id='mine')
+        self.assertEqual(StockReservation.objects.get(reference='mine').status, 'converted')
+        self.assertEqual(ProductVariant.objects.get(pk=self.variant.pk).stock, 2)
+
+
+class CustomerStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer@example.com', 'pass', first_name='B', last_name='C')
+
+    def order(self, total, **kwargs):
+        return Order.objects.create(user=self.user, total_price=Decimal(total), payment_status='paid', **kwargs)
+
+    def test_paid_orders_add_up_and_cancellations_are_taken_back(self):
+        self.order('25.00')
+        second = self.order('15.50')
+        Order.objects.create(user=self.user, total_price=Decimal('99.00'))
+
+        stats = CustomerStats.objects.get(user=self.user)
+        self.assertEqual((stats.lifetime_spend, stats.order_count), (Decimal('40.50'), 2))
+
+        second.status = 'cancelled'
+        second.save()
+        stats.refresh_from_db()
+        self.assertEqual((stats.lifetime_spend, stats.order_count, stats.last_order_at),
+                         (Decimal('25.00'), 1, stats.first_order_at))
+
+        Order.objects.filter(user=self.user).delete()
+        self.assertFalse(CustomerStats.objects.exists())
+
+
+class FlatOrderPermissionTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner@example.com', 'pass', first_name='O', last_name='W')
+        self.order = Order.objects.create(user=self.owner, total_price=Decimal('30.00'), payment_status='paid')
+        self.url = f'/orders/api/orders/{self.order.pk}/'
+
+    def test_object_permission_sees_the_model_instance(self):
+        self.client.force_authenticate(self.owner)
+        check = IsAdminOrReadOnlyOrder.has_object_permission
+        seen = []
+
+        def recording_check(permission, request, view, obj):
+            seen.append(obj)
+            return check(permission, request, view, obj)
+
+        with mock.patch.object(IsAdminOrReadOnlyOrder, 'has_object_permission', recording_check):
+            response = self.client.get(self.url, {'fields': 'id,total_price'})
+
+        self.assertEqual(response.json(), {'id': self.order.pk, 'total_price': '30.00'})
+        self.assertEqual(seen, [self.order])
+        self.assertIsInstance(seen[0], Order)
+
+    def test_denied_object_permission_is_enforced(self):
+        self.client.force_authenticate(self.owner)
+
+        with mock.patch.object(IsAdminOrReadOnlyOrder, 'has_object_permission', return_value=False):
+            response = self.client.get(self.url)
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 403)
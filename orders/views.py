@@ -1,15 +1,19 @@
 from rest_framework.decorators import action
+from django.http import StreamingHttpResponse
+from django.utils.timezone import localdate
 from rest_framework.response import Response
 from rest_framework import status, permissions, viewsets
-from django.db import transaction
-from cart.models import Cart, CartItem
-from .models import Order, OrderItem
-from .serializers import OrderSerializer
+from .models import Order
+from .serializers import OrderSerializer, FlatOrderSerializer
 from .permissions import IsAdminOrReadOnlyOrder
-from products.models import ProductVariant
-from common.paginations import CustomPagination
-
-class OrderViewSet(viewsets.ModelViewSet):
+from .checkout import place_order, CheckoutError, contention_metrics
+from cart.guest import GuestCartBusy, merge_guest_cart
+from cart.mutations import CartLineError
+from .exports import EXPORT_FORMATS, EXPORT_LEVELS, export_rows, parse_export_filters, stream_export
+from common.paginations import CustomPagination, SelectablePaginationMixin, OrderCursorPagination
+from common.flat import FlatReadMixin
+
+class OrderViewSet(SelectablePaginationMixin, FlatReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing customer orders.
 
@@ -24,17 +28,33 @@ class OrderViewSet(viewsets.ModelViewSet):
       • Direct order creation via this endpoint is disabled.
       • Only admin users can modify or delete orders after checkout.
 
+    - Pagination:
+      • Page-number pagination by default.
+      • Send `?pagination=cursor` for keyset pagination on `created_at` (no count query).
+      • JSON list and detail responses are built from `.values()` rows by `FlatOrderSerializer`.
+      • `?fields=id,total_price,items.quantity` keeps only the named fields; `?expand=items`
+        (or `items.variant`) lists the nested fields to embed, others are given as ids.
+
+    - Export action (admin only):
+      • `GET /orders/export/?output=csv|jsonl&level=items|orders&since=&until=&status=&payment_status=`
+      • Streams every matching order (or order item) without pagination, read in chunks
+        through a server-side cursor.
+
     - Checkout action:
       • Creates an order from the user's cart.
-      • Validates stock availability for each item.
-      • Deducts purchased quantities from product variant stock.
+      • Deducts purchased quantities with a conditional update per variant (no oversell).
+      • Rolls the whole order back if any item is out of stock.
+      • Retries serialization failures and lock timeouts with backoff.
       • Saves order items and calculates total price.
       • Clears the user's cart after successful order placement.
+      • An optional `guest_token` merges that guest cart into the user's cart first.
     """
 
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnlyOrder]
     serializer_class = OrderSerializer
+    flat_serializer_class = FlatOrderSerializer
     pagination_class = CustomPagination
+    cursor_pagination_class = OrderCursorPagination
 
     def get_queryset(self):
         queryset = Order.objects.select_related('user').prefetch_related(
@@ -71,60 +91,55 @@ class OrderViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
     @action(detail=False, methods=['post'])
-    @transaction.atomic
     def checkout(self, request):
-        user = request.user
-        tran_id = request.data.get("tran_id")
-        shipping_address = request.data.get("address")
-
-        # Get the user's cart
-        cart = Cart.objects.select_related('user').filter(user=user).first()
-        if not cart:
-            return Response({'error': 'Cart not found.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Load cart items with related variant data
-        items = CartItem.objects.select_related(
-            'variant', 'variant__color', 'variant__size', 'variant__product'
-        ).select_for_update().filter(cart=cart)
-
-        if not items.exists():
-            return Response({'error': 'Cart is empty.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Create order
-        order = Order.objects.create(user=user, total_price=0, payment_status='paid', status='processing', tran_id=tran_id, shipping_address=shipping_address)
-        total_price = 0
-        order_items = []
-        updated_variants = []
-
-        # Process cart items and create order items
-        for item in items:
-            variant = item.variant
-
-            if item.quantity > variant.stock:
-                return Response({
-                    'error': f"Not enough stock for {variant}. Available: {variant.stock}"
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            order_items.append(OrderItem(
-                order=order,
-                variant=variant,
-                quantity=item.quantity,
-                price=variant.price
-            ))
-
-            variant.stock -= item.quantity
-            updated_variants.append(variant)
-            total_price += variant.price * item.quantity
-
-        OrderItem.objects.bulk_create(order_items)
-        ProductVariant.objects.bulk_update(updated_variants, ['stock'])
-
-        # Finalize order
-        order.total_price = total_price
-        order.save()
-
-        # Clear cart
-        items.delete()
+        guest_token = request.data.get("guest_token")
+        if guest_token:
+            # Lines the visitor added before logging in join the cart first.
+            try:
+                merge_guest_cart(request.user, guest_token)
+            except GuestCartBusy:
+                return Response({'error': "The cart is being updated; try again."}, status=status.HTTP_409_CONFLICT)
+            except CartLineError as exc:
+                return Response({'error': exc.errors[0]['error']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            order = place_order(
+                request.user,
+                tran_id=request.data.get("tran_id"),
+                shipping_address=request.data.get("address"),
+            )
+        except CheckoutError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='checkout-metrics', permission_classes=[permissions.IsAdminUser])
+    def checkout_metrics(self, request):
+        """
+        Per-variant checkout contention counters of this worker process.
+        """
+        return Response(contention_metrics.snapshot())
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """
+        Stream matching orders or order items as CSV or JSONL.
+        """
+        params = request.query_params
+        output = params.get('output', 'csv')
+        level = params.get('level', 'items')
+        if output not in EXPORT_FORMATS or level not in EXPORT_LEVELS:
+            return Response(
+                {'error': f"'output' must be one of {', '.join(EXPORT_FORMATS)} and 'level' one of {', '.join(EXPORT_LEVELS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            filters = parse_export_filters(params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        header, rows = export_rows(level, **filters)
+        content_type = 'text/csv' if output == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(stream_export(output, header, rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="orders-{level}-{localdate():%Y%m%d}.{output}"'
+        return response
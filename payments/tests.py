@@ -1,3 +1,45 @@
-from django.test import TestCase
+import hashlib
 
-# Create your tests here.
+from rest_framework.test import APITestCase
+
+from products.models import Color, Product, ProductVariant, Size, StockReservation
+from products.reservations import reserve
+from .views import SSL_SETTINGS
+
+
+def sign(data):
+    signed = dict(data, store_passwd=hashlib.md5(SSL_SETTINGS['store_pass'].encode()).hexdigest())
+    digest = hashlib.md5('&'.join(f'{key}={signed[key]}' for key in sorted(signed)).encode()).hexdigest()
+    return dict(data, verify_key=','.join(data), verify_sign=digest)
+
+
+class PaymentCallbackTests(APITestCase):
+    def setUp(self):
+        product = Product.objects.create(name='Shirt', description='Cotton')
+        variant = ProductVariant.objects.create(
+            product=product, color=Color.objects.create(name='Red'), size=Size.objects.create(name='M'),
+            stock=5, price=10,
+        )
+        self.tran_id = 'transectionId720261018'
+        reserve(self.tran_id, [(variant.pk, 2)])
+
+    def active_holds(self):
+        return StockReservation.objects.filter(reference=self.tran_id, status='active').count()
+
+    def test_unsigned_cancel_keeps_the_holds(self):
+        self.client.post('/payment/api/cancel/', {'tran_id': self.tran_id})
+        self.client.post('/payment/api/fail/', {'tran_id': self.tran_id, 'verify_key': 'tran_id', 'verify_sign': 'x'})
+
+        self.assertEqual(self.active_holds(), 1)
+
+    def test_signature_must_cover_the_tran_id(self):
+        data = sign({'status': 'CANCELLED'})
+        self.client.post('/payment/api/cancel/', dict(data, tran_id=self.tran_id))
+
+        self.assertEqual(self.active_holds(), 1)
+
+    def test_signed_callback_releases_the_holds(self):
+        response = self.client.post('/payment/api/fail/', sign({'tran_id': self.tran_id, 'status': 'FAILED'}))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.active_holds(), 0)
@@ -9,7 +9,21 @@ from orders.views import OrderViewSet
 from rest_framework.test import APIRequestFactory, force_authenticate
 from datetime import date
 from django.http import JsonResponse
+from products.reservations import reserve, release, InsufficientStockError
 from .models import TemporaryAddress
+import logging
+
+logger = logging.getLogger(__name__)
+
+SSL_SETTINGS = {
+    'store_id': 'pzafi6810e1dc1b643',
+    'store_pass': 'pzafi6810e1dc1b643@ssl',
+    'issandbox': True
+}
+
+
+def build_tran_id(cart_id):
+    return f"transectionId{cart_id}{date.today().strftime('%Y%m%d')}"
 
 
 def extract_cart_id_from_tran_id(tran_id):
@@ -19,6 +33,27 @@ def extract_cart_id_from_tran_id(tran_id):
         return None
 
 
+def verified_tran_id(data):
+    """
+    Return the ``tran_id`` of a gateway callback, or None unless the callback
+    is signed with the store password (``verify_sign`` over the fields listed
+    in ``verify_key``) and the signature covers ``tran_id``.
+    """
+    data = dict(data.items())
+    tran_id = data.get("tran_id")
+    if not tran_id or "tran_id" not in (data.get("verify_key") or "").split(","):
+        return None
+    try:
+        valid = SSLCOMMERZ(SSL_SETTINGS).hash_validate_ipn(data)
+    except KeyError:
+        # verify_key names a field the callback does not carry.
+        valid = False
+    if not valid:
+        logger.warning("Ignoring unsigned payment callback for %s", tran_id)
+        return None
+    return tran_id
+
+
 @api_view(['POST'])
 def initiate_payment(request):
     user = request.user
@@ -29,6 +64,17 @@ def initiate_payment(request):
     city = request.data.get("city")
     country = request.data.get("country")
     unique_id = f"{cart_id}{date.today().strftime('%Y%m%d')}"
+    tran_id = build_tran_id(cart_id)
+
+    cart = Cart.objects.filter(id=cart_id, user=user).first()
+    if not cart:
+        return Response({"error": "Cart not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Hold the cart's stock until the payment succeeds, fails or the hold expires.
+    try:
+        reserve(tran_id, cart.items.values_list('variant_id', 'quantity'))
+    except InsufficientStockError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     TemporaryAddress.objects.update_or_create(
         user=user,
@@ -44,18 +90,12 @@ def initiate_payment(request):
     if user.phone == None:
         user.phone = "01234567891"
 
-    ssl_settings = {
-        'store_id': 'pzafi6810e1dc1b643',
-        'store_pass': 'pzafi6810e1dc1b643@ssl',
-        'issandbox': True
-    }
-
-    sslcz = SSLCOMMERZ(ssl_settings)
+    sslcz = SSLCOMMERZ(SSL_SETTINGS)
 
     post_body = {
         'total_amount': amount,
         'currency': 'BDT',
-        'tran_id': f"transectionId{cart_id}{date.today().strftime('%Y%m%d')}",
+        'tran_id': tran_id,
         'success_url': f"{settings.BACKEND_URL}/payment/api/success/",
         'fail_url': f"{settings.BACKEND_URL}/payment/api/fail/",
         'cancel_url': f"{settings.BACKEND_URL}/payment/api/cancel/",
@@ -79,6 +119,7 @@ def initiate_payment(request):
     if response.get("status") == "SUCCESS":
         return Response({"payment_url": response["GatewayPageURL"]})
 
+    release(tran_id)
     return Response(
         {"error": "Payment initiation failed"},
         status=status.HTTP_400_BAD_REQUEST
@@ -132,10 +173,18 @@ def payment_success(request):
 
 @api_view(['POST'])
 def payment_cancel(request):
+    # Holds are released only for callbacks signed by the gateway; anything
+    # else is left to expire, so a guessed tran_id cannot free another cart's stock.
+    tran_id = verified_tran_id(request.data)
+    if tran_id:
+        release(tran_id)
     return HttpResponseRedirect(f"{settings.FRONTEND_URL}/payment/cancel/")
 
 
 @api_view(['POST'])
 def payment_fail(request):
+    tran_id = verified_tran_id(request.data)
+    if tran_id:
+        release(tran_id)
     return HttpResponseRedirect(f"{settings.FRONTEND_URL}/payment/fail/")
 
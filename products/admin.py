@@ -1,7 +1,20 @@
 from django.contrib import admin
-from .models import Category, Brand, Product, ProductImage
+from .models import Category, Brand, Product, ProductImage, ProductSummary, StockReservation
 
 admin.site.register(Category)
 admin.site.register(Brand)
 admin.site.register(Product)
 admin.site.register(ProductImage)
+
+
+@admin.register(ProductSummary)
+class ProductSummaryAdmin(admin.ModelAdmin):
+    list_display = ['product', 'category_name', 'brand_name', 'min_price', 'max_price', 'total_stock', 'updated_at']
+    search_fields = ['name']
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'variant', 'quantity', 'reference', 'status', 'expires_at', 'created_at']
+    search_fields = ['reference']
+    list_filter = ['status']
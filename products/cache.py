@@ -0,0 +1,164 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+TAXONOMY_VERSION_KEY = 'catalog:taxonomy:version'
+FACET_VERSION_KEY = 'catalog:facets:version'
+PRODUCT_VERSION_KEY = 'catalog:product:{}:version'
+STATS_KEY = 'catalog:stats:{}:{}'
+
+# Namespaces of every viewset using CatalogCacheMixin, in definition order.
+CACHE_NAMESPACES = []
+
+
+def get_catalog_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _new_version():
+    # Seeding versions from the clock means a counter that was evicted never
+    # comes back with a value an older cache entry was stored under.
+    return int(time.time() * 1000)
+
+
+def _get_versions(keys):
+    cache = get_catalog_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump_version(key):
+    cache = get_catalog_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _new_version(), timeout=None)
+
+
+def get_catalog_version():
+    (version,) = _get_versions([CATALOG_VERSION_KEY])
+    return version
+
+
+def get_facet_version():
+    """
+    Version of the data the facet index is built from: the facet columns of
+    the product summaries and the taxonomy names. Stock, rating and other
+    product writes leave it alone.
+    """
+    return '{}-{}'.format(*_get_versions([FACET_VERSION_KEY, TAXONOMY_VERSION_KEY]))
+
+
+def bump_facet_version():
+    _bump_version(FACET_VERSION_KEY)
+
+
+def bump_product_version(product_id):
+    """
+    Invalidate cached responses that contain the given product.
+
+    The detail entry is keyed by the product's own counter, list pages are
+    keyed by the catalog-wide counter, so both are bumped.
+    """
+    if product_id is not None:
+        _bump_version(PRODUCT_VERSION_KEY.format(product_id))
+    _bump_version(CATALOG_VERSION_KEY)
+
+
+def bump_taxonomy_version():
+    """
+    Invalidate every cached catalog response after a category, brand, color
+    or size change, since their names are embedded in all products.
+    """
+    _bump_version(TAXONOMY_VERSION_KEY)
+    _bump_version(CATALOG_VERSION_KEY)
+
+
+def _record(namespace, outcome):
+    cache = get_catalog_cache()
+    key = STATS_KEY.format(namespace, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_cache_stats(namespaces=None):
+    if namespaces is None:
+        namespaces = CACHE_NAMESPACES
+    cache = get_catalog_cache()
+    keys = {
+        (namespace, outcome): STATS_KEY.format(namespace, outcome)
+        for namespace in namespaces
+        for outcome in ('hit', 'miss')
+    }
+    values = cache.get_many(list(keys.values()))
+    stats = {}
+    for namespace in namespaces:
+        hits = values.get(keys[(namespace, 'hit')], 0)
+        misses = values.get(keys[(namespace, 'miss')], 0)
+        total = hits + misses
+        stats[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0,
+        }
+    return stats
+
+
+class CatalogCacheMixin:
+    """
+    Read-through cache for the ``list`` and ``retrieve`` actions of a catalog viewset.
+
+    Entries are keyed by the query string and the caller's role, and embed the
+    version counters that ``products.signals`` bump on every catalog write, so
+    stale entries are never read again and simply expire.
+    """
+    cache_namespace = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cache_namespace and cls.cache_namespace not in CACHE_NAMESPACES:
+            CACHE_NAMESPACES.append(cls.cache_namespace)
+
+    def list(self, request, *args, **kwargs):
+        key = self._get_cache_key(request, 'list', get_catalog_version())
+        return self._cached_response(key, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        versions = _get_versions([TAXONOMY_VERSION_KEY, PRODUCT_VERSION_KEY.format(lookup)])
+        key = self._get_cache_key(request, f'retrieve:{lookup}', *versions)
+        return self._cached_response(key, super().retrieve, request, *args, **kwargs)
+
+    def _get_cache_key(self, request, action, *versions):
+        role = 'staff' if request.user.is_staff else 'public'
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        digest = hashlib.md5(f'{request.accepted_media_type}?{query}'.encode()).hexdigest()
+        version = '.'.join(str(v) for v in versions)
+        return f'catalog:{self.cache_namespace}:{action}:{role}:{version}:{digest}'
+
+    def _cached_response(self, key, handler, request, *args, **kwargs):
+        cache = get_catalog_cache()
+        data = cache.get(key)
+        if data is not None:
+            _record(self.cache_namespace, 'hit')
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        _record(self.cache_namespace, 'miss')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,150 @@
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+
+from .cache import get_catalog_cache, get_facet_version
+from .models import Product, ProductSummary
+
+
+PRICE_BUCKETS = [
+    ('0-500', Decimal('0'), Decimal('500')),
+    ('500-1000', Decimal('500'), Decimal('1000')),
+    ('1000-2000', Decimal('1000'), Decimal('2000')),
+    ('2000-5000', Decimal('2000'), Decimal('5000')),
+    ('5000+', Decimal('5000'), None),
+]
+FACETS = ['category', 'brand', 'size', 'color', 'target_audience', 'price']
+INDEX_CACHE_KEY = 'catalog:facets:{}'
+
+
+class FacetIndex:
+    """
+    Bitmap index over active products for faceted browsing.
+
+    Every active product gets a bit position following the default listing
+    order (newest first). Each facet value keeps a bitmap (a Python ``int``)
+    of the products carrying it, so filtering is a handful of AND/OR
+    operations and every facet count is a popcount, with no SQL at all.
+    """
+
+    def __init__(self, rows):
+        self.product_ids = []
+        self.bitmaps = {facet: defaultdict(int) for facet in FACETS}
+        self.labels = {facet: {} for facet in FACETS}
+        self.labels['target_audience'] = dict(Product.TARGET_CHOICES)
+        self.labels['price'] = {key: key for key, _, _ in PRICE_BUCKETS}
+
+        for position, row in enumerate(rows):
+            (product_id, category_id, category_name, brand_id, brand_name,
+             sizes, colors, target_audience, min_price, max_price) = row
+            bit = 1 << position
+            self.product_ids.append(product_id)
+            if category_id is not None:
+                self.bitmaps['category'][category_id] |= bit
+                self.labels['category'][category_id] = category_name
+            if brand_id is not None:
+                self.bitmaps['brand'][brand_id] |= bit
+                self.labels['brand'][brand_id] = brand_name
+            for size in filter(None, sizes.split('|')):
+                self.bitmaps['size'][size] |= bit
+                self.labels['size'][size] = size
+            for color in filter(None, colors.split('|')):
+                self.bitmaps['color'][color] |= bit
+                self.labels['color'][color] = color
+            self.bitmaps['target_audience'][target_audience] |= bit
+            if min_price is not None:
+                for key, low, high in PRICE_BUCKETS:
+                    if max_price >= low and (high is None or min_price < high):
+                        self.bitmaps['price'][key] |= bit
+
+        self.all = (1 << len(self.product_ids)) - 1
+        self.bitmaps = {facet: dict(values) for facet, values in self.bitmaps.items()}
+
+    @classmethod
+    def build(cls):
+        rows = ProductSummary.objects.filter(is_active=True).order_by('-created_at', '-pk').values_list(
+            'product_id', 'category_id', 'category_name', 'brand_id', 'brand_name',
+            'sizes', 'colors', 'target_audience', 'min_price', 'max_price',
+        )
+        return cls(rows.iterator(chunk_size=2000))
+
+    def _mask(self, facet, values):
+        if not values:
+            return self.all
+        bitmaps = self.bitmaps[facet]
+        mask = 0
+        for value in values:
+            mask |= bitmaps.get(value, 0)
+        return mask
+
+    def search(self, selections):
+        """
+        Apply ``selections`` (facet -> list of values; values are OR-ed within
+        a facet and facets are AND-ed) and return the matching bitmap along
+        with per-value counts.
+
+        Counts for a facet ignore that facet's own selection, so the sidebar
+        keeps showing how many products each alternative value would give.
+        """
+        masks = {facet: self._mask(facet, selections.get(facet)) for facet in FACETS}
+        matched = self.all
+        for mask in masks.values():
+            matched &= mask
+
+        facets = {}
+        for facet in FACETS:
+            others = self.all
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            counts = [
+                {'value': value, 'label': self.labels[facet].get(value, value), 'count': (bitmap & others).bit_count()}
+                for value, bitmap in self.bitmaps[facet].items()
+            ]
+            facets[facet] = sorted(counts, key=lambda item: (-item['count'], str(item['label'])))
+        return matched, facets
+
+    def page(self, bitmap, offset, limit):
+        """
+        Return the product ids of the bits set in ``bitmap``, in listing
+        order, from ``offset`` up to ``limit`` of them.
+        """
+        ids = []
+        skipped = 0
+        while bitmap and len(ids) < limit:
+            low = bitmap & -bitmap
+            position = low.bit_length() - 1
+            if skipped < offset:
+                skipped += 1
+            else:
+                ids.append(self.product_ids[position])
+            bitmap ^= low
+        return ids
+
+
+_local = threading.local()
+
+
+def get_facet_index():
+    """
+    Return the facet index for the current facet version.
+
+    The index is shared between workers through the catalog cache and
+    memoized per thread, so it is only rebuilt when a facet value, a listed
+    product or a taxonomy name changes (see ``get_facet_version``).
+    """
+    version = get_facet_version()
+    cached = getattr(_local, 'facet_index', None)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    cache = get_catalog_cache()
+    key = INDEX_CACHE_KEY.format(version)
+    index = cache.get(key)
+    if index is None:
+        index = FacetIndex.build()
+        cache.set(key, index, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+    _local.facet_index = (version, index)
+    return index
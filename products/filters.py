@@ -1,10 +1,48 @@
 import django_filters
-from .models import Product
+from rest_framework import filters
+from .models import Product, ProductSummary, Size, Color
+from .search import search_products
 
 class ProductFilter(django_filters.FilterSet):
-    min_price = django_filters.NumberFilter(field_name='variants__price', lookup_expr='gte')
-    max_price = django_filters.NumberFilter(field_name='variants__price', lookup_expr='lte')
+    # Filters spanning the variants relation are distinct, otherwise a product
+    # is listed once per matching variant.
+    min_price = django_filters.NumberFilter(field_name='variants__price', lookup_expr='gte', distinct=True)
+    max_price = django_filters.NumberFilter(field_name='variants__price', lookup_expr='lte', distinct=True)
+    variants__size = django_filters.ModelChoiceFilter(queryset=Size.objects.all(), distinct=True)
+    variants__color = django_filters.ModelChoiceFilter(queryset=Color.objects.all(), distinct=True)
 
     class Meta:
         model = Product
-        fields = ['category', 'brand', 'target_audience', 'variants__size', 'variants__color']
\ No newline at end of file
+        fields = ['category', 'brand', 'target_audience', 'variants__size', 'variants__color']
+
+
+class ProductSummaryFilter(django_filters.FilterSet):
+    min_price = django_filters.NumberFilter(field_name='max_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='min_price', lookup_expr='lte')
+    size = django_filters.CharFilter(method='filter_option')
+    color = django_filters.CharFilter(method='filter_option')
+    in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+
+    class Meta:
+        model = ProductSummary
+        fields = ['category', 'brand', 'target_audience']
+
+    def filter_option(self, queryset, name, value):
+        return queryset.filter(**{f'{name}s__contains': f'|{value}|'})
+
+    def filter_in_stock(self, queryset, name, value):
+        return queryset.filter(total_stock__gt=0) if value else queryset.filter(total_stock=0)
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by ``products.search``: full-text and fuzzy matching
+    with results ordered by relevance unless ``?ordering=`` is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_products(queryset, ' '.join(terms))
+
@@ -0,0 +1,317 @@
+import csv
+import io
+import json
+import time
+from decimal import Context, Decimal, InvalidOperation
+
+from django.db import DatabaseError, connection, models, transaction
+
+from common.seeding import batched
+from .models import Brand, Category, Color, Product, ProductImage, ProductVariant, Size
+from .signals import products_changed
+
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 1000
+PRODUCT_FIELDS = ['name', 'description', 'target_audience', 'category', 'brand', 'is_active']
+VARIANT_FIELDS = ['product', 'color', 'size', 'price', 'stock', 'is_active']
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+TAXONOMY = ((Category, 'category'), (Brand, 'brand'), (Color, 'color'), (Size, 'size'))
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(filename):
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def read_rows(stream, fmt):
+    """
+    Yield ``(line_number, row_dict)`` from a text or binary ``stream`` one
+    row at a time, so the file is never held in memory.
+    """
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = RowError(f"Invalid JSON: {e}")
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}; expected one of {', '.join(IMPORT_FORMATS)}.")
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.products = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': self.failed,
+            'products': self.products,
+            'seconds': round(self.elapsed, 2),
+            'rows_per_second': round(self.rows / self.elapsed, 1) if self.elapsed else 0,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def _text(row, key, field=None, required=False):
+    """
+    Read ``row[key]`` as stripped text, checked against the ``max_length``
+    of the model ``field`` it is written to, if any.
+    """
+    value = row.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"'{key}' is required.")
+    max_length = getattr(field, 'max_length', None)
+    if max_length and len(value) > max_length:
+        raise RowError(f"'{key}' must be at most {max_length} characters.")
+    return value
+
+
+def _bool(row, key):
+    value = _text(row, key).lower()
+    if not value:
+        return True
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f"'{key}' must be true or false.")
+
+
+def _number(row, key, field):
+    """
+    Parse ``row[key]`` for the model ``field`` it is written to: a
+    ``DecimalField`` (rounded to its decimal places) or an integer field.
+    Values the column cannot store are row errors, never database errors.
+    """
+    value = _text(row, key, required=True)
+    try:
+        if isinstance(field, models.DecimalField):
+            number = Decimal(value)
+            if not number.is_finite():
+                raise ValueError(value)
+        else:
+            number = int(value)
+    except (ValueError, InvalidOperation):
+        raise RowError(f"'{key}' is not a valid number.")
+    if number < 0:
+        raise RowError(f"'{key}' must not be negative.")
+    if isinstance(field, models.DecimalField):
+        try:
+            # Signals InvalidOperation when the rounded value needs more than max_digits.
+            number = number.quantize(Decimal(1).scaleb(-field.decimal_places), context=Context(prec=field.max_digits))
+        except InvalidOperation:
+            raise RowError(f"'{key}' must be less than {10 ** (field.max_digits - field.decimal_places)}.")
+    else:
+        _, limit = connection.ops.integer_field_range(field.get_internal_type())
+        if number > limit:
+            raise RowError(f"'{key}' must not be greater than {limit}.")
+    return number
+
+
+def parse_row(row):
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise RowError("Each row must be an object.")
+    target = _text(row, 'target_audience') or 'men'
+    if target not in dict(Product.TARGET_CHOICES):
+        raise RowError(f"'target_audience' must be one of {', '.join(dict(Product.TARGET_CHOICES))}.")
+    return {
+        'product_sku': _text(row, 'product_sku', Product._meta.get_field('sku'), required=True),
+        'name': _text(row, 'name', Product._meta.get_field('name'), required=True),
+        'description': _text(row, 'description'),
+        'target_audience': target,
+        'category': _text(row, 'category', Category._meta.get_field('name')),
+        'brand': _text(row, 'brand', Brand._meta.get_field('name')),
+        'product_active': _bool(row, 'product_active'),
+        'sku': _text(row, 'sku', ProductVariant._meta.get_field('sku'), required=True),
+        'color': _text(row, 'color', Color._meta.get_field('name'), required=True),
+        'size': _text(row, 'size', Size._meta.get_field('name'), required=True),
+        'price': _number(row, 'price', ProductVariant._meta.get_field('price')),
+        'stock': _number(row, 'stock', ProductVariant._meta.get_field('stock')),
+        'is_active': _bool(row, 'is_active'),
+        'image': _text(row, 'image', ProductImage._meta.get_field('image')),
+    }
+
+
+class CatalogImporter:
+    """
+    Upsert products and variants from rows of one variant each, in chunks.
+
+    Category/brand/color/size names are resolved through dictionaries loaded
+    once (missing ones are created in bulk), products are upserted on
+    ``Product.sku`` and variants on ``ProductVariant.sku`` with
+    ``bulk_create(update_conflicts=True)``, so a chunk costs a handful of
+    queries whatever its size. Each chunk is its own transaction; a row that
+    fails validation is reported and skipped without failing its chunk.
+    """
+
+    def __init__(self, chunk_size=1000, create_missing=True):
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        self.lookups = {
+            model: dict(model.objects.values_list('name', 'pk'))
+            for model, _ in TAXONOMY
+        }
+
+    def run(self, rows, progress=None):
+        report = ImportReport()
+        for chunk in batched(rows, self.chunk_size):
+            report.rows += len(chunk)
+            self._import_chunk(chunk, report)
+            if progress:
+                progress(report)
+        return report
+
+    def _resolve(self, model, names):
+        """
+        Create the missing ``names`` of ``model`` and return their ids by name.
+        """
+        missing = {name for name in names if name and name not in self.lookups[model]}
+        if not (missing and self.create_missing):
+            return {}
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        return dict(model.objects.filter(name__in=missing).values_list('name', 'pk'))
+
+    def _import_chunk(self, chunk, report):
+        parsed = []
+        for line, row in chunk:
+            try:
+                parsed.append((line, parse_row(row)))
+            except RowError as e:
+                report.error(line, str(e))
+        if not parsed:
+            return
+
+        try:
+            with transaction.atomic():
+                created = {model: self._resolve(model, {row[key] for _, row in parsed}) for model, key in TAXONOMY}
+        except DatabaseError as e:
+            for line, _ in parsed:
+                report.error(line, f"Chunk failed: {e}")
+            return
+        # Only once committed, so a rolled-back name is never looked up later.
+        for model, names in created.items():
+            self.lookups[model].update(names)
+
+        valid = []
+        for line, row in parsed:
+            unknown = [
+                f"{key} '{row[key]}'" for model, key in TAXONOMY
+                if row[key] and row[key] not in self.lookups[model]
+            ]
+            if unknown:
+                report.error(line, f"Unknown {', '.join(unknown)}.")
+            else:
+                valid.append((line, row))
+        if not valid:
+            return
+
+        try:
+            with transaction.atomic():
+                product_ids, variant_count = self._write(valid, report)
+                products_changed(product_ids)
+        except DatabaseError as e:
+            for line, _ in valid:
+                report.error(line, f"Chunk failed: {e}")
+            return
+        report.products += len(product_ids)
+        report.imported += variant_count
+
+    def _write(self, rows, report):
+        # Later rows win when a chunk repeats a product or variant.
+        products = {}
+        for _, row in rows:
+            products[row['product_sku']] = Product(
+                sku=row['product_sku'],
+                name=row['name'],
+                description=row['description'],
+                target_audience=row['target_audience'],
+                category_id=self.lookups[Category].get(row['category']),
+                brand_id=self.lookups[Brand].get(row['brand']),
+                is_active=row['product_active'],
+            )
+        Product.objects.bulk_create(
+            products.values(), update_conflicts=True, unique_fields=['sku'], update_fields=PRODUCT_FIELDS,
+        )
+        product_ids = dict(Product.objects.filter(sku__in=products).values_list('sku', 'pk'))
+
+        # A (product, color, size) combination may already exist under another
+        # SKU (or none): adopt an unset SKU, reject a conflicting one.
+        existing = {
+            (product_id, color_id, size_id): (pk, sku)
+            for pk, product_id, color_id, size_id, sku in ProductVariant.objects.filter(
+                product_id__in=product_ids.values()
+            ).values_list('pk', 'product_id', 'color_id', 'size_id', 'sku')
+        }
+        variants, combinations, adopted = {}, {}, []
+        for line, row in rows:
+            key = (product_ids[row['product_sku']], self.lookups[Color][row['color']], self.lookups[Size][row['size']])
+            current = existing.get(key)
+            if current and current[1] and current[1] != row['sku']:
+                report.error(line, f"Variant {row['color']}/{row['size']} of {row['product_sku']} already has SKU {current[1]}.")
+                continue
+            if combinations.get(key, row['sku']) != row['sku']:
+                report.error(line, f"Variant {row['color']}/{row['size']} of {row['product_sku']} repeated with another SKU.")
+                continue
+            if current and not current[1]:
+                adopted.append(ProductVariant(pk=current[0], sku=row['sku']))
+            combinations[key] = row['sku']
+            variants[row['sku']] = (line, row, ProductVariant(
+                sku=row['sku'], product_id=key[0], color_id=key[1], size_id=key[2],
+                price=row['price'], stock=row['stock'], is_active=row['is_active'],
+            ))
+
+        ProductVariant.objects.bulk_update(adopted, ['sku'])
+        ProductVariant.objects.bulk_create(
+            [variant for _, _, variant in variants.values()],
+            update_conflicts=True, unique_fields=['sku'], update_fields=VARIANT_FIELDS,
+        )
+
+        images = {product_ids[row['product_sku']]: row['image'] for _, row, _ in variants.values() if row['image']}
+        if images:
+            with_images = set(
+                ProductImage.objects.filter(product_id__in=images).values_list('product_id', flat=True).distinct()
+            )
+            ProductImage.objects.bulk_create([
+                ProductImage(product_id=product_id, image=image, is_primary=True)
+                for product_id, image in images.items() if product_id not in with_images
+            ])
+        return set(product_ids.values()), len(variants)
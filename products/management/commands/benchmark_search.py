@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from common.benchdata import ADJECTIVES, FILLER, NOUNS, QUERIES
+from common.seeding import batched, check_bench_database
+from products.cache import bump_product_version
+from products.models import Category, Brand, Product
+from products.search import search_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-query product search latency against catalog size, compared with the ILIKE baseline. "
+        "Synthetic products are added for the run and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 50_000],
+                            help="Catalog sizes to measure; products are added until each size is reached.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--force', action='store_true',
+                            help="Seed even when the database does not look like a benchmark database.")
+
+    def handle(self, *args, **options):
+        check_bench_database(options['force'])
+        # Only the rows this run creates are removed again, never existing ones.
+        self.seeded_ids = []
+        self.created = []
+        category = self.get_or_create(Category)
+        brand = self.get_or_create(Brand)
+        try:
+            self.run(options, category, brand)
+        finally:
+            self.cleanup()
+
+    def get_or_create(self, model):
+        instance, created = model.objects.get_or_create(name='Benchmark')
+        if created:
+            self.created.append(instance)
+        return instance
+
+    def run(self, options, category, brand):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f"{'products':>9} {'query':<26} {'ilike ms':>9} {'ranked ms':>10} {'hits':>6}")
+        for size in sorted(options['sizes']):
+            self.seed(rng, size, category, brand)
+            queryset = Product.objects.all()
+            list(search_products(queryset, QUERIES[0])[:20])  # warm-up (builds the fallback index)
+            for query in QUERIES:
+                baseline = self.measure(options['repeat'], lambda: list(
+                    queryset.filter(Q(name__icontains=query) | Q(description__icontains=query))[:20]
+                ))
+                elapsed = self.measure(options['repeat'], lambda: list(search_products(queryset, query)[:20]))
+                hits = search_products(queryset, query).count()
+                self.stdout.write(f"{size:>9} {query:<26} {baseline:>9.2f} {elapsed:>10.2f} {hits:>6}")
+
+    def seed(self, rng, size, category, brand):
+        missing = size - Product.objects.count()
+        if missing <= 0:
+            return
+        rows = (self.fake_product(rng, category, brand) for _ in range(missing))
+        for batch in batched(rows, 2000):
+            self.seeded_ids += [product.pk for product in Product.objects.bulk_create(batch)]
+        bump_product_version(None)
+
+    def cleanup(self):
+        # Seeded products bypassed the product signals and have no variants,
+        # images or summaries, so they are removed with one statement per batch.
+        removed = 0
+        with connection.cursor() as cursor:
+            for batch in batched(self.seeded_ids, 1000):
+                cursor.execute(
+                    f"DELETE FROM {Product._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(batch))})", batch,
+                )
+                removed += cursor.rowcount
+        self.stdout.write(f"Removed {removed} seeded products")
+        for instance in self.created:
+            instance.delete()
+        bump_product_version(None)
+
+    def fake_product(self, rng, category, brand):
+        name = f"{rng.choice(ADJECTIVES).title()} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        description = ' '.join(rng.choice(ADJECTIVES + NOUNS + FILLER) for _ in range(rng.randint(20, 60)))
+        return Product(name=name, description=description, category=category, brand=brand)
+
+    def measure(self, repeat, fn):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from common.seeding import batched
+from products.models import ProductImage
+from products.renditions import build_renditions, get_rendition_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the original URL and the thumbnail/card/zoom renditions of product images "
+        "(only images without them unless --all is given)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild images that already have renditions too.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.order_by('pk')
+        if not options['all']:
+            images = images.filter(image_url='')
+        backend = get_rendition_backend()
+        ids = images.values_list('pk', flat=True).iterator(chunk_size=options['batch_size'])
+        total = built = 0
+        for batch in batched(ids, options['batch_size']):
+            built += build_renditions(batch, backend=backend)
+            total += len(batch)
+            self.stdout.write(f"{built}/{total} images done...")
+        style = self.style.SUCCESS if built == total else self.style.WARNING
+        self.stdout.write(style(f"Built renditions of {built} of {total} images."))
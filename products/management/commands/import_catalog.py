@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importers import IMPORT_FORMATS, CatalogImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV or JSONL catalog file (one variant per row) and upsert products and variants by SKU. "
+        "Columns: product_sku, name, description, target_audience, category, brand, product_active, "
+        "sku, color, size, price, stock, is_active, image."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--no-create', action='store_true',
+                            help="Reject rows naming an unknown category, brand, color or size.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        if not fmt:
+            raise CommandError("Cannot tell the file format from its name; pass --format.")
+
+        importer = CatalogImporter(chunk_size=options['chunk_size'], create_missing=not options['no_create'])
+        with open(options['path'], 'rb') as stream:
+            report = importer.run(read_rows(stream, fmt), progress=self.progress)
+
+        result = report.as_dict()
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if result['errors_truncated']:
+            self.stderr.write(f"... {result['failed'] - len(result['errors'])} more errors")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} of {result['rows']} rows ({result['products']} products touched, "
+            f"{result['failed']} failed) in {result['seconds']}s, {result['rows_per_second']} rows/s."
+        ))
+
+    def progress(self, report):
+        rate = report.rows / report.elapsed if report.elapsed else 0
+        self.stdout.write(f"{report.rows} rows read, {report.failed} errors, {rate:.0f} rows/s")
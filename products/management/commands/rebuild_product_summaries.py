@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from common.seeding import batched
+from products.models import Product, ProductSummary
+from products.summary import refresh_product_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized ProductSummary rows from products, variants, images and reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ids = Product.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=options['batch_size'])
+        total = 0
+        for batch in batched(ids, options['batch_size']):
+            refresh_product_summaries(batch)
+            total += len(batch)
+        ProductSummary.objects.exclude(product__in=Product.objects.all()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} product summaries."))
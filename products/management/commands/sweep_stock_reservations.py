@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.reservations import sweep_expired
+
+
+class Command(BaseCommand):
+    help = "Mark expired stock reservations in bulk. Safe to run from cron at any frequency."
+
+    def handle(self, *args, **options):
+        swept = sweep_expired()
+        self.stdout.write(self.style.SUCCESS(f"Expired {swept} stock reservations."))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_products_pr_created_52f0d7_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='products.product')),
+                ('name', models.CharField(max_length=255)),
+                ('target_audience', models.CharField(choices=[('men', 'Men'), ('women', 'Women'), ('kids', 'Kids')], default='men', max_length=10)),
+                ('category_name', models.CharField(blank=True, max_length=100)),
+                ('brand_name', models.CharField(blank=True, max_length=100)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('total_stock', models.PositiveIntegerField(default=0)),
+                ('sizes', models.CharField(blank=True, max_length=255)),
+                ('colors', models.CharField(blank=True, max_length=255)),
+                ('primary_image_url', models.URLField(blank=True, max_length=500)),
+                ('average_rating', models.DecimalField(decimal_places=2, default=0.0, max_digits=3)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('brand', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.brand')),
+                ('category', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.category')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['is_active', 'created_at'], name='products_pr_is_acti_db60dc_idx'), models.Index(fields=['min_price'], name='products_pr_min_pri_e81147_idx'), models.Index(fields=['max_price'], name='products_pr_max_pri_fc33c9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 16:03
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_counters(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('reviews', 'Review')
+    products = []
+    for row in Review.objects.order_by().values('product_id').annotate(count=Count('id'), total=Sum('rating')):
+        products.append(Product(pk=row['product_id'], rating_count=row['count'], rating_sum=row['total']))
+    Product.objects.bulk_update(products, ['rating_count', 'rating_sum'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_stockreservation'),
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-average_rating', '-rating_count'], name='products_top_rated_idx'),
+        ),
+        migrations.RunPython(backfill_rating_counters, migrations.RunPython.noop),
+    ]
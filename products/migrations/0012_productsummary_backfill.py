@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-18 17:22
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Max, Min, Sum
+
+from common.flat import image_url
+
+
+def _join(names):
+    return f"|{'|'.join(sorted(names))}|" if names else ''
+
+
+def backfill_product_summaries(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    ProductImage = apps.get_model('products', 'ProductImage')
+    ProductSummary = apps.get_model('products', 'ProductSummary')
+
+    missing = list(
+        Product.objects.exclude(pk__in=ProductSummary.objects.values('product_id')).order_by('pk')
+        .values_list('pk', flat=True)
+    )
+    for start in range(0, len(missing), 1000):
+        product_ids = missing[start:start + 1000]
+        variants = ProductVariant.objects.filter(product_id__in=product_ids, is_active=True)
+        stats = {
+            row['product_id']: row
+            for row in variants.values('product_id').annotate(
+                min_price=Min('price'), max_price=Max('price'), total_stock=Sum('stock')
+            )
+        }
+        sizes, colors = defaultdict(set), defaultdict(set)
+        for product_id, size, color in variants.values_list('product_id', 'size__name', 'color__name').distinct():
+            sizes[product_id].add(size)
+            colors[product_id].add(color)
+        images = {}
+        for image in ProductImage.objects.filter(product_id__in=product_ids).order_by(
+            'product_id', '-is_primary', '-uploaded_at'
+        ).values('product_id', 'image', 'image_url', 'renditions'):
+            images.setdefault(image['product_id'], image)
+
+        summaries = []
+        for product in Product.objects.filter(pk__in=product_ids).select_related('category', 'brand'):
+            row = stats.get(product.pk, {})
+            image = images.get(product.pk)
+            original = thumbnail = ''
+            if image is not None:
+                original = image['image_url'] or image_url(image['image']) or ''
+                thumbnail = ((image['renditions'] or {}).get('thumb') or {}).get('url') or original
+            summaries.append(ProductSummary(
+                product_id=product.pk,
+                name=product.name,
+                target_audience=product.target_audience,
+                category_id=product.category_id,
+                category_name=product.category.name if product.category else '',
+                brand_id=product.brand_id,
+                brand_name=product.brand.name if product.brand else '',
+                min_price=row.get('min_price'),
+                max_price=row.get('max_price'),
+                total_stock=row.get('total_stock') or 0,
+                sizes=_join(sizes[product.pk]),
+                colors=_join(colors[product.pk]),
+                primary_image_url=original,
+                primary_thumbnail_url=thumbnail,
+                average_rating=product.average_rating,
+                is_active=product.is_active,
+                created_at=product.created_at,
+            ))
+        ProductSummary.objects.bulk_create(summaries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productsummary',
+            name='colors',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='productsummary',
+            name='sizes',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(backfill_product_summaries, migrations.RunPython.noop),
+    ]
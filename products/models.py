@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.contrib.postgres.search import SearchVectorField
 from cloudinary.models import CloudinaryField
 
 
@@ -32,12 +33,22 @@ class Size(models.Model):
         return self.name
 
 
+RATING_STARS = range(0, 6)
+
+
+def image_key(value):
+    if not value:
+        return ''
+    return value.get_prep_value() if hasattr(value, 'get_prep_value') else str(value)
+
+
 class Product(models.Model):
     TARGET_CHOICES = [
         ('men', 'Men'),
         ('women', 'Women'),
         ('kids', 'Kids'),
     ]
+    sku = models.CharField(max_length=100, unique=True, blank=True, null=True)
     name = models.CharField(max_length=255)
     target_audience = models.CharField(max_length=10, choices=TARGET_CHOICES, default='men')
     description = models.TextField()
@@ -45,14 +56,34 @@ class Product(models.Model):
     brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, related_name='products')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Maintained incrementally by reviews.signals; average_rating = rating_sum / rating_count.
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # Reviews per star rating, maintained alongside the counters above.
+    rating_0_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    # Maintained by a database trigger on PostgreSQL (see migration 0006).
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['-average_rating', '-rating_count'], name='products_top_rated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating_histogram(self):
+        return {str(stars): getattr(self, f'rating_{stars}_count') for stars in RATING_STARS}
+
 
 class ProductVariant(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
@@ -72,15 +103,122 @@ class ProductVariant(models.Model):
         return f"{self.product.name} - {self.color.name} - {self.size.name} - Stock: {self.stock}"
 
 
+class StockReservation(models.Model):
+    """
+    Time-limited hold on variant stock while a payment is in flight.
+
+    Holds do not touch ``ProductVariant.stock``; the stock available to other
+    buyers is ``stock`` minus the active, unexpired holds on the variant.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('converted', 'Converted'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    reference = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['variant', 'expires_at'],
+                name='products_reservation_hold_idx',
+                condition=models.Q(status='active'),
+            ),
+            models.Index(fields=['reference', 'status']),
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.variant_id} for {self.reference} ({self.status})"
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image= CloudinaryField('product_images', blank=True, null=True)
     alt_text = models.CharField(max_length=255, blank=True)
     is_primary = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Written by products.renditions after each upload: the original's URL and
+    # {name: {'width', 'url', 'formats': {format: url}}} for every rendition.
+    image_url = models.URLField(max_length=500, blank=True)
+    renditions = models.JSONField(default=dict, blank=True)
 
     class Meta:
         ordering = ['-is_primary', '-uploaded_at']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored image when loaded, to rebuild renditions only when it changes.
+        if 'image' in instance.__dict__:
+            instance._image_snapshot = image_key(instance.image)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # The stored URL and renditions belong to the previous image: clear them in
+        # the same write, so readers fall back to the new image until they are rebuilt.
+        snapshot = getattr(self, '_image_snapshot', None)
+        if self.pk and snapshot is not None and image_key(self.image) != snapshot:
+            self.image_url = ''
+            self.renditions = {}
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'image_url', 'renditions'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
-        return f"Image for {self.product.name}"
\ No newline at end of file
+        return f"Image for {self.product.name}"
+
+
+class ProductSummary(models.Model):
+    """
+    Denormalized read model for catalog listings, one row per product.
+
+    Rows are rebuilt by ``products.summary`` whenever the product, its variants,
+    images or reviews change, so listing, filtering and price sorting read a
+    single table. Sizes and colors are stored as ``|``-delimited names.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    name = models.CharField(max_length=255)
+    target_audience = models.CharField(max_length=10, choices=Product.TARGET_CHOICES, default='men')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, db_constraint=False, related_name='+')
+    category_name = models.CharField(max_length=100, blank=True)
+    brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, db_constraint=False, related_name='+')
+    brand_name = models.CharField(max_length=100, blank=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    total_stock = models.PositiveIntegerField(default=0)
+    sizes = models.TextField(blank=True)
+    colors = models.TextField(blank=True)
+    primary_image_url = models.URLField(max_length=500, blank=True)
+    primary_thumbnail_url = models.URLField(max_length=500, blank=True)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'created_at']),
+            models.Index(fields=['min_price']),
+            models.Index(fields=['max_price']),
+        ]
+
+    def __str__(self):
+        return f"Summary of {self.name}"
+
+    @property
+    def size_list(self):
+        return [name for name in self.sizes.split('|') if name]
+
+    @property
+    def color_list(self):
+        return [name for name in self.colors.split('|') if name]
+
@@ -0,0 +1,130 @@
+import io
+import logging
+
+from cloudinary import CloudinaryResource
+from cloudinary.utils import cloudinary_url
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from common.flat import image_url
+from .models import ProductImage
+from .signals import products_changed
+
+
+logger = logging.getLogger(__name__)
+
+# Format every client can display; the others are offered when the client accepts them.
+FALLBACK_FORMAT = 'jpg'
+
+
+def rendition_sizes():
+    return getattr(settings, 'IMAGE_RENDITIONS', {'thumb': 200, 'card': 480, 'zoom': 1600})
+
+
+def rendition_formats():
+    return getattr(settings, 'IMAGE_RENDITION_FORMATS', ['avif', 'webp'])
+
+
+class CloudinaryRenditions:
+    """
+    Renditions as Cloudinary delivery URLs (``c_limit,q_auto,w_<width>`` in
+    the requested format). Cloudinary derives each one on its first request
+    and serves it from its CDN afterwards, so building them costs no API call.
+    """
+
+    def original_url(self, value):
+        return image_url(value) or ''
+
+    def build(self, image_id, value):
+        if not isinstance(value, CloudinaryResource) or not value.public_id:
+            return {}
+        renditions = {}
+        for name, width in rendition_sizes().items():
+            urls = {
+                fmt: cloudinary_url(
+                    value.public_id, version=value.version, type=value.type, resource_type=value.resource_type,
+                    format=fmt, transformation=[{'width': width, 'crop': 'limit', 'quality': 'auto'}],
+                )[0]
+                for fmt in [FALLBACK_FORMAT, *rendition_formats()]
+            }
+            renditions[name] = {'width': width, 'url': urls.pop(FALLBACK_FORMAT), 'formats': urls}
+        return renditions
+
+
+class LocalRenditions:
+    """
+    Stand-in for Cloudinary used in tests and offline development: originals
+    are read from, and renditions written to, a ``FileSystemStorage`` (by
+    default ``MEDIA_ROOT``/``MEDIA_URL``), resized with Pillow. Formats this
+    Pillow build cannot write (often AVIF) are skipped.
+    """
+    pillow_formats = {'jpg': 'JPEG', 'webp': 'WEBP', 'avif': 'AVIF', 'png': 'PNG'}
+
+    def __init__(self, storage=None):
+        self.storage = storage or FileSystemStorage()
+
+    def source_name(self, value):
+        if isinstance(value, CloudinaryResource):
+            return f'{value.public_id}.{value.format}' if value.format else value.public_id
+        return str(value)
+
+    def original_url(self, value):
+        return self.storage.url(self.source_name(value)) if value else ''
+
+    def build(self, image_id, value):
+        if not value:
+            return {}
+        Image.init()
+        with self.storage.open(self.source_name(value), 'rb') as source:
+            original = ImageOps.exif_transpose(Image.open(source))
+            original.load()
+        renditions = {}
+        for name, width in rendition_sizes().items():
+            resized = original.copy()
+            resized.thumbnail((width, width * 10))
+            urls = {}
+            for fmt in [FALLBACK_FORMAT, *rendition_formats()]:
+                pillow_format = self.pillow_formats.get(fmt)
+                if pillow_format not in Image.SAVE:
+                    continue
+                frame = resized.convert('RGB') if pillow_format == 'JPEG' else resized
+                buffer = io.BytesIO()
+                frame.save(buffer, pillow_format, quality=82)
+                path = f'renditions/{image_id}/{name}.{fmt}'
+                self.storage.delete(path)
+                path = self.storage.save(path, ContentFile(buffer.getvalue()))
+                urls[fmt] = self.storage.url(path)
+            renditions[name] = {'width': width, 'url': urls.pop(FALLBACK_FORMAT), 'formats': urls}
+        return renditions
+
+
+def get_rendition_backend():
+    path = getattr(settings, 'IMAGE_RENDITION_BACKEND', 'products.renditions.CloudinaryRenditions')
+    return import_string(path)()
+
+
+def build_renditions(image_ids, backend=None):
+    """
+    Store the original URL and the renditions of the given product images on
+    their rows, so serializing an image is a plain column read. Images that
+    fail (e.g. an unreadable file) are logged and left for a later run.
+    Returns the number of images updated.
+    """
+    backend = backend or get_rendition_backend()
+    images = list(ProductImage.objects.filter(pk__in=list(image_ids)).only('id', 'product_id', 'image'))
+    updated = []
+    for image in images:
+        try:
+            image.image_url = backend.original_url(image.image)
+            image.renditions = backend.build(image.pk, image.image)
+        except Exception:
+            logger.exception("Could not build renditions of product image %s", image.pk)
+            continue
+        updated.append(image)
+    ProductImage.objects.bulk_update(updated, ['image_url', 'renditions'], batch_size=500)
+    # Listing summaries carry the primary image's thumbnail.
+    products_changed(image.product_id for image in updated)
+    return len(updated)
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ProductVariant, StockReservation
+
+
+class InsufficientStockError(Exception):
+    def __init__(self, variant, available):
+        self.variant = variant
+        self.available = available
+        super().__init__(f"Not enough stock for {variant}. Available: {available}")
+
+
+def active_holds(now=None):
+    return StockReservation.objects.filter(status='active', expires_at__gt=now or timezone.now())
+
+
+def held_quantity(exclude_reference=None):
+    """
+    Expression for the quantity held on the outer ``ProductVariant`` row by
+    active holds, optionally ignoring the holds of one reference (the buyer's own).
+    """
+    holds = active_holds().filter(variant=OuterRef('pk'))
+    if exclude_reference:
+        holds = holds.exclude(reference=exclude_reference)
+    total = holds.order_by().values('variant').annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def available_stock(variant_ids, exclude_reference=None):
+    """
+    Return ``{variant_id: stock - active holds}`` for the given variants.
+    """
+    rows = ProductVariant.objects.filter(pk__in=variant_ids).annotate(
+        held=held_quantity(exclude_reference)
+    ).values_list('pk', 'stock', 'held')
+    return {pk: max(stock - held, 0) for pk, stock, held in rows}
+
+
+def reserve(reference, lines, ttl=None):
+    """
+    Place holds for ``lines`` (``(variant_id, quantity)`` pairs) under ``reference``.
+
+    Any active holds already under the reference are released first, so
+    re-initiating a payment replaces its holds. Variant rows are locked in id
+    order while the availability check runs, so two concurrent reservations
+    of the last units cannot both succeed. Only the variant rows are locked,
+    not the product, color and size rows joined for the error message.
+    Raises ``InsufficientStockError``.
+    """
+    ttl = ttl or getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60)
+    quantities = {}
+    for variant_id, quantity in lines:
+        quantities[variant_id] = quantities.get(variant_id, 0) + quantity
+
+    with transaction.atomic():
+        release(reference)
+        variants = (
+            ProductVariant.objects.select_for_update(of=('self',))
+            .filter(pk__in=quantities)
+            .select_related('product', 'color', 'size')
+            .annotate(held=held_quantity())
+            .order_by('pk')
+        )
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        holds = []
+        for variant in variants:
+            available = variant.stock - variant.held
+            if quantities[variant.pk] > available:
+                raise InsufficientStockError(variant, max(available, 0))
+            holds.append(StockReservation(
+                variant=variant, quantity=quantities[variant.pk], reference=reference, expires_at=expires_at,
+            ))
+        return StockReservation.objects.bulk_create(holds)
+
+
+def convert(reference):
+    """
+    Mark the active holds of ``reference`` as fulfilled; call in the same
+    transaction that decrements the stock.
+    """
+    return StockReservation.objects.filter(reference=reference, status='active').update(status='converted')
+
+
+def release(reference):
+    return StockReservation.objects.filter(reference=reference, status='active').update(status='released')
+
+
+def sweep_expired(now=None):
+    """
+    Flag every expired active hold in one statement. Expired holds already
+    stop counting against availability; this keeps the active set small.
+    """
+    return StockReservation.objects.filter(
+        status='active', expires_at__lte=now or timezone.now()
+    ).update(status='expired')
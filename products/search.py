@@ -0,0 +1,155 @@
+import difflib
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+from .cache import get_catalog_version
+from .models import Product
+
+
+SEARCH_CONFIG = 'english'
+MAX_RESULTS = 500
+FIELD_WEIGHTS = {'name': 2.0, 'description': 1.0}
+FUZZY_CUTOFF = 0.75
+FUZZY_PENALTY = 0.5
+
+TOKEN_RE = re.compile(r'\w+')
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from in is it of on or the to with'.split()
+)
+
+
+def search_products(queryset, term):
+    """
+    Filter ``queryset`` down to products matching ``term``, best match first.
+
+    PostgreSQL uses the trigger-maintained ``search_vector`` (GIN) ranked with
+    ``ts_rank`` plus ``pg_trgm`` similarity on the name to tolerate typos.
+    Other databases fall back to an in-process inverted index.
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, term)
+    return _inverted_index_search(queryset, term)
+
+
+def _postgres_search(queryset, term):
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.annotate(
+        rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('name', term),
+    ).filter(
+        Q(search_vector=query) | Q(name__trigram_similar=term)
+    ).order_by('-rank', '-created_at')
+
+
+def _inverted_index_search(queryset, term):
+    ranked = _first_matching(queryset, get_inverted_index().search(term), MAX_RESULTS)
+    if not ranked:
+        return queryset.none()
+    return queryset.filter(pk__in=[pk for pk, _ in ranked]).annotate(
+        rank=Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in ranked],
+            output_field=FloatField(),
+        )
+    ).order_by('-rank', '-created_at')
+
+
+def _first_matching(queryset, ranked, limit):
+    """
+    The best ``limit`` entries of the catalog-wide ranking that ``queryset``
+    (already filtered by category, price, ...) keeps, checked a slice of
+    ``limit`` ids at a time.
+    """
+    kept = []
+    for start in range(0, len(ranked), limit):
+        chunk = ranked[start:start + limit]
+        allowed = set(queryset.filter(pk__in=[pk for pk, _ in chunk]).values_list('pk', flat=True))
+        kept.extend((pk, score) for pk, score in chunk if pk in allowed)
+        if len(kept) >= limit:
+            break
+    return kept[:limit]
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class InvertedIndex:
+    """
+    Pure-Python inverted index over product names and descriptions.
+
+    Scores are TF-IDF weighted by field; query terms missing from the
+    vocabulary are expanded to close spellings at a penalty.
+    """
+
+    def __init__(self, rows):
+        self.postings = defaultdict(dict)
+        count = 0
+        for pk, name, description in rows:
+            count += 1
+            weights = Counter()
+            for field, text in (('name', name), ('description', description)):
+                for token in tokenize(text or ''):
+                    weights[token] += FIELD_WEIGHTS[field]
+            for token, weight in weights.items():
+                self.postings[token][pk] = weight
+        self.document_count = count
+        self.vocabulary = list(self.postings)
+
+    def _expand(self, token):
+        if token in self.postings:
+            return [(token, 1.0)]
+        matches = difflib.get_close_matches(token, self.vocabulary, n=3, cutoff=FUZZY_CUTOFF)
+        return [(match, FUZZY_PENALTY) for match in matches]
+
+    def search(self, term):
+        # Every query token has to match (exactly or fuzzily), like the
+        # AND semantics of websearch_to_tsquery on PostgreSQL.
+        scores = None
+        for token in tokenize(term):
+            token_scores = Counter()
+            for match, factor in self._expand(token):
+                postings = self.postings[match]
+                idf = math.log(1 + self.document_count / len(postings))
+                for pk, weight in postings.items():
+                    token_scores[pk] = max(token_scores[pk], factor * weight * idf)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = Counter({pk: score + token_scores[pk] for pk, score in scores.items() if pk in token_scores})
+            if not scores:
+                break
+        return scores.most_common() if scores else []
+
+
+_index_lock = threading.Lock()
+_index = {'version': None, 'index': None}
+
+
+def get_inverted_index():
+    """
+    Return the process-wide index, rebuilding it when the catalog version
+    has moved since it was built.
+    """
+    version = get_catalog_version()
+    with _index_lock:
+        if _index['version'] != version:
+            rows = Product.objects.values_list('pk', 'name', 'description').iterator(chunk_size=2000)
+            _index['index'] = InvertedIndex(rows)
+            _index['version'] = version
+        return _index['index']
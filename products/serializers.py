@@ -1,6 +1,9 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Category, Brand, Product, ProductImage, Color, Size, ProductVariant
+from .models import Category, Brand, Product, ProductImage, Color, Size, ProductVariant, ProductSummary, RATING_STARS
 from reviews.serializers import ReviewSerializer
+from reviews.models import Review
+from common.flat import FlatSerializer, Nested, datetime_value, decimal_value, image_url
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -27,12 +30,27 @@ class SizeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 
+class StoredImageField(serializers.ImageField):
+    """
+    Uploads go to the image itself; reads use the URL stored next to its
+    renditions, when there is one, instead of asking the storage for it.
+    """
+
+    def get_attribute(self, instance):
+        return getattr(instance, 'image_url', None) or super().get_attribute(instance)
+
+    def to_representation(self, value):
+        if isinstance(value, str):
+            return value
+        return super().to_representation(value)
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
-    image = serializers.ImageField()
+    image = StoredImageField()
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'is_primary', 'uploaded_at']
-        read_only_fields = ['uploaded_at']
+        fields = ['id', 'image', 'renditions', 'is_primary', 'uploaded_at']
+        read_only_fields = ['renditions', 'uploaded_at']
         extra_kwargs = {
             'image': {'required': False},
         }
@@ -52,6 +70,23 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
 
 
+class ProductSummarySerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    category = serializers.CharField(source='category_name', read_only=True)
+    brand = serializers.CharField(source='brand_name', read_only=True)
+    sizes = serializers.ListField(source='size_list', read_only=True)
+    colors = serializers.ListField(source='color_list', read_only=True)
+    image = serializers.CharField(source='primary_image_url', read_only=True)
+    thumbnail = serializers.CharField(source='primary_thumbnail_url', read_only=True)
+
+    class Meta:
+        model = ProductSummary
+        fields = [
+            'id', 'name', 'target_audience', 'category', 'brand', 'min_price', 'max_price',
+            'total_stock', 'sizes', 'colors', 'image', 'thumbnail', 'average_rating', 'is_active', 'created_at'
+        ]
+
+
 class ProductVariantSerializer(serializers.ModelSerializer):
     product = serializers.CharField(source='product.name')
     product_id = serializers.IntegerField(source='product.id')
@@ -68,16 +103,86 @@ class DetailProductSerializer(serializers.ModelSerializer):
     category = serializers.CharField(source='category.name', read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    # Only the most recent ones (PRODUCT_RECENT_REVIEWS), prefetched by the view.
+    reviews = ReviewSerializer(source='recent_reviews', many=True, read_only=True)
+    rating_histogram = serializers.ReadOnlyField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'target_audience', 'description', 'category', 'brand', 'images',
-            'variants', 'reviews', 'average_rating', 'is_active', 'created_at'
+            'variants', 'reviews', 'average_rating', 'rating_count', 'rating_histogram', 'is_active', 'created_at'
         ]
 
 
+class FlatImageSerializer(FlatSerializer):
+    model = ProductImage
+    fields = ['id', 'image', 'renditions', 'is_primary', 'uploaded_at']
+    sources = {'image': ['image_url', 'image']}
+    formats = {'uploaded_at': datetime_value}
+
+    def get_image(self, row):
+        return row[self.prefix + 'image_url'] or image_url(row[self.prefix + 'image'])
+
+
+class FlatVariantSerializer(FlatSerializer):
+    model = ProductVariant
+    ordering = ['id']
+    fields = ['id', 'product', 'product_id', 'color', 'size', 'stock', 'price']
+    sources = {'product': ['product__name'], 'color': ['color__name'], 'size': ['size__name']}
+    formats = {'price': decimal_value}
+
+
+class FlatReviewSerializer(FlatSerializer):
+    model = Review
+    fields = ['id', 'product', 'user', 'user_id', 'rating', 'comment', 'created_at', 'updated_at']
+    sources = {'product': ['product_id'], 'user': ['user__first_name', 'user__last_name']}
+    formats = {'created_at': datetime_value, 'updated_at': datetime_value}
+
+    def get_user(self, row):
+        # str(user), see users.models.User.__str__
+        return f"{row[self.prefix + 'user__first_name']} {row[self.prefix + 'user__last_name']}".title()
+
+
+class FlatProductSerializer(FlatSerializer):
+    """
+    ``ProductSerializer`` output built from ``.values()`` rows; images are
+    loaded for the whole page in one query.
+    """
+    model = Product
+    fields = [
+        'id', 'name', 'target_audience', 'description', 'category', 'brand', 'images', 'is_active', 'created_at'
+    ]
+    sources = {'category': ['category__name'], 'brand': ['brand__name']}
+    formats = {'created_at': datetime_value}
+    nested = {'images': Nested(FlatImageSerializer, 'product_id')}
+    omit_none = ['category', 'brand']
+
+
+class FlatDetailProductSerializer(FlatProductSerializer):
+    """
+    ``DetailProductSerializer`` output built from ``.values()`` rows, with one
+    query each for the images, variants and most recent reviews of the page.
+    """
+    fields = [
+        'id', 'name', 'target_audience', 'description', 'category', 'brand', 'images',
+        'variants', 'reviews', 'average_rating', 'rating_count', 'rating_histogram', 'is_active', 'created_at'
+    ]
+    sources = {
+        **FlatProductSerializer.sources,
+        'rating_histogram': [f'rating_{stars}_count' for stars in RATING_STARS],
+    }
+    formats = {**FlatProductSerializer.formats, 'average_rating': decimal_value}
+    nested = {
+        **FlatProductSerializer.nested,
+        'variants': Nested(FlatVariantSerializer, 'product_id'),
+        'reviews': Nested(FlatReviewSerializer, 'product_id', limit=lambda: settings.PRODUCT_RECENT_REVIEWS),
+    }
+
+    def get_rating_histogram(self, row):
+        return {str(stars): row[f'{self.prefix}rating_{stars}_count'] for stars in RATING_STARS}
+
+
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     brand = serializers.SlugRelatedField(
         slug_field='name',
@@ -92,6 +197,7 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id',
+            'sku',
             'name',
             'target_audience',
             'description',
@@ -105,3 +211,35 @@ class ProductVariantCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductVariant
         fields = ['id', 'color', 'size', 'stock', 'price']
+
+
+class VariantMatrixRowSerializer(serializers.Serializer):
+    color = serializers.CharField(max_length=50)
+    size = serializers.CharField(max_length=50)
+    stock = serializers.IntegerField(min_value=0)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    sku = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    is_active = serializers.BooleanField(default=True)
+
+
+class VariantMatrixSerializer(serializers.Serializer):
+    variants = VariantMatrixRowSerializer(many=True, allow_empty=False)
+    deactivate_missing = serializers.BooleanField(default=True)
+
+    def validate_variants(self, rows):
+        seen = set()
+        for row in rows:
+            key = (row['color'], row['size'])
+            if key in seen:
+                raise serializers.ValidationError(f"{row['color']}/{row['size']} appears more than once.")
+            seen.add(key)
+        skus = [row['sku'] for row in rows if row.get('sku')]
+        if len(skus) != len(set(skus)):
+            raise serializers.ValidationError("SKUs must be unique within the matrix.")
+        return rows
+
+
+class VariantMatrixResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductVariant
+        fields = ['id', 'color', 'size', 'stock', 'price', 'sku', 'is_active']
@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, Brand, Color, Size, Product, ProductVariant, ProductImage, ProductSummary, image_key
+from .cache import bump_facet_version, bump_product_version, bump_taxonomy_version
+from .summary import schedule_summary_refresh
+
+
+def products_changed(product_ids):
+    """
+    Propagate a bulk write (``bulk_create``/``bulk_update``/``update()``) that
+    bypassed the model signals below to the catalog cache and summaries.
+    """
+    product_ids = set(product_ids)
+    schedule_summary_refresh(product_ids)
+    transaction.on_commit(lambda: [bump_product_version(pk) for pk in product_ids])
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    schedule_summary_refresh([instance.pk])
+    transaction.on_commit(lambda: bump_product_version(instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_product_version(instance.pk))
+    # Its summary row went with it.
+    transaction.on_commit(bump_facet_version)
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_child_changed(sender, instance, **kwargs):
+    schedule_summary_refresh([instance.product_id])
+    transaction.on_commit(lambda: bump_product_version(instance.product_id))
+
+
+@receiver(post_save, sender=ProductImage)
+def product_image_saved(sender, instance, created, **kwargs):
+    current = image_key(instance.image)
+    if created or getattr(instance, '_image_snapshot', None) != current:
+        # Imported here: products.renditions uses products_changed from this module.
+        from .renditions import build_renditions
+        transaction.on_commit(lambda: build_renditions([instance.pk]))
+    instance._image_snapshot = current
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Brand)
+def taxonomy_name_changed(sender, instance, **kwargs):
+    field = 'category' if sender is Category else 'brand'
+    name = instance.name if kwargs.get('signal') is post_save else ''
+    ProductSummary.objects.filter(**{f'{field}_id': instance.pk}).update(**{f'{field}_name': name})
+    transaction.on_commit(bump_taxonomy_version)
+
+
+@receiver([post_save, post_delete], sender=Color)
+@receiver([post_save, post_delete], sender=Size)
+def variant_option_changed(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_save and not kwargs.get('created'):
+        field = 'color' if sender is Color else 'size'
+        product_ids = ProductVariant.objects.filter(**{field: instance}).values_list('product_id', flat=True).distinct()
+        schedule_summary_refresh(product_ids)
+    transaction.on_commit(bump_taxonomy_version)
@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Min, Max, Sum
+
+from common.flat import image_url
+from .cache import bump_facet_version
+from .models import Product, ProductVariant, ProductImage, ProductSummary
+
+
+SUMMARY_FIELDS = [
+    'name', 'target_audience', 'category', 'category_name', 'brand', 'brand_name',
+    'min_price', 'max_price', 'total_stock', 'sizes', 'colors', 'primary_image_url', 'primary_thumbnail_url',
+    'average_rating', 'is_active', 'created_at', 'updated_at',
+]
+# Columns the facet index is built from.
+FACET_FIELDS = [
+    'category_id', 'category_name', 'brand_id', 'brand_name', 'sizes', 'colors', 'target_audience',
+    'min_price', 'max_price', 'is_active', 'created_at',
+]
+
+
+def _join(names):
+    return f"|{'|'.join(sorted(names))}|" if names else ''
+
+
+def _image_urls(image):
+    if image is None:
+        return '', ''
+    renditions = image['renditions'] or {}
+    original = image['image_url'] or image_url(image['image']) or ''
+    return original, (renditions.get('thumb') or {}).get('url') or original
+
+
+def refresh_product_summaries(product_ids):
+    """
+    Rebuild the summary rows of the given products in a constant number of
+    queries, whatever the number of products. The facet index is only
+    invalidated when a facet column actually changed.
+    """
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if not product_ids:
+        return
+
+    previous = {
+        row[0]: row[1:]
+        for row in ProductSummary.objects.filter(product_id__in=product_ids).values_list('product_id', *FACET_FIELDS)
+    }
+
+    products = Product.objects.filter(pk__in=product_ids).select_related('category', 'brand')
+
+    variants = ProductVariant.objects.filter(product_id__in=product_ids, is_active=True)
+    stats = {
+        row['product_id']: row
+        for row in variants.values('product_id').annotate(
+            min_price=Min('price'), max_price=Max('price'), total_stock=Sum('stock')
+        )
+    }
+    sizes, colors = defaultdict(set), defaultdict(set)
+    for product_id, size, color in variants.values_list('product_id', 'size__name', 'color__name').distinct():
+        sizes[product_id].add(size)
+        colors[product_id].add(color)
+
+    images = {}
+    for image in ProductImage.objects.filter(product_id__in=product_ids).order_by(
+        'product_id', '-is_primary', '-uploaded_at'
+    ).values('product_id', 'image', 'image_url', 'renditions'):
+        images.setdefault(image['product_id'], image)
+
+    summaries = []
+    for product in products:
+        row = stats.get(product.pk, {})
+        image, thumbnail = _image_urls(images.get(product.pk))
+        summaries.append(ProductSummary(
+            product=product,
+            name=product.name,
+            target_audience=product.target_audience,
+            category_id=product.category_id,
+            category_name=product.category.name if product.category else '',
+            brand_id=product.brand_id,
+            brand_name=product.brand.name if product.brand else '',
+            min_price=row.get('min_price'),
+            max_price=row.get('max_price'),
+            total_stock=row.get('total_stock') or 0,
+            sizes=_join(sizes[product.pk]),
+            colors=_join(colors[product.pk]),
+            primary_image_url=image,
+            primary_thumbnail_url=thumbnail,
+            average_rating=product.average_rating,
+            is_active=product.is_active,
+            created_at=product.created_at,
+        ))
+
+    ProductSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=SUMMARY_FIELDS,
+    )
+    if any(
+        previous.get(summary.product_id) != tuple(getattr(summary, field) for field in FACET_FIELDS)
+        for summary in summaries
+    ):
+        transaction.on_commit(bump_facet_version)
+
+
+def schedule_summary_refresh(product_ids):
+    """
+    Refresh the summaries once the surrounding transaction commits, so the
+    rebuild sees the committed variant, image and review rows.
+    """
+    product_ids = set(product_ids)
+    transaction.on_commit(lambda: refresh_product_summaries(product_ids))
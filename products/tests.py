@@ -1,3 +1,249 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import DatabaseError
+from django.db.models import Prefetch
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from common.renderers import FastJSONRenderer
+from reviews.models import Review
+from users.models import User
+
+from .importers import CatalogImporter, read_rows
+from .models import Brand, Category, Color, Product, ProductImage, ProductVariant, Size, StockReservation
+from .reservations import InsufficientStockError, available_stock, reserve, sweep_expired
+from .facets import get_facet_index
+from .search import search_products
+from .serializers import DetailProductSerializer
+
+
+class InvertedIndexSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cut_to_max_results_applies_after_the_queryset_filters(self):
+        for n in range(3):
+            Product.objects.create(name=f'Cotton cotton shirt {n}', description='cotton', is_active=False)
+        active = Product.objects.create(name='Plain shirt', description='cotton blend')
+
+        with mock.patch('products.search.MAX_RESULTS', 2):
+            found = list(search_products(Product.objects.filter(is_active=True), 'cotton'))
+
+        self.assertEqual(found, [active])
+
+
+class CatalogImporterTests(TestCase):
+    def import_csv(self, text):
+        return CatalogImporter(chunk_size=10).run(read_rows(io.StringIO(text), 'csv'))
+
+    def test_bad_cells_fail_their_row_only(self):
+        report = self.import_csv(
+            "product_sku,name,sku,color,size,price,stock\n"
+            "P1,Shirt,S1,Red,M,12.345,3\n"
+            "P1,Shirt,S2,Red,L,NaN,3\n"
+            "P1,Shirt,S3,Red,XL,sNaN,3\n"
+            "P1,Shirt,S4,Blue,M,Infinity,3\n"
+            "P1,Shirt,S5,Blue,L,123456789012,3\n"
+            "P1,Shirt,S6,Blue,XL,1e400,3\n"
+            "P1,Shirt,S7,Black,M,10,-2\n"
+            "P1,Shirt,S8,Black,L,10,3\n"
+        )
+
+        self.assertEqual((report.imported, report.failed), (2, 6))
+        self.assertEqual([error['line'] for error in report.errors], [3, 4, 5, 6, 7, 8])
+        self.assertEqual(
+            dict(ProductVariant.objects.values_list('sku', 'price')),
+            {'S1': Decimal('12.34'), 'S8': Decimal('10.00')},
+        )
+
+    def test_overlong_text_fails_its_row_only(self):
+        report = self.import_csv(
+            "product_sku,name,sku,category,color,size,price,stock\n"
+            f"P1,Shirt,S1,{'c' * 101},Red,M,10,3\n"
+            f"P1,Shirt,S2,Tops,{'r' * 51},L,10,3\n"
+            f"P1,{'n' * 256},S3,Tops,Red,XL,10,3\n"
+            "P1,Shirt,S4,Tops,Red,S,10,3\n"
+        )
+
+        self.assertEqual((report.imported, report.failed), (1, 3))
+        self.assertEqual(
+            [error['error'] for error in report.errors],
+            ["'category' must be at most 100 characters.", "'color' must be at most 50 characters.",
+             "'name' must be at most 255 characters."],
+        )
+        self.assertEqual(list(ProductVariant.objects.values_list('sku', flat=True)), ['S4'])
+
+    def test_taxonomy_errors_fail_the_chunk_not_the_import(self):
+        with mock.patch.object(CatalogImporter, '_resolve', side_effect=DatabaseError("value too long")):
+            report = self.import_csv("product_sku,name,sku,color,size,price,stock\nP1,Shirt,S1,Red,M,10,3\n")
+
+        self.assertEqual((report.imported, report.failed), (0, 1))
+        self.assertIn('value too long', report.errors[0]['error'])
+
+
+class LocalRenditionTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings = override_settings(
+            MEDIA_ROOT=self.media, MEDIA_URL='/media/', IMAGE_RENDITIONS={'thumb': 100, 'card': 300},
+            IMAGE_RENDITION_FORMATS=['webp'], IMAGE_RENDITION_BACKEND='products.renditions.LocalRenditions',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.product = Product.objects.create(name='Shirt', description='Cotton')
+
+    def upload(self, name, size):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+        return FileSystemStorage().save(f'product_images/{name}', ContentFile(buffer.getvalue()))
+
+    def test_create_stores_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=self.upload('a.jpg', (600, 400)))
+
+        image.refresh_from_db()
+        self.assertEqual(image.image_url, '/media/product_images/a.jpg')
+        self.assertEqual(set(image.renditions), {'thumb', 'card'})
+        self.assertEqual(image.renditions['thumb']['url'], f'/media/renditions/{image.pk}/thumb.jpg')
+        self.assertEqual(set(image.renditions['thumb']['formats']), {'webp'})
+        with Image.open(f'{self.media}/renditions/{image.pk}/card.jpg') as card:
+            self.assertEqual(card.size, (300, 200))
+
+    def test_replacing_the_image_clears_then_rebuilds_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=self.upload('a.jpg', (600, 400)))
+        image = ProductImage.objects.get(pk=image.pk)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            image.image = self.upload('b.jpg', (400, 600))
+            image.save(update_fields=['image'])
+        stale = ProductImage.objects.get(pk=image.pk)
+        self.assertEqual((stale.image_url, stale.renditions), ('', {}))
+
+        for callback in callbacks:
+            callback()
+        image.refresh_from_db()
+        self.assertEqual(image.image_url, '/media/product_images/b.jpg')
+        with Image.open(f'{self.media}/renditions/{image.pk}/card.jpg') as card:
+            self.assertEqual(card.size, (300, 450))
+
+    def test_other_changes_keep_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=self.upload('a.jpg', (600, 400)))
+        image = ProductImage.objects.get(pk=image.pk)
+        renditions = image.renditions
+
+        image.is_primary = True
+        image.save()
+
+        self.assertEqual(ProductImage.objects.get(pk=image.pk).renditions, renditions)
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name='Shirt', description='Cotton')
+        self.variant = ProductVariant.objects.create(
+            product=product, color=Color.objects.create(name='Red'), size=Size.objects.create(name='M'),
+            stock=5, price=10,
+        )
+
+    def test_holds_reduce_availability_until_they_expire(self):
+        reserve('payment-1', [(self.variant.pk, 3)])
+
+        self.assertEqual(available_stock([self.variant.pk]), {self.variant.pk: 2})
+        self.assertEqual(available_stock([self.variant.pk], exclude_reference='payment-1'), {self.variant.pk: 5})
+        with self.assertRaises(InsufficientStockError) as raised:
+            reserve('payment-2', [(self.variant.pk, 3)])
+        self.assertEqual(raised.exception.available, 2)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(available_stock([self.variant.pk]), {self.variant.pk: 5})
+        self.assertEqual(sweep_expired(), 1)
+        self.assertEqual(StockReservation.objects.get().status, 'expired')
+
+    def test_reserving_again_replaces_the_holds(self):
+        reserve('payment-1', [(self.variant.pk, 2)])
+        reserve('payment-1', [(self.variant.pk, 4)])
+
+        self.assertEqual(available_stock([self.variant.pk]), {self.variant.pk: 1})
+        self.assertEqual(StockReservation.objects.filter(status='active').count(), 1)
+
+
+class FlatDetailProductTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name='Shirt', description='Cotton', category=Category.objects.create(name='Tops'),
+            brand=Brand.objects.create(name='Acme'),
+        )
+        ProductVariant.objects.create(
+            product=self.product, color=Color.objects.create(name='Red'), size=Size.objects.create(name='M'),
+            stock=5, price=Decimal('12.50'), sku='SHIRT-RED-M',
+        )
+        user = User.objects.create_user('buyer@example.com', 'pass', first_name='B', last_name='C')
+        Review.objects.create(product=self.product, user=user, rating=4, comment='Fits well')
+        self.url = f'/products/api/detail-products/{self.product.pk}/'
+
+    def test_flat_output_matches_the_model_serializer(self):
+        self.maxDiff = None
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        product = Product.objects.prefetch_related(Prefetch('reviews', to_attr='recent_reviews')).get(pk=self.product.pk)
+        expected = DetailProductSerializer(product).data
+        self.assertEqual(response.json(), json.loads(FastJSONRenderer().render(expected)))
+
+    def test_fields_and_expand_narrow_the_output(self):
+        response = self.client.get(self.url, {'fields': 'id,name,variants.price', 'expand': 'variants'})
+
+        self.assertEqual(response.json(), {
+            'id': self.product.pk, 'name': 'Shirt', 'variants': [{'price': '12.50'}],
+        })
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.url, {'fields': 'id,colour'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+
+class FacetIndexVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name='Shirt', description='Cotton')
+            self.variant = ProductVariant.objects.create(
+                product=product, color=Color.objects.create(name='Red'), size=Size.objects.create(name='M'),
+                stock=5, price=10,
+            )
+
+    def save_variant(self, **changes):
+        for field, value in changes.items():
+            setattr(self.variant, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.save()
+
+    def test_stock_changes_keep_the_index(self):
+        index = get_facet_index()
+        self.save_variant(stock=2)
+
+        self.assertIs(get_facet_index(), index)
+
+    def test_facet_changes_rebuild_the_index(self):
+        index = get_facet_index()
+        self.assertEqual(list(index.bitmaps['price']), ['0-500'])
+        self.save_variant(price=600)
+
+        self.assertEqual(list(get_facet_index().bitmaps['price']), ['500-1000'])
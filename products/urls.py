@@ -3,7 +3,8 @@ from rest_framework_nested import routers
 from reviews.views import ReviewViewSet
 from .views import (
     CategoryViewSet, BrandViewSet, ProductViewSet, ProductImageViewSet,
-    ColorViewSet, SizeViewSet, ProductVariantViewSet, DetailProductViewSet
+    ColorViewSet, SizeViewSet, ProductVariantViewSet, DetailProductViewSet,
+    ProductSummaryViewSet, ProductFacetView
 )
 
 # Main router
@@ -14,6 +15,7 @@ router.register(r'colors', ColorViewSet, basename='color')
 router.register(r'sizes', SizeViewSet, basename='size')
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'detail-products', DetailProductViewSet, basename='detail_product')
+router.register(r'product-summaries', ProductSummaryViewSet, basename='product-summary')
 
 # Nested router for product
 detail_products_router = routers.NestedDefaultRouter(router, r'detail-products', lookup='detail_product')
@@ -22,6 +24,7 @@ detail_products_router.register(r'variants', ProductVariantViewSet, basename='pr
 detail_products_router.register(r'reviews', ReviewViewSet, basename='product-reviews')
 
 urlpatterns = [
+    path('facets/', ProductFacetView.as_view(), name='product-facets'),
     path('', include(router.urls)),
     path('', include(detail_products_router.urls)),
 ]
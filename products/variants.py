@@ -0,0 +1,91 @@
+from django.db import IntegrityError, transaction
+
+from .models import Color, Product, ProductVariant, Size
+from .signals import products_changed
+
+
+MATRIX_FIELDS = ['price', 'stock', 'is_active', 'sku']
+
+
+class VariantMatrixError(ValueError):
+    def __init__(self, detail):
+        self.detail = detail
+        super().__init__(detail)
+
+
+def apply_variant_matrix(product_id, rows, deactivate_missing=True):
+    """
+    Make the variants of a product match ``rows`` (dicts with ``color`` and
+    ``size`` names, ``price``, ``stock`` and optionally ``sku`` and
+    ``is_active``) in one transaction.
+
+    Missing combinations are created, differing ones updated and, with
+    ``deactivate_missing``, combinations absent from ``rows`` deactivated
+    (variants are never deleted, order items keep pointing at them). The
+    number of queries does not depend on the size of the matrix, and the
+    catalog is invalidated once. Returns ``(counts, variants)``.
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().filter(pk=product_id).only('pk').first()
+        if product is None:
+            raise Product.DoesNotExist
+
+        colors = dict(Color.objects.filter(name__in={row['color'] for row in rows}).values_list('name', 'pk'))
+        sizes = dict(Size.objects.filter(name__in={row['size'] for row in rows}).values_list('name', 'pk'))
+        unknown = sorted(
+            {f"color '{row['color']}'" for row in rows if row['color'] not in colors}
+            | {f"size '{row['size']}'" for row in rows if row['size'] not in sizes}
+        )
+        if unknown:
+            raise VariantMatrixError({'variants': [f"Unknown {', '.join(unknown)}."]})
+
+        existing = {
+            (variant.color_id, variant.size_id): variant
+            for variant in ProductVariant.objects.filter(product_id=product_id)
+        }
+        to_create, to_update, unchanged = [], [], []
+        for row in rows:
+            key = (colors[row['color']], sizes[row['size']])
+            values = {
+                'price': row['price'],
+                'stock': row['stock'],
+                'is_active': row.get('is_active', True),
+                'sku': row.get('sku') or None,
+            }
+            variant = existing.pop(key, None)
+            if variant is None:
+                to_create.append(ProductVariant(product_id=product_id, color_id=key[0], size_id=key[1], **values))
+                continue
+            if values['sku'] is None:
+                values['sku'] = variant.sku
+            if all(getattr(variant, field) == value for field, value in values.items()):
+                unchanged.append(variant)
+                continue
+            for field, value in values.items():
+                setattr(variant, field, value)
+            to_update.append(variant)
+
+        to_deactivate = [variant for variant in existing.values() if variant.is_active] if deactivate_missing else []
+
+        try:
+            with transaction.atomic():
+                ProductVariant.objects.bulk_create(to_create)
+                ProductVariant.objects.bulk_update(to_update, MATRIX_FIELDS)
+        except IntegrityError:
+            raise VariantMatrixError({'variants': ["A SKU in the matrix is already used by another variant."]})
+        if to_deactivate:
+            ProductVariant.objects.filter(pk__in=[variant.pk for variant in to_deactivate]).update(is_active=False)
+            for variant in to_deactivate:
+                variant.is_active = False
+
+        if to_create or to_update or to_deactivate:
+            products_changed([product_id])
+
+    counts = {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deactivated': len(to_deactivate),
+        'unchanged': len(unchanged),
+    }
+    variants = to_create + to_update + unchanged + list(existing.values())
+    return counts, sorted(variants, key=lambda variant: variant.pk)
@@ -1,23 +1,34 @@
 from rest_framework import viewsets, permissions, filters
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from django.conf import settings
 from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from reviews.models import Review
 
 from .models import (
-    Category, Brand, Product, ProductImage, Color, Size, ProductVariant
+    Category, Brand, Product, ProductImage, Color, Size, ProductVariant, ProductSummary
 )
 from .serializers import (
     CategorySerializer, BrandSerializer, ProductSerializer,
     ProductCreateUpdateSerializer, DetailProductSerializer,
     ProductImageSerializer, ProductVariantCreateSerializer,
-    ColorSerializer, SizeSerializer
+    ColorSerializer, SizeSerializer, ProductSummarySerializer,
+    VariantMatrixSerializer, VariantMatrixResultSerializer,
+    FlatProductSerializer, FlatDetailProductSerializer
 )
 from .permissions import IsAdminOrReadOnly
-from .filters import ProductFilter
-from common.paginations import CustomPagination
+from .filters import ProductFilter, ProductSummaryFilter, ProductSearchFilter
+from .cache import CatalogCacheMixin
+from .facets import FACETS, get_facet_index
+from .variants import VariantMatrixError, apply_variant_matrix
+from common.paginations import CustomPagination, SelectablePaginationMixin, ProductCursorPagination
+from common.flat import FlatReadMixin
+from common.views import StagedUploadCreateMixin, StagedUploadUpdateMixin
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -33,15 +44,17 @@ class CategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
 
 
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(StagedUploadCreateMixin, StagedUploadUpdateMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing product brands.
 
     Allows admin users to create, update, and delete brand entries.
     All users can view the list of brands and retrieve individual brand details.
+    An uploaded `logo` is queued for the upload worker and answered with `202 Accepted`.
     """
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
+    upload_fields = ('logo',)
     pagination_class = CustomPagination
     permission_classes = [IsAdminOrReadOnly]
 
@@ -73,15 +86,24 @@ class SizeViewSet(viewsets.ModelViewSet):
 
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CatalogCacheMixin, SelectablePaginationMixin, FlatReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing products in the store.
 
     Admin users can perform full CRUD operations on products.
     Regular users can view only active products with search, filtering, and ordering support.
+    Send `?pagination=cursor` for keyset pagination without a count query.
+    List and retrieve responses are served from the catalog cache; JSON ones are
+    built from `.values()` rows by `FlatProductSerializer`.
+    `?fields=id,name,images.image` keeps only the named fields and `?expand=` lists the
+    nested fields to embed (others are given as ids); fewer fields means fewer columns
+    read and no query for nested collections left out.
     """
+    cache_namespace = 'products'
+    flat_serializer_class = FlatProductSerializer
+    cursor_pagination_class = ProductCursorPagination
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['created_at']
 
@@ -103,22 +125,33 @@ class ProductViewSet(viewsets.ModelViewSet):
 
 
 
-class DetailProductViewSet(viewsets.ModelViewSet):
+class DetailProductViewSet(CatalogCacheMixin, SelectablePaginationMixin, FlatReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for retrieving detailed product information.
 
-    Provides comprehensive data including variants, images, and reviews.
+    Provides comprehensive data including variants, images, the rating histogram and the
+    `PRODUCT_RECENT_REVIEWS` most recent reviews; the full review list is paginated under
+    `detail-products/{id}/reviews/`.
     Admin users can manage product records, while all users can view detailed information for active products.
     Supports search, filtering, and ordering.
+    Send `?pagination=cursor` for keyset pagination without a count query.
+    List and retrieve responses are served from the catalog cache; JSON ones are
+    built from `.values()` rows by `FlatDetailProductSerializer`.
+    `?fields=id,name,variants.price` keeps only the named fields and `?expand=images,variants`
+    lists the nested fields to embed (others are given as ids); fewer fields means fewer
+    columns read and no query for nested collections left out.
     """
+    cache_namespace = 'detail_products'
+    flat_serializer_class = FlatDetailProductSerializer
+    cursor_pagination_class = ProductCursorPagination
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'average_rating']
     filterset_class = ProductFilter
 
     def get_queryset(self):
-        variant_qs = ProductVariant.objects.select_related('color', 'size')
+        variant_qs = ProductVariant.objects.select_related('color', 'size').order_by('id')
         review_qs = Review.objects.select_related('user')
 
         queryset = Product.objects.all()
@@ -129,7 +162,7 @@ class DetailProductViewSet(viewsets.ModelViewSet):
         return queryset.select_related('category', 'brand').prefetch_related(
             'images',
             Prefetch('variants', queryset=variant_qs),
-            Prefetch('reviews', queryset=review_qs)
+            Prefetch('reviews', queryset=review_qs[:settings.PRODUCT_RECENT_REVIEWS], to_attr='recent_reviews')
         )
 
     def get_serializer_class(self):
@@ -139,14 +172,89 @@ class DetailProductViewSet(viewsets.ModelViewSet):
 
 
 
-class ProductImageViewSet(viewsets.ModelViewSet):
+class ProductSummaryViewSet(CatalogCacheMixin, SelectablePaginationMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only catalog listing served from the denormalized product summary table.
+
+    Each row carries the price range, total stock, available sizes and colors,
+    primary image, brand/category names and average rating of a product, so
+    listing, filtering and sorting by price run against a single table.
+    """
+    cache_namespace = 'product_summaries'
+    cursor_pagination_class = ProductCursorPagination
+    serializer_class = ProductSummarySerializer
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = ProductSummaryFilter
+    search_fields = ['name']
+    ordering_fields = ['created_at', 'min_price', 'max_price', 'average_rating']
+
+    def get_queryset(self):
+        queryset = ProductSummary.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(is_active=True)
+        return queryset
+
+
+class ProductFacetView(APIView):
+    """
+    Faceted product browsing in a single round trip.
+
+    Filters by any combination of `category`, `brand` (ids), `size`, `color` (names),
+    `target_audience` and `price` (bucket keys such as `500-1000`); repeat a parameter
+    or separate values with commas to select several values of one facet.
+    Returns a page of product summaries together with per-value counts for every facet,
+    computed from a precomputed bitmap index instead of SQL aggregation.
+    """
+    permission_classes = [permissions.AllowAny]
+    page_size = CustomPagination.page_size
+    integer_facets = ['category', 'brand']
+
+    def get(self, request):
+        index = get_facet_index()
+        matched, facets = index.search({facet: self.get_values(request, facet) for facet in FACETS})
+
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', self.page_size)), 1), self.page_size)
+        except ValueError:
+            return Response({'error': 'page and page_size must be integers.'}, status=400)
+
+        ids = index.page(matched, (page - 1) * page_size, page_size)
+        summaries = ProductSummary.objects.in_bulk(ids)
+        results = [summaries[pk] for pk in ids if pk in summaries]
+
+        return Response({
+            'count': matched.bit_count(),
+            'page': page,
+            'page_size': page_size,
+            'results': ProductSummarySerializer(results, many=True).data,
+            'facets': facets,
+        })
+
+    def get_values(self, request, facet):
+        values = [
+            value.strip()
+            for param in request.query_params.getlist(facet)
+            for value in param.split(',')
+            if value.strip()
+        ]
+        if facet in self.integer_facets:
+            return [int(value) for value in values if value.isdigit()]
+        return values
+
+
+class ProductImageViewSet(StagedUploadCreateMixin, StagedUploadUpdateMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing images associated with a specific product.
 
     Allows admin users to upload, update, and delete product images.
     Supports multipart/form-data for image uploads and ensures only one primary image per product.
+
+    An uploaded `image` is queued for the upload worker: the response is `202 Accepted` with the
+    image row (its `image` still empty) and the `upload_jobs` to poll at `uploads/api/upload-jobs/{id}/`.
     """
     serializer_class = ProductImageSerializer
+    upload_fields = ('image',)
     permission_classes = [permissions.IsAdminUser]
     parser_classes = [MultiPartParser, FormParser]
 
@@ -159,7 +267,7 @@ class ProductImageViewSet(viewsets.ModelViewSet):
         if getattr(self, 'swagger_fake_view', False):
             return
         product = Product.objects.get(pk=self.kwargs['detail_product_pk'])
-        serializer.save(product=product)
+        self.save_with_uploads(serializer, product=product)
 
     def perform_update(self, serializer):
         if getattr(self, 'swagger_fake_view', False):
@@ -167,7 +275,7 @@ class ProductImageViewSet(viewsets.ModelViewSet):
         product = Product.objects.get(pk=self.kwargs['detail_product_pk'])
         if self.request.data.get('is_primary') == 'true':
             ProductImage.objects.filter(product=product, is_primary=True).update(is_primary=False)
-        serializer.save(product=product)
+        self.save_with_uploads(serializer, product=product)
 
 
 class ProductVariantViewSet(viewsets.ModelViewSet):
@@ -176,6 +284,10 @@ class ProductVariantViewSet(viewsets.ModelViewSet):
 
     Allows admin users to create, update, and delete variants for a given product.
     Retrieves variants based on the parent product ID and ensures association during create and update operations.
+
+    `PUT/POST variants/bulk/` replaces the whole color × size matrix of stock and price in one
+    transaction: missing variants are created, changed ones updated and, unless
+    `deactivate_missing` is false, variants left out are deactivated.
     """
 
     serializer_class = ProductVariantCreateSerializer
@@ -195,5 +307,21 @@ class ProductVariantViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         if getattr(self, 'swagger_fake_view', False):
             return
-        product = get_object_or_404(Product, pk=self.kwargs['detail_product_pk'])
-        serializer.save(product=product)
\ No newline at end of file
+        # The instance was looked up within this product, no need to fetch it again.
+        serializer.save()
+
+    @action(detail=False, methods=['put', 'post'], url_path='bulk')
+    def bulk(self, request, detail_product_pk=None):
+        serializer = VariantMatrixSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            counts, variants = apply_variant_matrix(
+                detail_product_pk,
+                serializer.validated_data['variants'],
+                deactivate_missing=serializer.validated_data['deactivate_missing'],
+            )
+        except Product.DoesNotExist:
+            raise NotFound("Product not found.")
+        except VariantMatrixError as exc:
+            raise ValidationError(exc.detail)
+        return Response({**counts, 'variants': VariantMatrixResultSerializer(variants, many=True).data})
\ No newline at end of file
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from reviews.ratings import rebuild_rating_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the rating_count/rating_sum/average_rating counters and the rating histogram "
+        "of every product from its reviews."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed = rebuild_rating_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating counters, {fixed} products corrected."))
@@ -19,6 +19,16 @@ class Review(models.Model):
     class Meta:
         unique_together = ('product', 'user')
         ordering = ['-created_at']
+        indexes = [
+            # Recent reviews of a product and the cursor pagination of its review list.
+            models.Index(fields=['product', '-created_at'], name='reviews_product_recent_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rating_snapshot = (instance.__dict__.get('product_id'), instance.__dict__.get('rating'))
+        return instance
 
     def __str__(self):
         return f'{self.product.name} - {self.user.username} ({self.rating})'
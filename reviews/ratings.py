@@ -0,0 +1,78 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Case, Count, DecimalField, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Round
+from products.models import RATING_STARS, Product
+from products.signals import products_changed
+from .models import Review
+
+
+HISTOGRAM_FIELDS = [f'rating_{stars}_count' for stars in RATING_STARS]
+
+
+def apply_rating_delta(product_id, count, total, stars=None):
+    """
+    Shift a product's rating counters by ``count`` reviews totalling ``total``
+    stars, and its histogram by ``stars`` (rating -> change in reviews), in a
+    single ``UPDATE``, recomputing ``average_rating`` from the new counters in
+    SQL so concurrent review writes never lose an update.
+    """
+    stars = {rating: change for rating, change in (stars or {}).items() if change}
+    if product_id is None or not (count or total or stars):
+        return
+    new_count = F('rating_count') + count
+    new_sum = F('rating_sum') + total
+    Product.objects.filter(pk=product_id).update(
+        **{f'rating_{rating}_count': F(f'rating_{rating}_count') + change for rating, change in stars.items()},
+        rating_count=new_count,
+        rating_sum=new_sum,
+        average_rating=Case(
+            When(rating_count__gt=-count, then=Round(Cast(new_sum, FloatField()) / new_count, 2)),
+            default=Value(Decimal('0')),
+            output_field=DecimalField(max_digits=3, decimal_places=2),
+        ),
+    )
+
+
+def _average(total, count):
+    if not count:
+        return Decimal('0.00')
+    return (Decimal(total) / count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def rebuild_rating_counters(product_ids=None, batch_size=1000):
+    """
+    Recompute rating counters from ``Review`` for ``product_ids`` (all
+    products when None) with one grouped aggregate, writing back only the
+    products whose counters drifted. Returns the number of products fixed.
+    """
+    reviews = Review.objects.all()
+    fields = ['rating_count', 'rating_sum', 'average_rating', *HISTOGRAM_FIELDS]
+    products = Product.objects.only('id', *fields)
+    if product_ids is not None:
+        reviews = reviews.filter(product_id__in=product_ids)
+        products = products.filter(pk__in=product_ids)
+
+    histogram = {
+        field: Count('id', filter=Q(rating=stars)) for stars, field in zip(RATING_STARS, HISTOGRAM_FIELDS)
+    }
+    stats = {
+        row.pop('product_id'): row
+        for row in reviews.order_by().values('product_id').annotate(
+            rating_count=Count('id'), rating_sum=Sum('rating'), **histogram
+        )
+    }
+    empty = dict.fromkeys(['rating_count', 'rating_sum', *HISTOGRAM_FIELDS], 0)
+
+    changed = []
+    for product in products.order_by().iterator(chunk_size=2000):
+        expected = stats.get(product.pk, empty)
+        expected = {**expected, 'average_rating': _average(expected['rating_sum'], expected['rating_count'])}
+        if any(getattr(product, field) != value for field, value in expected.items()):
+            for field, value in expected.items():
+                setattr(product, field, value)
+            changed.append(product)
+
+    Product.objects.bulk_update(changed, fields, batch_size=batch_size)
+    products_changed(product.pk for product in changed)
+    return len(changed)
@@ -1,11 +1,38 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Avg
+from products.signals import products_changed
 from .models import Review
+from .ratings import apply_rating_delta, rebuild_rating_counters
 
-@receiver([post_save, post_delete], sender=Review)
-def update_average_rating(sender, instance, **kwargs):
-    product = instance.product
-    average = product.reviews.aggregate(avg=Avg('rating'))['avg'] or 0
-    product.average_rating = round(average, 2)
-    product.save(update_fields=['average_rating'])
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rating_snapshot', None)
+    if created:
+        apply_rating_delta(instance.product_id, 1, instance.rating, {instance.rating: 1})
+    elif previous is None or None in previous:
+        # Saved without having been loaded (or with rating deferred): the
+        # previous rating is unknown, so recount this product instead.
+        rebuild_rating_counters([instance.product_id])
+    else:
+        old_product_id, old_rating = previous
+        if old_product_id == instance.product_id:
+            if old_rating != instance.rating:
+                apply_rating_delta(
+                    instance.product_id, 0, instance.rating - old_rating, {old_rating: -1, instance.rating: 1}
+                )
+        else:
+            apply_rating_delta(old_product_id, -1, -old_rating, {old_rating: -1})
+            apply_rating_delta(instance.product_id, 1, instance.rating, {instance.rating: 1})
+    instance._rating_snapshot = (instance.product_id, instance.rating)
+    # Counters first, so the summary refresh sees the new average.
+    products_changed({previous and previous[0], instance.product_id} - {None})
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    product_id, rating = getattr(instance, '_rating_snapshot', None) or (instance.product_id, instance.rating)
+    if rating is None:
+        rebuild_rating_counters([product_id])
+    else:
+        apply_rating_delta(product_id, -1, -rating, {rating: -1})
+    products_changed([product_id])
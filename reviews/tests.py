@@ -1,3 +1,45 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from products.models import Product
+from users.models import User
+from .models import Review
+from .ratings import rebuild_rating_counters
+
+
+class RatingCounterTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Shirt', description='Cotton')
+        self.users = [
+            User.objects.create_user(f'buyer{n}@example.com', 'pass', first_name='B', last_name=str(n))
+            for n in range(3)
+        ]
+
+    def counters(self):
+        self.product.refresh_from_db()
+        return (
+            self.product.rating_count, self.product.rating_sum, self.product.average_rating,
+            self.product.rating_4_count, self.product.rating_5_count,
+        )
+
+    def test_writes_shift_the_counters(self):
+        first = Review.objects.create(product=self.product, user=self.users[0], rating=5)
+        Review.objects.create(product=self.product, user=self.users[1], rating=4)
+        Review.objects.create(product=self.product, user=self.users[2], rating=4)
+        self.assertEqual(self.counters(), (3, 13, Decimal('4.33'), 2, 1))
+
+        first.rating = 4
+        first.save()
+        self.assertEqual(self.counters(), (3, 12, Decimal('4.00'), 3, 0))
+
+        Review.objects.filter(product=self.product).delete()
+        self.assertEqual(self.counters(), (0, 0, Decimal('0.00'), 0, 0))
+
+    def test_rebuild_fixes_drifted_counters_only(self):
+        Review.objects.create(product=self.product, user=self.users[0], rating=5)
+        self.assertEqual(rebuild_rating_counters(), 0)
+
+        Product.objects.filter(pk=self.product.pk).update(rating_count=7, average_rating=1)
+        self.assertEqual(rebuild_rating_counters(), 1)
+        self.assertEqual(self.counters(), (1, 5, Decimal('5.00'), 0, 1))
@@ -3,6 +3,7 @@ from rest_framework.exceptions import ValidationError
 from .models import Review
 from .serializers import ReviewSerializer
 from .permissions import IsOwnerOrAdmin
+from common.paginations import ReviewCursorPagination
 
 
 class ReviewViewSet(viewsets.ModelViewSet):
@@ -14,7 +15,8 @@ class ReviewViewSet(viewsets.ModelViewSet):
       • Update or delete their own reviews.
 
     - Allows all users to:
-      • View reviews for a specific product.
+      • View reviews for a specific product, newest first, with cursor pagination
+        (follow `next` while scrolling; no count query).
 
     - Restrictions:
       • A user can only leave one review per product.
@@ -22,11 +24,12 @@ class ReviewViewSet(viewsets.ModelViewSet):
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrAdmin]
+    pagination_class = ReviewCursorPagination
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return
-        return Review.objects.filter(product_id=self.kwargs['detail_product_pk'])
+        return Review.objects.filter(product_id=self.kwargs['detail_product_pk']).select_related('user')
 
     def perform_create(self, serializer):
         if getattr(self, 'swagger_fake_view', False):
@@ -10,6 +10,8 @@ from rest_framework import generics
 from .models import User
 from .serializers import UserProfileSerializer, AdminUserSerializer
 from .permissions import IsOwner, IsAdmin
+from common.paginations import SelectablePaginationMixin, UserCursorPagination
+from common.views import StagedUploadUpdateMixin
 
 
 class ActivateUserView(APIView):
@@ -46,21 +48,23 @@ class ActivateUserView(APIView):
 
 
 
-class UserProfileView(generics.RetrieveUpdateDestroyAPIView):
+class UserProfileView(StagedUploadUpdateMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Allows a user to view, update, or delete their profile.
 
     - Regular users can only manage their own profile.
     - Admins can manage any user's profile through separate endpoint.
+    - A new `profile_picture` is queued for the upload worker and answered with `202 Accepted`.
     """
     serializer_class = UserProfileSerializer
+    upload_fields = ('profile_picture',)
     permission_classes = [IsAuthenticated, IsOwner]
 
     def get_object(self):
         return self.request.user
     
 
-class AdminUserViewSet(viewsets.ModelViewSet):
+class AdminUserViewSet(SelectablePaginationMixin, viewsets.ModelViewSet):
     """
     Admin-only viewset for managing all users.
 
@@ -70,9 +74,12 @@ class AdminUserViewSet(viewsets.ModelViewSet):
     - Update user data
     - Delete users
     - Create new users
+
+    Send `?pagination=cursor` for keyset pagination without a count query.
     """
     queryset = User.objects.all()
     serializer_class = AdminUserSerializer
+    cursor_pagination_class = UserCursorPagination
     permission_classes = [IsAuthenticated, IsAdmin]
 
 
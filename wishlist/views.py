@@ -22,7 +22,9 @@ class WishlistItemViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return WishlistItem.objects.none()
-        return WishlistItem.objects.filter(wishlist__user=self.request.user)
+        return WishlistItem.objects.select_related(
+            'wishlist', 'variant__product', 'variant__color', 'variant__size'
+        ).filter(wishlist__user=self.request.user)
 
     def create(self, request, *args, **kwargs):
         variant_id = request.data.get('variant_id')